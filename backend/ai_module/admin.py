@@ -1,3 +1,39 @@
 from django.contrib import admin
+from .models import AIJob, AIMetricsSnapshot, AIRequestLock, AIResponseCache, CategorizerState
 
-# Register your models here.
+
+@admin.register(AIResponseCache)
+class AIResponseCacheAdmin(admin.ModelAdmin):
+    list_display = ['method', 'key', 'hit_count', 'created_at', 'expires_at']
+    list_filter = ['method', 'created_at']
+    search_fields = ['key', 'method']
+    readonly_fields = ['key', 'method', 'response', 'hit_count', 'created_at', 'expires_at']
+    ordering = ['-created_at']
+
+
+@admin.register(AIRequestLock)
+class AIRequestLockAdmin(admin.ModelAdmin):
+    list_display = ['method', 'key', 'owner', 'created_at', 'expires_at']
+    list_filter = ['method']
+    readonly_fields = ['key', 'method', 'owner', 'created_at', 'expires_at']
+
+
+@admin.register(AIMetricsSnapshot)
+class AIMetricsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['process', 'updated_at']
+    readonly_fields = ['process', 'data', 'updated_at']
+
+
+@admin.register(CategorizerState)
+class CategorizerStateAdmin(admin.ModelAdmin):
+    list_display = ['user', 'documents', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = ['doc_counts', 'token_counts', 'documents', 'updated_at']
+
+
+@admin.register(AIJob)
+class AIJobAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'user', 'status', 'attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    search_fields = ['user__username', 'error']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
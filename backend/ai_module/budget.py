@@ -0,0 +1,123 @@
+import logging
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_WEIGHTS = {'urgent': 1.0, 'high': 0.75, 'medium': 0.5, 'low': 0.25}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def task_relevance(task: Dict, now: Optional[datetime] = None) -> float:
+    """Score a task dict by declared priority, AI priority score and deadline proximity"""
+    now = now or timezone.now()
+    priority = task.get('priority') or task.get('current_priority') or 'medium'
+    score = PRIORITY_WEIGHTS.get(priority, 0.5) + float(task.get('ai_priority_score') or 0.5)
+
+    deadline = _parse_datetime(task.get('deadline'))
+    if deadline is not None:
+        hours_left = (deadline - now).total_seconds() / 3600
+        # Overdue and due-soon tasks dominate; beyond two weeks the deadline barely matters
+        score += 2.0 if hours_left <= 0 else 1.5 / (1 + hours_left / 24)
+    return score
+
+
+def context_relevance(entry: Dict, now: Optional[datetime] = None) -> float:
+    """Score a context dict by recency (one-day half-life) and stored relevance"""
+    now = now or timezone.now()
+    score = float(entry.get('relevance_score') or 0.5)
+
+    created_at = _parse_datetime(entry.get('created_at'))
+    if created_at is not None:
+        age_hours = max((now - created_at).total_seconds() / 3600, 0)
+        score += 0.5 ** (age_hours / 24)
+    return score
+
+
+class PromptBudget:
+    """Token budget for the variable parts of one prompt.
+
+    Candidates for each section are ranked by a relevance function and added greedily until
+    the budget is spent; whatever does not fit is dropped and counted. ``log()`` reports the
+    tokens used and dropped per section.
+    """
+
+    def __init__(self, method: str, max_tokens: Optional[int] = None):
+        budgets = getattr(settings, 'AI_PROMPT_BUDGETS', {})
+        self.method = method
+        self.max_tokens = max_tokens or budgets.get(method) or budgets.get('default', 2000)
+        self.used = 0
+        self.sections = {}
+
+    @property
+    def remaining(self) -> int:
+        return max(self.max_tokens - self.used, 0)
+
+    def fill(self, section: str, candidates: Iterable, render: Callable[[Any], str],
+             score: Optional[Callable[[Any], float]] = None, limit: Optional[int] = None,
+             share: float = 1.0) -> List:
+        """Select the most relevant candidates that fit.
+
+        ``share`` caps this section at a fraction of the remaining budget so one section
+        cannot starve the next; ``limit`` caps the number of items kept.
+        """
+        ranked = sorted(candidates, key=score, reverse=True) if score else list(candidates)
+        allowance = int(self.remaining * share)
+
+        selected, spent, dropped, dropped_tokens = [], 0, 0, 0
+        for candidate in ranked:
+            cost = estimate_tokens(render(candidate))
+            if spent + cost > allowance or (limit is not None and len(selected) >= limit):
+                dropped += 1
+                dropped_tokens += cost
+                continue
+            selected.append(candidate)
+            spent += cost
+
+        self.used += spent
+        self.sections[section] = {
+            'kept': len(selected),
+            'dropped': dropped,
+            'tokens': spent,
+            'dropped_tokens': dropped_tokens,
+        }
+        return selected
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'method': self.method,
+            'budget': self.max_tokens,
+            'used': self.used,
+            'dropped_tokens': sum(section['dropped_tokens'] for section in self.sections.values()),
+            'sections': self.sections,
+        }
+
+    def log(self) -> None:
+        summary = self.summary()
+        logger.info(
+            "Prompt budget %s: used %d/%d tokens, dropped %d tokens %s",
+            self.method, summary['used'], summary['budget'], summary['dropped_tokens'],
+            {name: f"{s['kept']} kept/{s['dropped']} dropped" for name, s in self.sections.items()}
+        )
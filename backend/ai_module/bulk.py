@@ -0,0 +1,203 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from context.models import BulkProcessRun, ContextEntry, DailyContextSummary
+
+from .gemini_client import GeminiAIClient
+
+logger = logging.getLogger(__name__)
+
+
+def process_context_entries(entries: List[ContextEntry], ai_client: GeminiAIClient) -> int:
+    """Analyze unprocessed entries: reuse analyses of near-duplicates, triage locally and send
+    only relevant entries to Gemini in token-budgeted batches. Writes happen in one
+    transaction after the Gemini calls. Returns how many entries were processed."""
+    updates = {}
+    processed_count = 0
+
+    # Reuse analyses of near-duplicates: earlier analyzed entries first, then
+    # repeats within this batch, which follow the first occurrence
+    repeats = {}
+    if getattr(settings, 'AI_DEDUP_ENABLED', True):
+        from .dedup import dedup_stats, split_repeats
+
+        checked = len(entries)
+        originals = ContextEntry.find_analyzed_duplicates(entries)
+        copied = [entry for entry in entries if entry.pk in originals]
+        for entry in copied:
+            entry.copy_analysis_from(originals[entry.pk], save=False)
+            updates[entry.pk] = entry
+        processed_count += len(copied)
+        dedup_stats.record(checked, len(copied), sum(
+            1 for entry in copied if originals[entry.pk].processed_insights.get('source') != 'local'
+        ))
+        entries, repeats = split_repeats([entry for entry in entries if entry.pk not in originals])
+
+    # Triage locally and send only the relevant entries to the LLM
+    representatives = entries
+    if getattr(settings, 'AI_TRIAGE_ENABLED', True):
+        from .triage import triage_batch, triage_stats
+
+        triaged = triage_batch([
+            {'content': entry.content, 'source_type': entry.source_type} for entry in entries
+        ])
+        triage_stats.record(triaged)
+        relevant = []
+        for entry, result in zip(entries, triaged):
+            entry.apply_triage(result, processed=not result['needs_llm'], save=False)
+            updates[entry.pk] = entry
+            if result['needs_llm']:
+                relevant.append(entry)
+            else:
+                processed_count += 1
+        entries = relevant
+
+    analyses = ai_client.analyze_context_batch([
+        {'id': entry.id, 'content': entry.content, 'source_type': entry.source_type}
+        for entry in entries
+    ]) if entries else {}
+
+    for entry in entries:
+        try:
+            entry.apply_analysis(analyses[entry.id], save=False)
+            entry.updated_at = timezone.now()
+            updates[entry.pk] = entry
+            processed_count += 1
+        except Exception:
+            logger.warning("Failed to process entry %s", entry.id, exc_info=True)
+            continue
+
+    if repeats:
+        analyzed = {entry.pk for entry in entries}
+        copies, saved = 0, 0
+        for original in representatives:
+            if not original.is_processed:
+                continue
+            for entry in repeats.get(original.pk, []):
+                entry.copy_analysis_from(original, save=False)
+                updates[entry.pk] = entry
+                copies += 1
+                saved += original.pk in analyzed
+        processed_count += copies
+        dedup_stats.record(0, copies, saved)
+
+    with transaction.atomic():
+        ContextEntry.objects.bulk_update(list(updates.values()), ContextEntry.ANALYSIS_FIELDS + ['duplicate_of'])
+        # bulk_update sends no post_save, so urgency flips are counted here
+        DailyContextSummary.record_urgency_changes(list(updates.values()))
+    return processed_count
+
+
+def _process_chunk(entries: List[ContextEntry]) -> Tuple[int, int, int, str]:
+    """Run one chunk in a pool thread; returns (processed, failed, upstream calls, error)"""
+    ai_client = GeminiAIClient()
+    try:
+        processed = process_context_entries(entries, ai_client)
+        return processed, len(entries) - processed, ai_client.upstream_calls, ''
+    except Exception as e:
+        logger.exception("Bulk processing chunk failed")
+        return 0, len(entries), ai_client.upstream_calls, str(e)
+    finally:
+        connection.close()
+
+
+def _remaining(run: BulkProcessRun):
+    return ContextEntry.objects.filter(user_id=run.user_id, is_processed=False, id__gt=run.checkpoint)
+
+
+def start_run(user) -> BulkProcessRun:
+    """The user's unfinished run, reopened, or a new one covering the current backlog.
+
+    A reopened run's total is recomputed as the entries it handled plus those now left
+    after its checkpoint, so entries added since it started are counted.
+    """
+    run = BulkProcessRun.objects.filter(user=user).exclude(status='completed').first()
+    if run is None:
+        return BulkProcessRun.objects.create(
+            user=user, total=ContextEntry.objects.filter(user=user, is_processed=False).count()
+        )
+    BulkProcessRun.objects.filter(pk=run.pk).update(
+        status='running', finished_at=None, updated_at=timezone.now(),
+        total=F('processed') + F('failed') + _remaining(run).count(),
+    )
+    run.refresh_from_db()
+    return run
+
+
+def drain(run: BulkProcessRun, job=None) -> Dict[str, Any]:
+    """Process every unprocessed entry of the run's user after its checkpoint.
+
+    Entries are read in id order, ``AI_BULK_CHUNK_SIZE`` per chunk, and
+    ``AI_BULK_THREADS`` chunks run concurrently. After each such window the counts and
+    checkpoint are committed, so a crashed run resumes after the last finished window, and
+    the job's lock is extended. Entries that fail are counted and skipped.
+    """
+    from .jobs import heartbeat
+
+    chunk_size = max(getattr(settings, 'AI_BULK_CHUNK_SIZE', 100), 1)
+    threads = max(getattr(settings, 'AI_BULK_THREADS', 4), 1)
+    backlog = ContextEntry.objects.filter(user=run.user, is_processed=False).order_by('id')
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='bulk-process') as pool:
+        while True:
+            window = list(backlog.filter(id__gt=run.checkpoint)[:chunk_size * threads])
+            if not window:
+                break
+            chunks = [window[start:start + chunk_size] for start in range(0, len(window), chunk_size)]
+            results = list(pool.map(_process_chunk, chunks))
+
+            errors = [error for _, _, _, error in results if error]
+            run.checkpoint = window[-1].id
+            BulkProcessRun.objects.filter(pk=run.pk).update(
+                processed=F('processed') + sum(result[0] for result in results),
+                failed=F('failed') + sum(result[1] for result in results),
+                upstream_calls=F('upstream_calls') + sum(result[2] for result in results),
+                checkpoint=run.checkpoint,
+                last_error=errors[-1] if errors else F('last_error'),
+                updated_at=timezone.now(),
+            )
+            if job is not None and not heartbeat(job):
+                # Another worker reclaimed the job and continues from the checkpoint
+                run.refresh_from_db()
+                return {'run_id': run.pk, 'handed_over': True}
+
+    BulkProcessRun.objects.filter(pk=run.pk).update(
+        status='completed', finished_at=timezone.now(), total=F('processed') + F('failed')
+    )
+    run.refresh_from_db()
+    return {'run_id': run.pk, 'processed': run.processed, 'failed': run.failed}
+
+
+def describe_run(run: BulkProcessRun, remaining: Optional[int] = None) -> Dict[str, Any]:
+    """Progress figures: counts, remaining backlog and throughput.
+
+    While the run is going, ``remaining`` and ``total`` come from the current backlog rather
+    than the stored total, which entries created or processed elsewhere make stale.
+    """
+    done = run.processed + run.failed
+    if remaining is None:
+        remaining = 0 if run.status == 'completed' else _remaining(run).count()
+    total = run.total if run.status == 'completed' else done + remaining
+    elapsed = ((run.finished_at or timezone.now()) - run.started_at).total_seconds()
+    throughput = done / elapsed if elapsed > 0 else None
+    return {
+        'id': run.pk,
+        'status': run.status,
+        'total': total,
+        'processed': run.processed,
+        'failed': run.failed,
+        'remaining': remaining,
+        'upstream_calls': run.upstream_calls,
+        'entries_per_second': round(throughput, 2) if throughput else None,
+        'eta_seconds': round(remaining / throughput) if throughput and run.status == 'running' else None,
+        'last_error': run.last_error,
+        'job_id': run.job_id,
+        'started_at': run.started_at.isoformat(),
+        'finished_at': run.finished_at.isoformat() if run.finished_at else None,
+    }
@@ -0,0 +1,190 @@
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import timedelta
+from typing import Dict, Any, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Two-tier cache for parsed Gemini responses: an in-process LRU in front of a DB table.
+
+    Entries are keyed by a fingerprint of the model, the method and its response schema,
+    ``CACHE_VERSION`` and the whitespace-normalized prompt, so switching ``GEMINI_MODEL`` or
+    changing a schema never serves answers written for the old one. Prompts embed the current time floored to ``AI_CACHE_TIME_BUCKET`` seconds, so
+    identical requests inside the same bucket share a fingerprint.
+    """
+
+    # Run DB eviction once every N writes instead of on every write
+    EVICTION_INTERVAL = 100
+    # Bump when the handling of parsed responses changes, so earlier rows stop matching
+    CACHE_VERSION = 2
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._stats = defaultdict(lambda: {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'stores': 0})
+        self._writes_since_eviction = 0
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'AI_CACHE_ENABLED', True)
+
+    @property
+    def ttl(self) -> int:
+        return getattr(settings, 'AI_CACHE_TTL', 3600)
+
+    @property
+    def lru_size(self) -> int:
+        return getattr(settings, 'AI_CACHE_LRU_SIZE', 512)
+
+    @property
+    def max_rows(self) -> int:
+        return getattr(settings, 'AI_CACHE_MAX_ROWS', 10000)
+
+    @classmethod
+    def fingerprint(cls, method: str, prompt: str, model: str = '') -> str:
+        from .schemas import SCHEMA_HINTS
+
+        normalized = ' '.join(prompt.split())
+        parts = (str(cls.CACHE_VERSION), model, method, SCHEMA_HINTS.get(method, ''), normalized)
+        return hashlib.sha256('\x00'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, method: str, prompt: str, count: bool = True, model: str = '') -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached response, or None on a miss; count=False skips the hit/miss stats"""
+        if not self.enabled:
+            return None
+
+        key = self.fingerprint(method, prompt, model)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    if count:
+                        self._stats[method]['memory_hits'] += 1
+                    return copy.deepcopy(value)
+                del self._memory[key]
+
+        value = self._db_get(key)
+        with self._lock:
+            if value is None:
+                if count:
+                    self._stats[method]['misses'] += 1
+                return None
+            if count:
+                self._stats[method]['db_hits'] += 1
+
+        self._remember(key, value)
+        return copy.deepcopy(value)
+
+    def set(self, method: str, prompt: str, value: Dict[str, Any], model: str = '') -> None:
+        if not self.enabled:
+            return
+
+        key = self.fingerprint(method, prompt, model)
+        value = copy.deepcopy(value)
+        self._remember(key, value)
+        self._db_set(key, method, value)
+
+        with self._lock:
+            self._stats[method]['stores'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per method for this process"""
+        with self._lock:
+            methods = {method: dict(counts) for method, counts in self._stats.items()}
+            memory_entries = len(self._memory)
+
+        for counts in methods.values():
+            lookups = counts['memory_hits'] + counts['db_hits'] + counts['misses']
+            hits = counts['memory_hits'] + counts['db_hits']
+            counts['hit_rate'] = round(hits / lookups, 3) if lookups else 0.0
+
+        return {
+            'enabled': self.enabled,
+            'memory_entries': memory_entries,
+            'methods': methods,
+        }
+
+    def clear(self) -> None:
+        from .models import AIResponseCache
+
+        with self._lock:
+            self._memory.clear()
+            self._stats.clear()
+        AIResponseCache.objects.all().delete()
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[key] = (time.time() + self.ttl, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.lru_size:
+                self._memory.popitem(last=False)
+
+    def _db_get(self, key: str) -> Optional[Dict[str, Any]]:
+        from .models import AIResponseCache
+
+        try:
+            row = AIResponseCache.objects.filter(
+                key=key, expires_at__gt=timezone.now()
+            ).only('response').first()
+            if row is None:
+                return None
+            AIResponseCache.objects.filter(pk=row.pk).update(hit_count=F('hit_count') + 1)
+            return row.response
+        except Exception:
+            logger.warning("AI cache read failed", exc_info=True)
+            return None
+
+    def _db_set(self, key: str, method: str, value: Dict[str, Any]) -> None:
+        from .models import AIResponseCache
+
+        try:
+            AIResponseCache.objects.update_or_create(
+                key=key,
+                defaults={
+                    'method': method,
+                    'response': value,
+                    'expires_at': timezone.now() + timedelta(seconds=self.ttl),
+                }
+            )
+        except Exception:
+            logger.warning("AI cache write failed", exc_info=True)
+            return
+
+        with self._lock:
+            self._writes_since_eviction += 1
+            should_evict = self._writes_since_eviction >= self.EVICTION_INTERVAL
+            if should_evict:
+                self._writes_since_eviction = 0
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete expired rows, then the oldest rows beyond AI_CACHE_MAX_ROWS"""
+        from .models import AIResponseCache
+
+        deleted, _ = AIResponseCache.objects.filter(expires_at__lte=timezone.now()).delete()
+
+        overflow_ids = list(
+            AIResponseCache.objects.order_by('-created_at').values_list('id', flat=True)[self.max_rows:]
+        )
+        if overflow_ids:
+            removed, _ = AIResponseCache.objects.filter(id__in=overflow_ids).delete()
+            deleted += removed
+        return deleted
+
+
+response_cache = ResponseCache()
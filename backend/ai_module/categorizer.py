@@ -0,0 +1,249 @@
+import math
+import re
+import threading
+from collections import Counter
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]+")
+STOPWORDS = frozenset("""
+    a an and are as at be by for from has have i in is it its me my of on or our so that the
+    this to up we with will you your do does get go make need needs new next please re via
+""".split())
+
+
+def tokenize(*texts: str) -> List[str]:
+    """Lower-cased word tokens of the given texts, without stopwords and single characters"""
+    tokens = []
+    for text in texts:
+        if text:
+            tokens.extend(
+                token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS
+            )
+    return tokens
+
+
+class NaiveBayesCategorizer:
+    """Multinomial Naive Bayes over task text, trained one document at a time.
+
+    State is just per-category document counts and token counts, so training is an
+    increment, forgetting a document is the matching decrement, and the whole model
+    serializes to two small JSON objects.
+    """
+
+    def __init__(self, doc_counts: Dict[str, int] = None, token_counts: Dict[str, Dict[str, int]] = None):
+        self.doc_counts = dict(doc_counts or {})
+        self.token_counts = {category: dict(counts) for category, counts in (token_counts or {}).items()}
+        self._totals = {category: sum(counts.values()) for category, counts in self.token_counts.items()}
+        self._vocabulary_size = None
+
+    @property
+    def documents(self) -> int:
+        return sum(self.doc_counts.values())
+
+    @property
+    def vocabulary_size(self) -> int:
+        if self._vocabulary_size is None:
+            vocabulary = set()
+            for counts in self.token_counts.values():
+                vocabulary.update(counts)
+            self._vocabulary_size = len(vocabulary)
+        return self._vocabulary_size
+
+    def update(self, tokens: Iterable[str], category: str, weight: int = 1) -> None:
+        """Add (weight 1) or remove (weight -1) one document labelled ``category``"""
+        counts = self.token_counts.setdefault(category, {})
+        for token, count in Counter(tokens).items():
+            value = counts.get(token, 0) + weight * count
+            if value > 0:
+                counts[token] = value
+            else:
+                counts.pop(token, None)
+        self._totals[category] = sum(counts.values())
+
+        documents = self.doc_counts.get(category, 0) + weight
+        if documents > 0:
+            self.doc_counts[category] = documents
+        else:
+            self.doc_counts.pop(category, None)
+            self.token_counts.pop(category, None)
+            self._totals.pop(category, None)
+        self._vocabulary_size = None
+
+    def prune(self, max_features: int) -> None:
+        """Keep only the ``max_features`` most frequent tokens of each category"""
+        for category, counts in self.token_counts.items():
+            if len(counts) > max_features:
+                kept = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:max_features]
+                self.token_counts[category] = dict(kept)
+                self._totals[category] = sum(count for _, count in kept)
+                self._vocabulary_size = None
+
+    def predict(self, tokens: Iterable[str]) -> List[Tuple[str, float]]:
+        """Categories ranked by posterior probability (Laplace smoothed)"""
+        if not self.doc_counts:
+            return []
+
+        token_counts = Counter(tokens)
+        vocabulary = self.vocabulary_size + 1
+        log_documents = math.log(self.documents)
+        scores = {}
+        for category, documents in self.doc_counts.items():
+            counts = self.token_counts.get(category, {})
+            denominator = math.log(self._totals.get(category, 0) + vocabulary)
+            score = math.log(documents) - log_documents
+            for token, count in token_counts.items():
+                score += count * (math.log(counts.get(token, 0) + 1) - denominator)
+            scores[category] = score
+
+        # Normalize the log scores into probabilities without overflowing
+        best = max(scores.values())
+        weights = {category: math.exp(score - best) for category, score in scores.items()}
+        total = sum(weights.values())
+        return sorted(
+            ((category, weight / total) for category, weight in weights.items()),
+            key=lambda item: item[1], reverse=True
+        )
+
+    def top_tokens(self, category: str, tokens: Iterable[str], limit: int = 3) -> List[str]:
+        """The given tokens most strongly associated with ``category``, used as tag suggestions"""
+        counts = self.token_counts.get(category, {})
+        seen = {token for token in tokens if counts.get(token, 0) > 1}
+        return sorted(seen, key=lambda token: counts[token], reverse=True)[:limit]
+
+
+class CategorizerRegistry:
+    """Per-user categorizers persisted in ``CategorizerState`` with a short-lived process cache.
+
+    ``suggest`` answers from the user's model when it is confident enough and returns None
+    otherwise, so the caller can fall back to Gemini; both outcomes are counted so the
+    share of categorizations that still reach the LLM is visible in ``stats()``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = {}
+        self.local_answers = 0
+        self.llm_calls = 0
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'AI_LOCAL_CATEGORIZER_ENABLED', True)
+
+    @property
+    def threshold(self) -> float:
+        return getattr(settings, 'AI_LOCAL_CATEGORIZER_THRESHOLD', 0.8)
+
+    @property
+    def min_documents(self) -> int:
+        return getattr(settings, 'AI_LOCAL_CATEGORIZER_MIN_DOCUMENTS', 10)
+
+    def get(self, user_id: int) -> NaiveBayesCategorizer:
+        ttl = getattr(settings, 'AI_LOCAL_CATEGORIZER_CACHE_SECONDS', 60)
+        cached = self._cache.get(user_id)
+        if cached is not None and monotonic() - cached[0] < ttl:
+            return cached[1]
+
+        from .models import CategorizerState
+
+        state = CategorizerState.objects.filter(user_id=user_id).first()
+        categorizer = state.to_categorizer() if state else NaiveBayesCategorizer()
+        with self._lock:
+            self._cache[user_id] = (monotonic(), categorizer)
+        return categorizer
+
+    def learn(self, user_id: int, text_tokens: List[str], category: str, weight: int = 1) -> None:
+        """Apply one training update to the stored model under a row lock"""
+        self.learn_many(user_id, [(text_tokens, category, weight)])
+
+    def learn_many(self, user_id: int, updates: List[Tuple[List[str], str, int]]) -> None:
+        """Apply ``(tokens, category, weight)`` updates to the stored model in one locked write"""
+        from .models import CategorizerState
+
+        with transaction.atomic():
+            states = CategorizerState.objects.select_for_update()
+            if any(weight > 0 for _, _, weight in updates):
+                state, _ = states.get_or_create(user_id=user_id)
+            else:
+                # Forgetting never creates state (e.g. while the user is being deleted)
+                state = states.filter(user_id=user_id).first()
+                if state is None:
+                    return
+            categorizer = state.to_categorizer()
+            for text_tokens, category, weight in updates:
+                categorizer.update(text_tokens, category, weight)
+            categorizer.prune(getattr(settings, 'AI_LOCAL_CATEGORIZER_MAX_FEATURES', 2000))
+            state.update_from(categorizer)
+            state.save()
+        with self._lock:
+            self._cache[user_id] = (monotonic(), categorizer)
+
+    def suggest(self, user_id: Optional[int], task_title: str, task_description: str,
+                existing_categories: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """A categorization from the user's own history, or None when Gemini should decide"""
+        if not user_id or not self.enabled:
+            return None
+
+        categorizer = self.get(user_id)
+        if categorizer.documents < self.min_documents or len(categorizer.doc_counts) < 2:
+            return None
+
+        tokens = tokenize(task_title, task_description)
+        ranked = categorizer.predict(tokens)
+        if existing_categories is not None:
+            allowed = set(existing_categories)
+            ranked = [(category, probability) for category, probability in ranked if category in allowed]
+        if not tokens or not ranked or ranked[0][1] < self.threshold:
+            return None
+
+        category, probability = ranked[0]
+        return {
+            'suggested_category': category,
+            'confidence': round(probability, 3),
+            'alternative_categories': [name for name, _ in ranked[1:3]],
+            'suggested_tags': categorizer.top_tokens(category, tokens),
+            'reasoning': f"Matches {categorizer.doc_counts[category]} of your previous tasks in {category}",
+            'source': 'local',
+        }
+
+    def prompt_categories(self, user_id: Optional[int], task_title: str, task_description: str,
+                          existing_categories: Optional[List[str]]) -> List[str]:
+        """Existing categories for a Gemini prompt, the user's likeliest first and capped in size"""
+        categories = list(existing_categories or [])
+        if user_id and self.enabled:
+            ranked = [
+                category for category, _ in
+                self.get(user_id).predict(tokenize(task_title, task_description))
+            ]
+            known = set(categories)
+            leading = [category for category in ranked if category in known]
+            seen = set(leading)
+            categories = leading + [category for category in categories if category not in seen]
+        return categories[:getattr(settings, 'AI_CATEGORIZER_PROMPT_CATEGORIES', 20)]
+
+    def record(self, local: bool) -> None:
+        with self._lock:
+            if local:
+                self.local_answers += 1
+            else:
+                self.llm_calls += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache = {}
+
+    def stats(self) -> dict:
+        total = self.local_answers + self.llm_calls
+        return {
+            'enabled': self.enabled,
+            'cached_users': len(self._cache),
+            'local_answers': self.local_answers,
+            'llm_calls': self.llm_calls,
+            'llm_call_rate': round(self.llm_calls / total, 3) if total else None,
+        }
+
+
+categorizer_registry = CategorizerRegistry()
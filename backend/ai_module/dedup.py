@@ -0,0 +1,140 @@
+import hashlib
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+
+BANDS = 4
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# Entries shorter than this must match exactly; a few words give SimHash too little signal
+MIN_FUZZY_TOKENS = 8
+
+# Chat-export and forwarding noise that differs between copies of the same message
+NOISE_PATTERNS = [
+    re.compile(r'^\[?\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4},?\s+\d{1,2}:\d{2}(:\d{2})?\s*([ap]m)?\]?\s*(-\s*)?[^:\n]{0,40}:\s*',
+               re.IGNORECASE | re.MULTILINE),
+    re.compile(r'^\s*(>+|(fwd?|re):|forwarded( message)?)\s*', re.IGNORECASE | re.MULTILINE),
+]
+TOKEN_PATTERN = re.compile(r'\w+')
+NUMBER_PATTERN = re.compile(r'\d+')
+SHINGLE_SIZE = 4
+
+
+def normalize(text: str) -> List[str]:
+    for pattern in NOISE_PATTERNS:
+        text = pattern.sub('', text)
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def fingerprint(text: str) -> int:
+    """64-bit SimHash of the normalized text's character shingles, signed to fit a BigIntegerField"""
+    normalized = ' '.join(normalize(text or ''))
+    if not normalized:
+        return 0
+    features = [
+        normalized[index:index + SHINGLE_SIZE]
+        for index in range(max(len(normalized) - SHINGLE_SIZE + 1, 1))
+    ]
+
+    digests = b''.join(hashlib.blake2b(feature.encode(), digest_size=8).digest() for feature in features)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(len(features), 64)
+    # Each feature votes +1/-1 per bit; the fingerprint keeps the sign of the tally
+    votes = bits.sum(axis=0) * 2 > len(features)
+    value = int(np.packbits(votes).view('>u8')[0])
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def bands(value: int) -> Tuple[int, ...]:
+    """Split a fingerprint into BANDS fixed-width bands for indexed lookup.
+
+    Two fingerprints within BANDS - 1 bits of each other agree on at least one band, so
+    near-duplicate candidates can be found with equality lookups on indexed band columns.
+    """
+    unsigned = value & ((1 << 64) - 1)
+    return tuple((unsigned >> (BAND_BITS * index)) & BAND_MASK for index in range(BANDS))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & ((1 << 64) - 1)).count('1')
+
+
+def band_filter(fingerprints: Iterable[int], prefix: str = 'simhash_band') -> Q:
+    """Q matching rows that share at least one band with any of the fingerprints"""
+    values = [set() for _ in range(BANDS)]
+    for value in fingerprints:
+        for index, band in enumerate(bands(value)):
+            values[index].add(band)
+    condition = Q()
+    for index, band_values in enumerate(values):
+        if band_values:
+            condition |= Q(**{f"{prefix}{index}__in": band_values})
+    return condition
+
+
+def closest(entry, candidates: Iterable) -> Optional[object]:
+    """The candidate entry nearest to ``entry`` that counts as its duplicate, if any.
+
+    Short texts must fingerprint identically; longer ones may differ by up to
+    ``AI_DEDUP_MAX_DISTANCE`` bits. Either way the numbers in both texts must match, so
+    templated messages that differ only in a date, time or amount are not merged.
+    """
+    fuzzy = len(normalize(entry.content or '')) >= MIN_FUZZY_TOKENS
+    limit = min(getattr(settings, 'AI_DEDUP_MAX_DISTANCE', 3), BANDS - 1) if fuzzy else 0
+    numbers = NUMBER_PATTERN.findall(entry.content or '')
+
+    best, best_distance = None, limit + 1
+    for candidate in candidates:
+        if candidate.simhash is None or candidate.user_id != entry.user_id:
+            continue
+        distance = hamming(entry.simhash, candidate.simhash)
+        if distance < best_distance and NUMBER_PATTERN.findall(candidate.content or '') == numbers:
+            best, best_distance = candidate, distance
+    return best
+
+
+def split_repeats(entries: List) -> Tuple[List, Dict[object, List]]:
+    """Group near-duplicates within a batch behind their first occurrence.
+
+    Returns the representatives and a map from representative pk to its repeats.
+    """
+    representatives, repeats = [], {}
+    for entry in entries:
+        original = closest(entry, representatives)
+        if original is None:
+            representatives.append(entry)
+        else:
+            repeats.setdefault(original.pk, []).append(entry)
+    return representatives, repeats
+
+
+class DedupStats:
+    """Counts near-duplicate entries and the Gemini calls avoided by reusing their analyses"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+        self.llm_calls_saved = 0
+
+    def record(self, checked: int, duplicates: int, llm_calls_saved: int) -> None:
+        with self._lock:
+            self.checked += checked
+            self.duplicates += duplicates
+            self.llm_calls_saved += llm_calls_saved
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'enabled': getattr(settings, 'AI_DEDUP_ENABLED', True),
+            'checked': self.checked,
+            'duplicates': self.duplicates,
+            'duplicate_rate': round(self.duplicates / self.checked, 3) if self.checked else None,
+            'llm_calls_saved': self.llm_calls_saved,
+        }
+
+
+dedup_stats = DedupStats()
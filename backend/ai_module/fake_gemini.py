@@ -0,0 +1,179 @@
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from .schemas import SCHEMA_HINTS, SCHEMAS
+
+ENTRY_ID_PATTERN = re.compile(r'\[(?:id|block)=(\d+)\]')
+TASK_ID_PATTERN = re.compile(r'"id":\s*"?(\d+)"?')
+CATEGORIES_PATTERN = re.compile(r'Existing Categories:[ \t]*([^\n]+)')
+DEFAULT_CATEGORIES = ['Work', 'Personal', 'Health', 'Finance']
+
+COMBINED_MARKER = 'Respond with a single JSON object'
+
+ERROR_STATUSES = {429: 'RESOURCE_EXHAUSTED', 500: 'INTERNAL', 503: 'UNAVAILABLE'}
+
+
+def detect_method(prompt: str) -> Optional[str]:
+    """Recover which client method built the prompt from the schema hint it embeds"""
+    if COMBINED_MARKER in prompt:
+        # Combined task analysis; its hint nests the per-section hints and may omit some
+        return 'analyze_task'
+    for method, hint in SCHEMA_HINTS.items():
+        if hint in prompt:
+            return method
+    return None
+
+
+class ResponseTemplater:
+    """Builds schema-valid, plausible responses, echoing the ids found in the prompt"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.categories = DEFAULT_CATEGORIES
+
+    def build(self, method: str, prompt: str) -> Dict[str, Any]:
+        match = CATEGORIES_PATTERN.search(prompt)
+        if match:
+            self.categories = [name.strip() for name in match.group(1).split(',') if name.strip()] or DEFAULT_CATEGORIES
+        ids = ENTRY_ID_PATTERN.findall(prompt) or TASK_ID_PATTERN.findall(prompt) or ['1']
+        value = self._value(SCHEMAS[method], '', ids)
+        if method == 'analyze_context_batch':
+            value['results'] = [self._value(SCHEMAS[method]['properties']['results']['items'], '', [entry_id])
+                                for entry_id in ids]
+        return value
+
+    def _value(self, schema: Dict[str, Any], name: str, ids: List[str]) -> Any:
+        kind = schema['type']
+        if kind == 'object':
+            return {key: self._value(prop, key, ids) for key, prop in schema['properties'].items()}
+        if kind == 'array':
+            if name in ('prioritized_tasks', 'schedule', 'time_blocks', 'tasks', 'blocks'):
+                return [self._value(schema['items'], name, [item_id]) for item_id in ids[:8]]
+            return [self._value(schema['items'], name, ids) for _ in range(self.rng.randint(1, 3))]
+        if kind == 'number':
+            return round(self.rng.uniform(0.3, 0.95), 2)
+        if kind == 'integer':
+            return int(ids[0]) if name in ('id', 'index') else self.rng.choice([15, 30, 45, 60, 90])
+        if 'enum' in schema:
+            return self.rng.choice(schema['enum'])
+        return self._string(name, ids)
+
+    def _string(self, name: str, ids: List[str]) -> str:
+        now = datetime.now()
+        if name.endswith('id'):
+            return ids[0]
+        if 'deadline' in name:
+            return (now + timedelta(days=self.rng.randint(1, 10))).replace(microsecond=0).isoformat()
+        if name in ('start_time', 'end_time', 'time_slot'):
+            hour = self.rng.randint(8, 16)
+            return f"{hour:02d}:00-{hour + 1:02d}:00" if name == 'time_slot' else f"{hour:02d}:00"
+        if 'duration' in name:
+            return f"{self.rng.randint(1, 4)} hours"
+        if 'categor' in name:
+            return self.rng.choice(self.categories)
+        return f"Load-test {name.replace('_', ' ') or 'value'} {self.rng.randint(1, 999)}"
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    """Local stand-in for the Gemini REST API (``generateContent`` and ``streamGenerateContent``).
+
+    Latency per request is log-normal around ``latency_ms`` with shape ``latency_sigma``;
+    ``error_rate`` of the requests fail with ``error_status``. Streamed responses are split
+    into ``stream_chunks`` pieces spread across the latency.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms: float = 800, latency_sigma: float = 0.4, error_rate: float = 0.0,
+                 error_status: int = 503, stream_chunks: int = 4, seed: Optional[int] = None):
+        super().__init__(address, FakeGeminiHandler)
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stream_chunks = max(stream_chunks, 1)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def next_request(self):
+        """Draw the latency (seconds), error flag and a response RNG for one request"""
+        with self._lock:
+            self.requests += 1
+            latency = self._rng.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000 \
+                if self.latency_ms > 0 else 0
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return latency, failed, random.Random(self._rng.random())
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0]
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._error(400, 'INVALID_ARGUMENT', 'Request body is not JSON')
+        if not (path.endswith(':generateContent') or path.endswith(':streamGenerateContent')):
+            return self._error(404, 'NOT_FOUND', f"Unknown method {path}")
+
+        latency, failed, rng = self.server.next_request()
+        if failed:
+            time.sleep(latency)
+            status = self.server.error_status
+            return self._error(status, ERROR_STATUSES.get(status, 'UNKNOWN'), 'Injected failure')
+
+        prompt = ''.join(
+            part.get('text', '') for content in body.get('contents', []) for part in content.get('parts', [])
+        )
+        method = detect_method(prompt)
+        text = json.dumps(ResponseTemplater(rng).build(method, prompt)) if method else '{}'
+
+        if path.endswith(':generateContent'):
+            time.sleep(latency)
+            return self._send_json(200, json.dumps(self._candidate(text)).encode())
+
+        # Streamed: a JSON array of partial responses, written piece by piece
+        size = -(-len(text) // self.server.stream_chunks)
+        pieces = [text[index:index + size] for index in range(0, len(text), size)] or ['']
+        payloads = [json.dumps(self._candidate(piece)) for piece in pieces]
+        chunks = [('[' if index == 0 else ',\r\n') + payload for index, payload in enumerate(payloads)]
+        chunks[-1] += ']'
+        encoded = [chunk.encode() for chunk in chunks]
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(sum(len(chunk) for chunk in encoded)))
+        self.end_headers()
+        for chunk in encoded:
+            time.sleep(latency / len(encoded))
+            self.wfile.write(chunk)
+            self.wfile.flush()
+
+    @staticmethod
+    def _candidate(text: str) -> Dict[str, Any]:
+        return {'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'}, 'finishReason': 1, 'index': 0}]}
+
+    def _error(self, code: int, status: str, message: str):
+        self._send_json(code, json.dumps({'error': {'code': code, 'message': message, 'status': status}}).encode())
+
+    def _send_json(self, code: int, payload: bytes):
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
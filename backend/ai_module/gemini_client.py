@@ -1,24 +1,410 @@
-import google.generativeai as genai
+import google.ai.generativelanguage as glm
 from django.conf import settings
+from django.db import connection
 import json
-import re
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from time import monotonic
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple
+from .budget import PromptBudget, context_relevance, estimate_tokens, task_relevance
+from .cache import response_cache
+from .categorizer import categorizer_registry
+from .metrics import metrics
+from .pool import model_pool
+from .resilience import UpstreamUnavailable, upstream
+from .scheduler import build_time_blocks
+from .schemas import SCHEMAS, SCHEMA_HINTS, conform, extract_json, schema_hint
+from .singleflight import single_flight
+from .streaming import IncrementalJSONParser
+
+logger = logging.getLogger(__name__)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_GENERATION_CONFIG_FIELDS = set(glm.GenerationConfig.meta.fields)
+
+TASK_ANALYSIS_MODES = ('parallel', 'combined', 'sequential')
+
+
+def resolve_analysis_mode(endpoint: str, requested: Optional[str] = None) -> str:
+    """Pick the task analysis mode for an endpoint, honouring a valid per-request override"""
+    if requested in TASK_ANALYSIS_MODES:
+        return requested
+    modes = getattr(settings, 'AI_TASK_ANALYSIS_MODES', {})
+    mode = modes.get(endpoint, 'parallel')
+    return mode if mode in TASK_ANALYSIS_MODES else 'parallel'
+
+
+def structured_output_config(method: str) -> Optional[Dict[str, Any]]:
+    """Generation config enabling JSON mode and the method's response schema, where supported.
+    
+    Older google-generativeai releases have no structured-output fields; prompts still carry
+    a compact schema hint and responses are validated either way.
+    """
+    schema = SCHEMAS.get(method)
+    if (schema is None or not getattr(settings, 'AI_STRUCTURED_OUTPUT', True)
+            or 'response_mime_type' not in _GENERATION_CONFIG_FIELDS):
+        return None
+    config = {'response_mime_type': 'application/json'}
+    if 'response_schema' in _GENERATION_CONFIG_FIELDS:
+        config['response_schema'] = schema
+    return config
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Shared thread pool used to fan out independent Gemini calls"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'AI_PARALLEL_WORKERS', 8),
+                    thread_name_prefix='gemini'
+                )
+    return _executor
+
+
+def _run_in_worker(func: Callable, *args, **kwargs):
+    """Run func in a pool thread, closing the thread's DB connection afterwards"""
+    try:
+        return func(*args, **kwargs)
+    finally:
+        connection.close()
 
 
 class GeminiAIClient:
     """Gemini AI client for Smart Todo List features"""
     
-    def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        # self.model = genai.GenerativeModel('gemini-1.5-flash')
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+    def __init__(self, model_name: Optional[str] = None, api_key: Optional[str] = None):
+        # Models and transports are shared process-wide, so construction is cheap
+        self.model_name = model_name or getattr(settings, 'GEMINI_MODEL', 'gemini-2.0-flash')
+        self.model = model_pool.get_model(self.model_name, api_key)
+        self._usage_lock = threading.Lock()
+        self.upstream_calls = 0
+        self.prompt_chars_sent = 0
+        self.last_budget = None
+    
+    def _current_datetime(self) -> datetime:
+        """Current time floored to the cache bucket so prompts within a bucket are identical"""
+        bucket = max(int(getattr(settings, 'AI_CACHE_TIME_BUCKET', 300)), 1)
+        return datetime.fromtimestamp(datetime.now().timestamp() // bucket * bucket)
+    
+    def _generate_json(self, method: str, prompt: str, fallback: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Run a prompt through the response cache and Gemini, returning parsed JSON or the fallback"""
+        
+        cached = response_cache.get(method, prompt, model=self.model_name)
+        if cached is not None:
+            metrics.increment(method, 'cache_hits')
+            return cached
+        
+        # Identical requests already in flight share that call's result
+        return single_flight.do(
+            method, prompt, lambda: self._call_upstream(method, prompt, fallback), model=self.model_name
+        )
+    
+    def _call_upstream(self, method: str, prompt: str, fallback: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        try:
+            with self._usage_lock:
+                self.upstream_calls += 1
+                self.prompt_chars_sent += len(prompt)
+            started = monotonic()
+            with upstream.call(method):
+                response = self.model.generate_content(
+                    prompt, generation_config=structured_output_config(method)
+                )
+            metrics.observe(method, monotonic() - started, prompt, response.text)
+            result = self._parse_response(method, response.text, fallback)
+            if result is None:
+                return self._fallback(method, fallback, 'parse_failures')
+            response_cache.set(method, prompt, result, model=self.model_name)
+            return result
+        except UpstreamUnavailable:
+            return self._fallback(method, fallback, 'rejected')
+        except Exception:
+            logger.exception("Error in %s", method)
+            return self._fallback(method, fallback, 'errors')
+    
+    @staticmethod
+    def _fallback(method: str, fallback: Callable[[], Dict[str, Any]], reason: str) -> Dict[str, Any]:
+        """Count why a request fell back to its default result, then build that result"""
+        metrics.increment(method, reason)
+        metrics.increment(method, 'fallbacks')
+        return fallback()
+    
+    def _parse_response(self, method: str, text: str,
+                        fallback: Callable[[], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Extract, validate and repair a JSON response; None means use the fallback"""
+        
+        data = extract_json(text)
+        schema = SCHEMAS.get(method)
+        if data is None or schema is None:
+            return data
+        
+        data, errors = conform(data, schema)
+        if data is None:
+            return None
+        
+        required = schema.get('required', [])
+        missing = [key for key in required if key not in data]
+        if required and len(missing) == len(required):
+            logger.warning("Discarding %s response: %s", method, errors[:5])
+            return None
+        if missing:
+            # Fill missing required members from the fallback instead of dropping the response
+            defaults = fallback()
+            for key in missing:
+                if key in defaults:
+                    data[key] = defaults[key]
+        return data
+    
+    def _stream_json(self, method: str, prompt: str, array_keys: Tuple[str, ...],
+                     fallback: Callable[[], Dict[str, Any]]) -> Iterator[Tuple[str, Any]]:
+        """Stream a prompt, yielding ('item', {...}) for each completed element of ``array_keys``
+        as soon as it is parsed and conformed to its schema, then ('result', {...}) with the full
+        response or the fallback. If the stream fails after items were sent, an ('error', {...})
+        event precedes the fallback result, which replaces those items.
+        """
+        
+        cached = response_cache.get(method, prompt, model=self.model_name)
+        if cached is not None:
+            metrics.increment(method, 'cache_hits')
+            for key in array_keys:
+                for item in cached.get(key) or []:
+                    yield 'item', {'key': key, 'item': item}
+            yield 'result', cached
+            return
+        
+        properties = SCHEMAS.get(method, {}).get('properties', {})
+        item_schemas = {key: properties[key]['items'] for key in array_keys if 'items' in properties.get(key, {})}
+        parser = IncrementalJSONParser(array_keys)
+        emitted = 0
+        reason = 'parse_failures'
+        try:
+            with self._usage_lock:
+                self.upstream_calls += 1
+                self.prompt_chars_sent += len(prompt)
+            started = monotonic()
+            with upstream.call(method):
+                chunks = self.model.generate_content(
+                    prompt, generation_config=structured_output_config(method), stream=True
+                )
+                for chunk in chunks:
+                    for key, item in parser.feed(chunk.text):
+                        if key in item_schemas:
+                            # Items that cannot be repaired are dropped, as from the final result
+                            item, _ = conform(item, item_schemas[key])
+                            if item is None:
+                                continue
+                        emitted += 1
+                        yield 'item', {'key': key, 'item': item}
+            metrics.observe(method, monotonic() - started, prompt, parser.buffer)
+            
+            result = self._parse_response(method, parser.buffer, fallback)
+            if result is not None:
+                response_cache.set(method, prompt, result, model=self.model_name)
+                yield 'result', result
+                return
+        except UpstreamUnavailable:
+            reason = 'rejected'
+        except Exception:
+            logger.exception("Error in %s stream", method)
+            reason = 'errors'
+        
+        # Only replay fallback items if nothing was streamed, to avoid mixing the two
+        result = self._fallback(method, fallback, reason)
+        if emitted:
+            yield 'error', {'reason': reason, 'discarded_items': emitted, 'fallback': True}
+        else:
+            for key in array_keys:
+                for item in result.get(key) or []:
+                    yield 'item', {'key': key, 'item': item}
+        yield 'result', result
+    
+    def run_parallel(self, calls: Dict[str, tuple], timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Run independent client calls concurrently and join them.
+        
+        ``calls`` maps a result name to ``(callable, args, fallback)``. Each call gets its own
+        fallback if it raises or does not finish within ``timeout`` seconds overall.
+        """
+        if timeout is None:
+            timeout = getattr(settings, 'AI_CALL_TIMEOUT', 20)
+        
+        executor = get_executor()
+        futures = {
+            name: executor.submit(_run_in_worker, func, *args)
+            for name, (func, args, fallback) in calls.items()
+        }
+        
+        deadline = monotonic() + timeout
+        results = {}
+        for name, future in futures.items():
+            func, _, fallback = calls[name]
+            method = getattr(func, '__name__', name)
+            try:
+                results[name] = future.result(timeout=max(deadline - monotonic(), 0))
+            except FutureTimeoutError:
+                logger.warning("AI call %s timed out after %ss", name, timeout)
+                future.cancel()
+                results[name] = self._fallback(method, fallback, 'timeouts')
+            except Exception:
+                logger.exception("AI call %s failed", name)
+                results[name] = self._fallback(method, fallback, 'errors')
+        return results
+    
+    def analyze_task_parallel(self, task_title: str, task_description: str,
+                              context_data: List[Dict] = None, existing_categories: List[str] = None,
+                              include_deadline: bool = True, include_categorization: bool = True,
+                              timeout: Optional[float] = None, user_id: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Enhance, suggest a deadline and categorize a task with concurrent Gemini calls"""
+        
+        calls = {
+            'enhancement': (
+                self.enhance_task_description,
+                (task_title, task_description, context_data),
+                lambda: self._default_enhancement(task_description)
+            ),
+        }
+        if include_deadline:
+            calls['deadline_suggestion'] = (
+                self.suggest_deadline,
+                (task_title, task_description, context_data),
+                self._default_deadline_suggestion
+            )
+        if include_categorization:
+            calls['categorization'] = (
+                self.categorize_task,
+                (task_title, task_description, existing_categories, user_id),
+                self._default_categorization
+            )
+        
+        results = self.run_parallel(calls, timeout=timeout)
+        results.setdefault('deadline_suggestion', {})
+        results.setdefault('categorization', {})
+        return results
+    
+    def analyze_task(self, task_title: str, task_description: str, context_data: List[Dict] = None,
+                     existing_categories: List[str] = None, include_deadline: bool = True,
+                     include_categorization: bool = True, user_id: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Enhance, suggest a deadline and categorize a task from a single structured prompt"""
+        
+        local_categorization = None
+        if include_categorization:
+            local_categorization = categorizer_registry.suggest(
+                user_id, task_title, task_description, existing_categories
+            )
+            categorizer_registry.record(local_categorization is not None)
+            if local_categorization is not None:
+                include_categorization = False
+            else:
+                existing_categories = categorizer_registry.prompt_categories(
+                    user_id, task_title, task_description, existing_categories
+                )
+        
+        # Get current date and time
+        current_datetime = self._current_datetime()
+        
+        budget = PromptBudget('analyze_task')
+        context_summary = self._context_summary(budget, context_data, limit=3)
+        self._finish_budget(budget)
+        
+        sections = {'enhancement': SCHEMAS['enhance_task_description']}
+        if include_deadline:
+            sections['deadline_suggestion'] = SCHEMAS['suggest_deadline']
+        if include_categorization:
+            sections['categorization'] = SCHEMAS['categorize_task']
+        sections_hint = schema_hint({'type': 'object', 'properties': sections})
+        
+        prompt = f"""
+        CURRENT DATE AND TIME: {current_datetime.strftime("%Y-%m-%d %H:%M:%S")} (Use this as reference)
+        
+        Analyze the following task:
+        
+        Task: {task_title}
+        Description: {task_description}
+        
+        Recent Context:
+        {context_summary}
+        
+        Existing Categories: {', '.join(existing_categories or [])}
+        
+        Respond with a single JSON object matching this schema:
+        {sections_hint}
+        
+        Make the description actionable and concise. Deadlines must be AFTER {current_datetime.strftime("%Y-%m-%d %H:%M:%S")}.
+        If the task fits an existing category, prefer that.
+        """
+        
+        fallbacks = {
+            'enhancement': (lambda: self._default_enhancement(task_description), 'enhanced_description'),
+            'deadline_suggestion': (self._default_deadline_suggestion, 'suggested_deadline'),
+            'categorization': (self._default_categorization, 'suggested_category'),
+        }
+        
+        response = self._generate_json('analyze_task', prompt, lambda: {})
+        
+        # Fall back per section so one malformed part does not discard the others
+        results = {'deadline_suggestion': {}, 'categorization': {}}
+        for name in sections:
+            fallback, required_key = fallbacks[name]
+            section = response.get(name)
+            if isinstance(section, dict) and section.get(required_key):
+                results[name] = section
+            else:
+                if response:
+                    metrics.increment('analyze_task', 'partial_fallbacks')
+                results[name] = fallback()
+        if local_categorization is not None:
+            results['categorization'] = local_categorization
+        return results
+    
+    def analyze_task_bundle(self, mode: str, task_title: str, task_description: str,
+                            context_data: List[Dict] = None, existing_categories: List[str] = None,
+                            include_deadline: bool = True, include_categorization: bool = True,
+                            user_id: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Run task analysis in the given mode and attach latency and prompt-size usage"""
+        
+        started = monotonic()
+        calls_before, chars_before = self.upstream_calls, self.prompt_chars_sent
+        
+        kwargs = {
+            'context_data': context_data,
+            'existing_categories': existing_categories,
+            'include_deadline': include_deadline,
+            'include_categorization': include_categorization,
+            'user_id': user_id,
+        }
+        if mode == 'combined':
+            results = self.analyze_task(task_title, task_description, **kwargs)
+        elif mode == 'sequential':
+            results = {
+                'enhancement': self.enhance_task_description(task_title, task_description, context_data),
+                'deadline_suggestion': self.suggest_deadline(
+                    task_title, task_description, context_data
+                ) if include_deadline else {},
+                'categorization': self.categorize_task(
+                    task_title, task_description, existing_categories, user_id
+                ) if include_categorization else {},
+            }
+        else:
+            results = self.analyze_task_parallel(task_title, task_description, **kwargs)
+        
+        results['usage'] = {
+            'mode': mode,
+            'latency_ms': round((monotonic() - started) * 1000, 1),
+            'upstream_calls': self.upstream_calls - calls_before,
+            'prompt_chars': self.prompt_chars_sent - chars_before,
+        }
+        return results
     
     def analyze_context(self, context_content: str, source_type: str) -> Dict[str, Any]:
         """Advanced context analysis with sentiment analysis and keyword extraction"""
         
         # Get current date and time
-        current_datetime = datetime.now()
+        current_datetime = self._current_datetime()
         
         prompt = f"""
         CURRENT DATE AND TIME: {current_datetime.strftime("%Y-%m-%d %H:%M:%S")} (Use this as reference for time-sensitive analysis)
@@ -27,62 +413,8 @@ class GeminiAIClient:
         
         Content: "{context_content}"
         
-        Please provide a comprehensive JSON response with the following structure:
-        {{
-            "keywords": ["extracted", "relevant", "keywords", "from", "content"],
-            "sentiment_analysis": {{
-                "overall_sentiment": "positive|negative|neutral",
-                "sentiment_score": 0.5,
-                "emotional_indicators": ["stressed", "excited", "urgent", "calm"],
-                "confidence": 0.9
-            }},
-            "urgency_analysis": {{
-                "urgency_level": "low|medium|high|critical",
-                "urgency_score": 0.7,
-                "urgency_indicators": ["urgent", "asap", "deadline", "immediately"],
-                "time_sensitivity": "immediate|today|this_week|flexible"
-            }},
-            "context_classification": {{
-                "primary_category": "work|personal|health|finance|social|education",
-                "subcategories": ["meeting", "project", "appointment"],
-                "relevance_score": 0.8
-            }},
-            "task_extraction": {{
-                "potential_tasks": [
-                    {{
-                        "title": "Extracted task title",
-                        "description": "Task description",
-                        "priority": "low|medium|high|urgent",
-                        "category": "suggested category",
-                        "deadline": "2024-01-15T10:00:00Z",
-                        "confidence": 0.8
-                    }}
-                ]
-            }},
-            "insights": [
-                {{
-                    "type": "deadline|priority|category|task_creation|schedule|reminder|pattern",
-                    "title": "Brief insight title",
-                    "description": "Detailed description with context",
-                    "confidence": 0.9,
-                    "impact": "high|medium|low",
-                    "suggested_action": {{
-                        "action_type": "create_task|update_priority|set_deadline|schedule_reminder",
-                        "details": "specific action details",
-                        "parameters": {{}}
-                    }}
-                }}
-            ],
-            "task_suggestions": [
-                {{
-                    "title": "Suggested task title",
-                    "description": "Task description",
-                    "priority": "high|medium|low",
-                    "category": "suggested category",
-                    "deadline": "2024-01-15T10:00:00Z or null"
-                }}
-            ]
-        }}
+        Respond with JSON matching this schema:
+        {SCHEMA_HINTS['analyze_context']}
         
         Focus on:
         1. Identifying deadlines, meetings, appointments
@@ -92,32 +424,113 @@ class GeminiAIClient:
         5. Suggesting relevant categories
         """
         
-        try:
-            response = self.model.generate_content(prompt)
-            # Extract JSON from response
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return self._default_context_analysis()
-        except Exception as e:
-            print(f"Error analyzing context: {e}")
-            return self._default_context_analysis()
+        return self._generate_json(
+            'analyze_context', prompt, lambda: self._default_context_analysis()
+        )
+    
+    def analyze_context_batch(self, entries: List[Dict]) -> Dict[Any, Dict[str, Any]]:
+        """Analyze many context entries with as few prompts as the token budget allows.
+        
+        ``entries`` are dicts with ``id``, ``content`` and ``source_type``. Returns a mapping of
+        entry id to analysis. Entries missing or malformed in a batch response are retried
+        individually with ``analyze_context``, which applies its own fallback.
+        """
+        results = {}
+        for batch in self._pack_context_batches(entries):
+            if len(batch) == 1:
+                entry = batch[0]
+                results[entry['id']] = self.analyze_context(entry['content'], entry['source_type'])
+                continue
+            
+            response = self._generate_json('analyze_context_batch', self._context_batch_prompt(batch), lambda: {})
+            items = response.get('results') if isinstance(response.get('results'), list) else []
+            by_id = {
+                str(item.get('id')): item
+                for item in items
+                if isinstance(item, dict)
+            }
+            
+            for entry in batch:
+                item = by_id.get(str(entry['id']))
+                if self._is_valid_batch_item(item):
+                    analysis = self._default_context_analysis()
+                    analysis.update({key: value for key, value in item.items() if key != 'id'})
+                    results[entry['id']] = analysis
+                else:
+                    results[entry['id']] = self.analyze_context(entry['content'], entry['source_type'])
+        return results
+    
+    def _pack_context_batches(self, entries: List[Dict]) -> List[List[Dict]]:
+        """Group entries into batches bounded by AI_BATCH_TOKEN_BUDGET and AI_BATCH_MAX_ENTRIES"""
+        token_budget = getattr(settings, 'AI_BATCH_TOKEN_BUDGET', 6000)
+        max_entries = getattr(settings, 'AI_BATCH_MAX_ENTRIES', 20)
+        
+        batches, current, used = [], [], 0
+        for entry in entries:
+            # Per-entry framing (id, source, quotes) costs roughly 15 tokens
+            cost = estimate_tokens(entry['content']) + 15
+            if current and (used + cost > token_budget or len(current) >= max_entries):
+                batches.append(current)
+                current, used = [], 0
+            current.append(entry)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _context_batch_prompt(self, batch: List[Dict]) -> str:
+        current_datetime = self._current_datetime()
+        
+        entries_block = "\n".join([
+            f"[id={entry['id']}] ({entry['source_type']}) {json.dumps(entry['content'])}"
+            for entry in batch
+        ])
+        
+        return f"""
+        CURRENT DATE AND TIME: {current_datetime.strftime("%Y-%m-%d %H:%M:%S")} (Use this as reference for time-sensitive analysis)
+        
+        Analyze each of the following {len(batch)} context entries for intelligent task management:
+        
+        {entries_block}
+        
+        Respond with JSON matching this schema, with exactly one result per entry using the entry id:
+        {SCHEMA_HINTS['analyze_context_batch']}
+        """
+    
+    @staticmethod
+    def _is_valid_batch_item(item: Optional[Dict]) -> bool:
+        if not isinstance(item, dict):
+            return False
+        if not isinstance(item.get('keywords', []), list):
+            return False
+        return isinstance(item.get('relevance_score'), (int, float))
+    
+    def _context_summary(self, budget: PromptBudget, context_data: Optional[List[Dict]],
+                         limit: Optional[int] = None, share: float = 1.0) -> str:
+        """Render the most relevant context snippets that fit the budget"""
+        render = lambda ctx: f"- {ctx.get('content', '')[:100]}"
+        selected = budget.fill('context', context_data or [], render, score=context_relevance, limit=limit, share=share)
+        return "\n".join([render(ctx) for ctx in selected])
+    
+    def _finish_budget(self, budget: PromptBudget) -> None:
+        budget.log()
+        self.last_budget = budget.summary()
     
     def prioritize_tasks(self, tasks_data: List[Dict], context_data: List[Dict] = None) -> Dict[str, Any]:
         """AI-powered task prioritization based on context"""
         
         # Get current date and time
-        current_datetime = datetime.now()
+        current_datetime = self._current_datetime()
         
-        context_summary = ""
-        if context_data:
-            context_summary = "\n".join([f"- {ctx.get('content', '')[:100]}" for ctx in context_data[-5:]])
+        budget = PromptBudget('prioritize_tasks')
+        context_summary = self._context_summary(budget, context_data, limit=5, share=0.3)
         
+        render_task = lambda task: f"- {task.get('title', '')}: {task.get('description', '')[:100]}"
         tasks_summary = "\n".join([
-            f"- {task.get('title', '')}: {task.get('description', '')[:100]}"
-            for task in tasks_data
+            render_task(task)
+            for task in budget.fill('tasks', tasks_data, render_task, score=task_relevance)
         ])
+        self._finish_budget(budget)
         
         prompt = f"""
         CURRENT DATE AND TIME: {current_datetime.strftime("%Y-%m-%d %H:%M:%S")} (Use this for deadline urgency analysis)
@@ -130,21 +543,8 @@ class GeminiAIClient:
         Tasks to prioritize:
         {tasks_summary}
         
-        Please provide a JSON response with prioritization:
-        {{
-            "prioritized_tasks": [
-                {{
-                    "task_id": "task_identifier",
-                    "priority_score": 0.95,
-                    "priority_level": "urgent|high|medium|low",
-                    "reasoning": "Why this priority was assigned",
-                    "suggested_deadline": "2024-01-15T10:00:00Z or null",
-                    "estimated_duration": "2 hours",
-                    "dependencies": ["other task titles if any"]
-                }}
-            ],
-            "overall_insights": "General insights about the task load and priorities"
-        }}
+        Respond with JSON matching this schema (priority_score between 0 and 1):
+        {SCHEMA_HINTS['prioritize_tasks']}
         
         Consider:
         1. Deadlines mentioned in context
@@ -154,28 +554,21 @@ class GeminiAIClient:
         5. Context relevance
         """
         
-        try:
-            response = self.model.generate_content(prompt)
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return self._default_prioritization(tasks_data)
-        except Exception as e:
-            print(f"Error prioritizing tasks: {e}")
-            return self._default_prioritization(tasks_data)
+        return self._generate_json(
+            'prioritize_tasks', prompt, lambda: self._default_prioritization(tasks_data)
+        )
     
     def suggest_deadline(self, task_title: str, task_description: str, context_data: List[Dict] = None) -> Dict[str, Any]:
         """Suggest realistic deadlines for tasks"""
         
         # Get current date and time
-        current_datetime = datetime.now()
+        current_datetime = self._current_datetime()
         current_date_str = current_datetime.strftime("%Y-%m-%d")
         current_time_str = current_datetime.strftime("%H:%M")
         
-        context_summary = ""
-        if context_data:
-            context_summary = "\n".join([f"- {ctx.get('content', '')[:100]}" for ctx in context_data[-3:]])
+        budget = PromptBudget('suggest_deadline')
+        context_summary = self._context_summary(budget, context_data, limit=3)
+        self._finish_budget(budget)
         
         prompt = f"""
         CURRENT DATE AND TIME: {current_datetime.strftime("%Y-%m-%d %H:%M:%S")} (Use this as reference for all suggestions)
@@ -188,19 +581,8 @@ class GeminiAIClient:
         Recent Context:
         {context_summary}
         
-        Please provide a JSON response with dates AFTER the current date ({current_date_str}):
-        {{
-            "suggested_deadline": "{(current_datetime + timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M:%S')}Z",
-            "reasoning": "Why this deadline makes sense based on current time",
-            "estimated_duration": "2 hours",
-            "complexity_score": 0.7,
-            "alternative_deadlines": [
-                {{
-                    "deadline": "{(current_datetime + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%S')}Z",
-                    "scenario": "If more time needed"
-                }}
-            ]
-        }}
+        Respond with JSON matching this schema, using ISO 8601 datetimes AFTER the current date ({current_date_str}):
+        {SCHEMA_HINTS['suggest_deadline']}
         
         IMPORTANT: All suggested deadlines must be AFTER {current_datetime.strftime("%Y-%m-%d %H:%M:%S")}
         
@@ -212,21 +594,22 @@ class GeminiAIClient:
         5. Buffer time for unexpected issues
         """
         
-        try:
-            response = self.model.generate_content(prompt)
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return self._default_deadline_suggestion()
-        except Exception as e:
-            print(f"Error suggesting deadline: {e}")
-            return self._default_deadline_suggestion()
+        return self._generate_json(
+            'suggest_deadline', prompt, lambda: self._default_deadline_suggestion()
+        )
     
-    def categorize_task(self, task_title: str, task_description: str, existing_categories: List[str] = None) -> Dict[str, Any]:
-        """Auto-suggest task categories and tags"""
+    def categorize_task(self, task_title: str, task_description: str, existing_categories: List[str] = None,
+                        user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Auto-suggest task categories and tags, answering from the user's local model when confident"""
+        
+        local = categorizer_registry.suggest(user_id, task_title, task_description, existing_categories)
+        categorizer_registry.record(local is not None)
+        if local is not None:
+            return local
         
-        categories_list = existing_categories or []
+        categories_list = categorizer_registry.prompt_categories(
+            user_id, task_title, task_description, existing_categories
+        )
         
         prompt = f"""
         Categorize the following task and suggest relevant tags:
@@ -236,38 +619,25 @@ class GeminiAIClient:
         
         Existing Categories: {', '.join(categories_list)}
         
-        Please provide a JSON response:
-        {{
-            "suggested_category": "Work|Personal|Health|Finance|Learning|Shopping|etc",
-            "confidence": 0.9,
-            "alternative_categories": ["category1", "category2"],
-            "suggested_tags": ["tag1", "tag2", "tag3"],
-            "reasoning": "Why these categories and tags were suggested"
-        }}
+        Respond with JSON matching this schema:
+        {SCHEMA_HINTS['categorize_task']}
         
         If the task fits an existing category, prefer that. Otherwise, suggest a new appropriate category.
         """
         
-        try:
-            response = self.model.generate_content(prompt)
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return self._default_categorization()
-        except Exception as e:
-            print(f"Error categorizing task: {e}")
-            return self._default_categorization()
+        return self._generate_json(
+            'categorize_task', prompt, lambda: self._default_categorization()
+        )
     
     def enhance_task_description(self, task_title: str, task_description: str, context_data: List[Dict] = None) -> Dict[str, Any]:
         """Enhance task description with context-aware details"""
         
         # Get current date and time
-        current_datetime = datetime.now()
+        current_datetime = self._current_datetime()
         
-        context_summary = ""
-        if context_data:
-            context_summary = "\n".join([f"- {ctx.get('content', '')[:100]}" for ctx in context_data[-3:]])
+        budget = PromptBudget('enhance_task_description')
+        context_summary = self._context_summary(budget, context_data, limit=3)
+        self._finish_budget(budget)
         
         prompt = f"""
         CURRENT DATE AND TIME: {current_datetime.strftime("%Y-%m-%d %H:%M:%S")} (Use this as reference)
@@ -280,42 +650,45 @@ class GeminiAIClient:
         Relevant Context:
         {context_summary}
         
-        Please provide a JSON response:
-        {{
-            "enhanced_description": "Improved task description with current context and timing",
-            "added_details": ["detail1", "detail2"],
-            "suggested_subtasks": [
-                {{
-                    "title": "Subtask 1",
-                    "description": "Subtask description"
-                }}
-            ],
-            "resources_needed": ["resource1", "resource2"],
-            "potential_blockers": ["blocker1", "blocker2"]
-        }}
+        Respond with JSON matching this schema:
+        {SCHEMA_HINTS['enhance_task_description']}
         
         Make the description more actionable and specific while keeping it concise.
         Consider the current time ({current_datetime.strftime("%Y-%m-%d %H:%M:%S")}) when enhancing.
         """
         
-        try:
-            response = self.model.generate_content(prompt)
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return self._default_enhancement(task_description)
-        except Exception as e:
-            print(f"Error enhancing task: {e}")
-            return self._default_enhancement(task_description)
+        return self._generate_json(
+            'enhance_task_description', prompt, lambda: self._default_enhancement(task_description)
+        )
     
     def generate_daily_summary(self, context_entries: List[Dict], tasks: List[Dict]) -> Dict[str, Any]:
         """Generate daily summary and recommendations"""
         
-        context_summary = "\n".join([f"- {ctx.get('content', '')[:100]}" for ctx in context_entries])
-        tasks_summary = "\n".join([f"- {task.get('title', '')}" for task in tasks])
+        return self._generate_json(
+            'generate_daily_summary', self._daily_summary_prompt(context_entries, tasks),
+            lambda: self._default_daily_summary()
+        )
+    
+    def stream_daily_summary(self, context_entries: List[Dict], tasks: List[Dict]) -> Iterator[Tuple[str, Any]]:
+        """Streaming variant of generate_daily_summary yielding each recommendation as it completes"""
         
-        prompt = f"""
+        return self._stream_json(
+            'generate_daily_summary', self._daily_summary_prompt(context_entries, tasks),
+            ('recommendations', 'schedule_suggestions'), lambda: self._default_daily_summary()
+        )
+    
+    def _daily_summary_prompt(self, context_entries: List[Dict], tasks: List[Dict]) -> str:
+        budget = PromptBudget('generate_daily_summary')
+        context_summary = self._context_summary(budget, context_entries, share=0.6)
+        
+        render_task = lambda task: f"- {task.get('title', '')}"
+        tasks_summary = "\n".join([
+            render_task(task)
+            for task in budget.fill('tasks', tasks, render_task, score=task_relevance)
+        ])
+        self._finish_budget(budget)
+        
+        return f"""
         Generate a daily summary and recommendations based on:
         
         Today's Context:
@@ -324,145 +697,107 @@ class GeminiAIClient:
         Current Tasks:
         {tasks_summary}
         
-        Please provide a JSON response:
-        {{
-            "summary": "Brief summary of the day's context and tasks",
-            "key_themes": ["theme1", "theme2"],
-            "priority_areas": ["area1", "area2"],
-            "recommendations": [
-                {{
-                    "type": "task_creation|priority_adjustment|schedule_change",
-                    "title": "Recommendation title",
-                    "description": "Detailed recommendation",
-                    "urgency": "high|medium|low"
-                }}
-            ],
-            "schedule_suggestions": [
-                {{
-                    "time_slot": "09:00-10:00",
-                    "activity": "Suggested activity",
-                    "reasoning": "Why this time slot"
-                }}
-            ]
-        }}
+        Respond with JSON matching this schema:
+        {SCHEMA_HINTS['generate_daily_summary']}
         """
-        
-        try:
-            response = self.model.generate_content(prompt)
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return self._default_daily_summary()
-        except Exception as e:
-            print(f"Error generating daily summary: {e}")
-            return self._default_daily_summary()
     
     def generate_schedule_suggestions(self, tasks_data: List[Dict], context_data: List[Dict]) -> Dict[str, Any]:
         """Generate intelligent task scheduling suggestions"""
         
-        prompt = f"""
+        return self._generate_json(
+            'generate_schedule_suggestions', self._schedule_prompt(tasks_data, context_data),
+            lambda: self._default_schedule_suggestions(tasks_data)
+        )
+    
+    def stream_schedule_suggestions(self, tasks_data: List[Dict], context_data: List[Dict]) -> Iterator[Tuple[str, Any]]:
+        """Streaming variant of generate_schedule_suggestions yielding each schedule item as it completes"""
+        
+        return self._stream_json(
+            'generate_schedule_suggestions', self._schedule_prompt(tasks_data, context_data),
+            ('schedule', 'recommendations'), lambda: self._default_schedule_suggestions(tasks_data)
+        )
+    
+    def _schedule_prompt(self, tasks_data: List[Dict], context_data: List[Dict]) -> str:
+        budget = PromptBudget('generate_schedule_suggestions')
+        context_data = budget.fill('context', context_data or [], json.dumps, score=context_relevance, share=0.3)
+        tasks_data = budget.fill('tasks', tasks_data, json.dumps, score=task_relevance)
+        self._finish_budget(budget)
+        
+        return f"""
         Based on the following tasks and context, create an optimal daily schedule:
         
-        Tasks: {json.dumps(tasks_data, indent=2)}
-        Context: {json.dumps(context_data, indent=2)}
+        Tasks: {json.dumps(tasks_data)}
+        Context: {json.dumps(context_data)}
         
-        Please provide a JSON response with intelligent scheduling:
-        {{
-            "schedule": [
-                {{
-                    "time_slot": "09:00-10:30",
-                    "task_id": "task_id",
-                    "task_title": "Task title",
-                    "duration": 90,
-                    "priority": "high",
-                    "reasoning": "Why this time slot is optimal",
-                    "energy_level": "high|medium|low",
-                    "focus_required": "high|medium|low"
-                }}
-            ],
-            "schedule_insights": {{
-                "total_scheduled_hours": 6.5,
-                "high_priority_tasks": 3,
-                "optimal_productivity_windows": ["09:00-11:00", "14:00-16:00"],
-                "break_suggestions": ["11:00-11:15", "15:00-15:15"]
-            }},
-            "recommendations": [
-                {{
-                    "type": "scheduling|productivity|break",
-                    "title": "Recommendation title",
-                    "description": "Detailed recommendation"
-                }}
-            ]
-        }}
+        Respond with JSON matching this schema (durations in minutes, time slots as HH:MM-HH:MM):
+        {SCHEMA_HINTS['generate_schedule_suggestions']}
         """
-        
-        try:
-            response = self.model.generate_content(prompt)
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return self._default_schedule_suggestions(tasks_data)
-        except Exception as e:
-            print(f"Error generating schedule suggestions: {e}")
-            return self._default_schedule_suggestions(tasks_data)
     
     def generate_time_blocks(self, tasks_data: List[Dict], available_hours: int) -> Dict[str, Any]:
         """Generate time-blocking suggestions for tasks"""
         
-        prompt = f"""
+        return self._generate_json(
+            'generate_time_blocks', self._time_blocks_prompt(tasks_data, available_hours),
+            lambda: self._default_time_blocks(tasks_data, available_hours)
+        )
+    
+    def stream_time_blocks(self, tasks_data: List[Dict], available_hours: int) -> Iterator[Tuple[str, Any]]:
+        """Streaming variant of generate_time_blocks yielding each time block as it completes"""
+        
+        return self._stream_json(
+            'generate_time_blocks', self._time_blocks_prompt(tasks_data, available_hours),
+            ('time_blocks',), lambda: self._default_time_blocks(tasks_data, available_hours)
+        )
+    
+    def _time_blocks_prompt(self, tasks_data: List[Dict], available_hours: int) -> str:
+        budget = PromptBudget('generate_time_blocks')
+        tasks_data = budget.fill('tasks', tasks_data, json.dumps, score=task_relevance)
+        self._finish_budget(budget)
+        
+        return f"""
         Create time-blocking suggestions for the following tasks within {available_hours} hours:
         
-        Tasks: {json.dumps(tasks_data, indent=2)}
+        Tasks: {json.dumps(tasks_data)}
         Available Hours: {available_hours}
         
-        Please provide a JSON response with time-blocking strategy:
-        {{
-            "time_blocks": [
-                {{
-                    "block_name": "Deep Work Block 1",
-                    "start_time": "09:00",
-                    "end_time": "11:00",
-                    "duration": 120,
-                    "tasks": [
-                        {{
-                            "task_id": "task_id",
-                            "task_title": "Task title",
-                            "allocated_time": 90,
-                            "priority": "high"
-                        }}
-                    ],
-                    "block_type": "deep_work|admin|creative|communication",
-                    "energy_requirement": "high|medium|low",
-                    "break_after": 15
-                }}
-            ],
-            "blocking_strategy": {{
-                "total_blocks": 4,
-                "deep_work_blocks": 2,
-                "admin_blocks": 1,
-                "buffer_time": 30,
-                "break_time": 45
-            }},
-            "productivity_tips": [
-                "Schedule high-priority tasks during peak energy hours",
-                "Group similar tasks together",
-                "Include buffer time between blocks"
-            ]
-        }}
+        Respond with JSON matching this schema (times as HH:MM, durations in minutes):
+        {SCHEMA_HINTS['generate_time_blocks']}
         """
+    
+    def annotate_time_blocks(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """Have Gemini name the blocks of a locally built plan and add tips; times and tasks are kept"""
         
-        try:
-            response = self.model.generate_content(prompt)
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return self._default_time_blocks(tasks_data, available_hours)
-        except Exception as e:
-            print(f"Error generating time blocks: {e}")
-            return self._default_time_blocks(tasks_data, available_hours)
+        blocks = plan.get('time_blocks') or []
+        if not blocks:
+            return plan
+        
+        blocks_block = "\n".join([
+            f"[block={index}] {block['start_time']}-{block['end_time']} {block['block_type']}: "
+            + ', '.join(task['task_title'] for task in block['tasks'])
+            for index, block in enumerate(blocks)
+        ])
+        prompt = f"""
+        Give each of these time blocks a short, specific name and suggest up to 3 productivity tips for the day.
+        Do not change the times or tasks.
+        
+        {blocks_block}
+        
+        Respond with JSON matching this schema, with one entry per block using its index:
+        {SCHEMA_HINTS['annotate_time_blocks']}
+        """
+        
+        notes = self._generate_json('annotate_time_blocks', prompt, lambda: {'blocks': []})
+        annotated = {**plan, 'time_blocks': [dict(block) for block in blocks]}
+        named = 0
+        for note in notes.get('blocks') or []:
+            index = note.get('index')
+            if isinstance(index, int) and 0 <= index < len(blocks) and note.get('block_name'):
+                annotated['time_blocks'][index]['block_name'] = note['block_name']
+                named += 1
+        if named:
+            annotated['productivity_tips'] = list(notes.get('productivity_tips') or [])[:3] or plan.get('productivity_tips', [])
+            annotated['source'] = 'local+llm'
+        return annotated
     
     # Default fallback methods
     def _default_context_analysis(self) -> Dict[str, Any]:
@@ -560,37 +895,4 @@ class GeminiAIClient:
         }
     
     def _default_time_blocks(self, tasks_data: List[Dict], available_hours: int) -> Dict[str, Any]:
-        return {
-            "time_blocks": [
-                {
-                    "block_name": f"Work Block {i+1}",
-                    "start_time": f"{9+i*2:02d}:00",
-                    "end_time": f"{11+i*2:02d}:00",
-                    "duration": 120,
-                    "tasks": [
-                        {
-                            "task_id": task.get("id", ""),
-                            "task_title": task.get("title", "Task"),
-                            "allocated_time": 90,
-                            "priority": task.get("priority", "medium")
-                        }
-                    ],
-                    "block_type": "deep_work",
-                    "energy_requirement": "medium",
-                    "break_after": 15
-                }
-                for i, task in enumerate(tasks_data[:available_hours//2])
-            ],
-            "blocking_strategy": {
-                "total_blocks": min(len(tasks_data), available_hours//2),
-                "deep_work_blocks": min(len(tasks_data), available_hours//2),
-                "admin_blocks": 0,
-                "buffer_time": 30,
-                "break_time": 45
-            },
-            "productivity_tips": [
-                "Default time blocking applied",
-                "Consider adjusting based on your energy levels",
-                "Include regular breaks between blocks"
-            ]
-        }
\ No newline at end of file
+        return build_time_blocks(tasks_data, available_hours)
\ No newline at end of file
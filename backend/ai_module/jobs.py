@@ -0,0 +1,375 @@
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import AIJob
+
+logger = logging.getLogger(__name__)
+
+HANDLERS: Dict[str, Callable[[AIJob], Dict[str, Any]]] = {}
+
+
+def job_handler(kind: str):
+    """Register a function that runs jobs of this kind and returns their JSON result"""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(kind: str, user, payload: Dict[str, Any], unique: bool = False) -> AIJob:
+    """Queue a job for the ``ai_worker`` command.
+
+    With ``unique`` an identical job of the user that is still queued or running is returned
+    instead of adding another. With ``AI_JOBS_ENABLED`` off the job runs immediately in the
+    calling thread, as the work used to run inline in the request.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown AI job kind: {kind}")
+    if unique:
+        existing = AIJob.objects.filter(
+            user=user, kind=kind, payload=payload, status__in=['queued', 'running']
+        ).first()
+        if existing is not None:
+            return existing
+
+    inline = not getattr(settings, 'AI_JOBS_ENABLED', True)
+    job = AIJob.objects.create(
+        user=user, kind=kind, payload=payload, run_after=timezone.now(),
+        # Nobody would pick up a retry of an inline job
+        max_attempts=1 if inline else getattr(settings, 'AI_JOBS_MAX_ATTEMPTS', 3)
+    )
+    if inline:
+        claimed = claim(worker_name(), 1, ids=[job.pk])
+        if claimed:
+            run(claimed[0])
+        job.refresh_from_db()
+    return job
+
+
+def pending(job: Optional[AIJob]) -> bool:
+    """Whether the job is still waiting for a worker, i.e. the caller should answer 202"""
+    return job is not None and job.status in ('queued', 'running')
+
+
+def _claimable(now: datetime) -> Q:
+    # Running jobs whose worker went away become claimable when their lock expires
+    return Q(status='queued', run_after__lte=now) | Q(
+        status='running', locked_until__lt=now, attempts__lt=F('max_attempts')
+    )
+
+
+def claim(worker: str, limit: int, ids: Optional[List[int]] = None) -> List[AIJob]:
+    """Take up to ``limit`` due jobs for ``worker``.
+
+    Each job is taken with a conditional UPDATE, so concurrent workers never run the same
+    job; a worker losing the race for a row simply skips it. The lock lasts
+    ``AI_JOBS_VISIBILITY_TIMEOUT`` seconds.
+    """
+    now = timezone.now()
+    candidates = AIJob.objects.filter(_claimable(now))
+    if ids is not None:
+        candidates = candidates.filter(pk__in=ids)
+    candidate_ids = list(candidates.order_by('run_after', 'id').values_list('id', flat=True)[:limit * 2])
+
+    timeout = timedelta(seconds=getattr(settings, 'AI_JOBS_VISIBILITY_TIMEOUT', 300))
+    claimed = []
+    for job_id in candidate_ids:
+        if len(claimed) >= limit:
+            break
+        taken = AIJob.objects.filter(_claimable(now), pk=job_id).update(
+            status='running', locked_by=worker, locked_until=now + timeout,
+            attempts=F('attempts') + 1, started_at=now
+        )
+        if taken:
+            claimed.append(AIJob.objects.get(pk=job_id))
+    return claimed
+
+
+def heartbeat(job: AIJob) -> bool:
+    """Extend a long-running job's lock; False when another worker has reclaimed it"""
+    timeout = timedelta(seconds=getattr(settings, 'AI_JOBS_VISIBILITY_TIMEOUT', 300))
+    return AIJob.objects.filter(pk=job.pk, status='running', started_at=job.started_at).update(
+        locked_until=timezone.now() + timeout
+    ) > 0
+
+
+def backoff(attempts: int) -> float:
+    """Seconds before retrying after ``attempts`` failures: exponential with jitter"""
+    base = getattr(settings, 'AI_JOBS_RETRY_BACKOFF', 10)
+    delay = min(base * 2 ** (attempts - 1), getattr(settings, 'AI_JOBS_RETRY_BACKOFF_MAX', 600))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def run(job: AIJob) -> AIJob:
+    """Run a claimed job and record its outcome; failures are retried until max_attempts"""
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown AI job kind: {job.kind}")
+        result = handler(job)
+    except Exception as e:
+        logger.warning("AI job %s (%s) failed", job.pk, job.kind, exc_info=True)
+        retry = handler is not None and job.attempts < job.max_attempts
+        job.error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+        job.status = 'queued' if retry else 'failed'
+        job.run_after = timezone.now() + timedelta(seconds=backoff(job.attempts)) if retry else job.run_after
+        job.finished_at = None if retry else timezone.now()
+        fields = ['status', 'error', 'run_after', 'finished_at', 'locked_by', 'locked_until']
+    else:
+        job.status = 'succeeded'
+        job.result = result or {}
+        job.error = ''
+        job.finished_at = timezone.now()
+        fields = ['status', 'result', 'error', 'finished_at', 'locked_by', 'locked_until']
+
+    job.locked_by = ''
+    job.locked_until = None
+    # Only the current lock holder records the outcome; a reclaimed job belongs to its new worker
+    AIJob.objects.filter(pk=job.pk, status='running', started_at=job.started_at).update(
+        **{field: getattr(job, field) for field in fields}
+    )
+    return job
+
+
+def expire_exhausted() -> int:
+    """Fail running jobs whose lock expired after their last allowed attempt"""
+    return AIJob.objects.filter(
+        status='running', locked_until__lt=timezone.now(), attempts__gte=F('max_attempts')
+    ).update(status='failed', error='Visibility timeout expired on the last attempt',
+             finished_at=timezone.now(), locked_by='', locked_until=None)
+
+
+def describe(job: AIJob) -> Dict[str, Any]:
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': f"/api/ai/jobs/{job.pk}/",
+    }
+
+
+def queue_stats() -> Dict[str, Any]:
+    counts = dict(AIJob.objects.values_list('status').annotate(count=Count('id')).order_by())
+    oldest = AIJob.objects.filter(status='queued').order_by('created_at').values_list('created_at', flat=True).first()
+    return {
+        'enabled': getattr(settings, 'AI_JOBS_ENABLED', True),
+        'by_status': counts,
+        'oldest_queued_seconds': round((timezone.now() - oldest).total_seconds(), 1) if oldest else None,
+    }
+
+
+def _recent_context(user_id: int) -> List[Dict[str, str]]:
+    from context.models import ContextEntry
+
+    return [
+        {'content': content, 'source_type': source_type}
+        for content, source_type in ContextEntry.objects.filter(user_id=user_id)
+        .order_by('-created_at').values_list('content', 'source_type')[:5]
+    ]
+
+
+def _parse_deadline(suggestion: Dict[str, Any]) -> Optional[datetime]:
+    if suggestion.get('suggested_deadline'):
+        return datetime.fromisoformat(suggestion['suggested_deadline'].replace('Z', '+00:00'))
+    return None
+
+
+# The task fields the AI jobs own; saving only these keeps edits made during the Gemini call
+AI_TASK_FIELDS = ['ai_enhanced_description', 'ai_suggested_deadline', 'ai_insights', 'updated_at']
+
+
+def _suggest_category(task, category) -> None:
+    """Give the task ``category`` unless it was categorized while the job ran.
+
+    Saves a freshly locked copy so the rollup and categorizer signals see the current row
+    rather than the job's stale snapshot.
+    """
+    from tasks.models import Task
+
+    with transaction.atomic():
+        current = Task.objects.select_for_update().filter(pk=task.pk, category__isnull=True).first()
+        if current is not None:
+            current.category = category
+            current.save(update_fields=['category', 'updated_at'])
+
+
+@job_handler('analyze_context')
+def analyze_context_job(job: AIJob) -> Dict[str, Any]:
+    """Analyze a context entry; new entries also get insights and suggested tasks"""
+    from context.models import ContextEntry, ContextInsight
+    from tasks.models import Category, Task
+    from .gemini_client import GeminiAIClient
+
+    entry = ContextEntry.objects.get(pk=job.payload['entry_id'], user=job.user)
+    analysis = GeminiAIClient().analyze_context(entry.content, entry.source_type)
+    entry.apply_analysis(analysis)
+    if job.payload.get('reprocess'):
+        return {'entry_id': entry.pk}
+
+    # A retry after a partial failure must not duplicate what the first attempt created
+    entry.insights.all().delete()
+    for insight_data in analysis.get('insights', []):
+        ContextInsight.objects.create(
+            context_entry=entry,
+            insight_type=insight_data.get('type', 'general'),
+            title=insight_data.get('title', ''),
+            description=insight_data.get('description', ''),
+            confidence_score=insight_data.get('confidence', 0.5),
+            suggested_action=insight_data.get('suggested_action', {})
+        )
+
+    created = []
+    for task_suggestion in analysis.get('task_suggestions', []):
+        title = task_suggestion.get('title', '')
+        if entry.related_tasks.filter(title=title).exists():
+            continue
+        category = None
+        if task_suggestion.get('category'):
+            category, _ = Category.objects.get_or_create(
+                name=task_suggestion['category'], defaults={'color': '#3B82F6'}
+            )
+        suggested_task = Task.objects.create(
+            user=entry.user,
+            title=title,
+            description=task_suggestion.get('description', ''),
+            priority=task_suggestion.get('priority', 'medium'),
+            category=category,
+            context_used={'source_context_id': entry.id},
+            ai_insights={'created_from_context': True, 'suggestion_data': task_suggestion}
+        )
+        entry.related_tasks.add(suggested_task)
+        created.append(suggested_task.pk)
+    return {'entry_id': entry.pk, 'created_task_ids': created}
+
+
+@job_handler('enhance_task')
+def enhance_task_job(job: AIJob) -> Dict[str, Any]:
+    """AI enhancement of a newly created task: description, missing deadline and category"""
+    from tasks.models import Category, Task
+    from .gemini_client import GeminiAIClient, resolve_analysis_mode
+
+    task = Task.objects.get(pk=job.payload['task_id'], user=job.user)
+    results = GeminiAIClient().analyze_task_bundle(
+        resolve_analysis_mode('task_create', job.payload.get('analysis_mode')),
+        task.title, task.description, _recent_context(task.user_id),
+        existing_categories=None if task.category else list(Category.objects.values_list('name', flat=True)),
+        include_deadline=not task.deadline,
+        include_categorization=not task.category,
+        user_id=task.user_id
+    )
+    enhancement = results['enhancement']
+    deadline_suggestion = results['deadline_suggestion']
+    categorization = results['categorization']
+
+    task.ai_enhanced_description = enhancement.get('enhanced_description', '')
+    task.ai_suggested_deadline = _parse_deadline(deadline_suggestion) or task.ai_suggested_deadline
+    task.ai_insights = {
+        'enhancement': enhancement,
+        'deadline_suggestion': deadline_suggestion,
+        'categorization': categorization,
+        'usage': results['usage']
+    }
+    task.save(update_fields=AI_TASK_FIELDS)
+    category_name = categorization.get('suggested_category')
+    if category_name:
+        category, _ = Category.objects.get_or_create(name=category_name, defaults={'color': '#3B82F6'})
+        _suggest_category(task, category)
+    return {'task_id': task.pk}
+
+
+@job_handler('analyze_task')
+def analyze_task_job(job: AIJob) -> Dict[str, Any]:
+    """On-demand AI analysis of an existing task, recorded in its history"""
+    from tasks.models import Category, Task, TaskHistory
+    from .gemini_client import GeminiAIClient, resolve_analysis_mode
+
+    task = Task.objects.get(pk=job.payload['task_id'], user=job.user)
+    results = GeminiAIClient().analyze_task_bundle(
+        resolve_analysis_mode('ai_analyze', job.payload.get('analysis_mode')),
+        task.title, task.description, _recent_context(task.user_id),
+        existing_categories=list(Category.objects.values_list('name', flat=True)),
+        user_id=task.user_id
+    )
+    enhancement = results['enhancement']
+    deadline_suggestion = results['deadline_suggestion']
+    categorization = results['categorization']
+
+    task.ai_enhanced_description = enhancement.get('enhanced_description', '')
+    task.ai_insights = {
+        'enhancement': enhancement,
+        'deadline_suggestion': deadline_suggestion,
+        'categorization': categorization,
+        'usage': results['usage'],
+        'analyzed_at': timezone.now().isoformat()
+    }
+    task.ai_suggested_deadline = _parse_deadline(deadline_suggestion) or task.ai_suggested_deadline
+    task.save(update_fields=AI_TASK_FIELDS)
+
+    TaskHistory.objects.create(
+        task=task,
+        action='ai_analyzed',
+        ai_suggestions={
+            'enhancement': enhancement,
+            'deadline_suggestion': deadline_suggestion,
+            'categorization': categorization
+        }
+    )
+    return {'task_id': task.pk}
+
+
+@job_handler('daily_summary')
+def daily_summary_job(job: AIJob) -> Dict[str, Any]:
+    """Generate the user's DailyContextSummary for a date, or refresh the text of a stale one"""
+    from .summaries import generate_daily_summary
+
+    summary = generate_daily_summary(
+        job.user, datetime.fromisoformat(job.payload['date']).date(), refresh=job.payload.get('refresh', False)
+    )
+    return {'summary_id': summary.pk}
+
+
+@job_handler('train_categorizer')
+def train_categorizer_job(job: AIJob) -> Dict[str, Any]:
+    """Apply the categorizer updates queued by a task save or delete"""
+    from .categorizer import categorizer_registry
+
+    updates = job.payload.get('updates', [])
+    categorizer_registry.learn_many(
+        job.user_id, [(update['tokens'], update['category'], update['weight']) for update in updates]
+    )
+    return {'updates': len(updates)}
+
+
+@job_handler('bulk_process')
+def bulk_process_job(job: AIJob) -> Dict[str, Any]:
+    """Drain the user's unprocessed context entries, resuming from the run's checkpoint"""
+    from context.models import BulkProcessRun
+    from .bulk import drain
+
+    run = BulkProcessRun.objects.get(pk=job.payload['run_id'], user=job.user)
+    if run.status != 'running':
+        BulkProcessRun.objects.filter(pk=run.pk).update(status='running', finished_at=None)
+    try:
+        return drain(run, job)
+    except Exception as e:
+        BulkProcessRun.objects.filter(pk=run.pk).update(status='failed', last_error=str(e), finished_at=timezone.now())
+        raise
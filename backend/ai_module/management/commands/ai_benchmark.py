@@ -0,0 +1,182 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Run micro-benchmarks for the AI module (no Gemini requests are sent)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=['client', 'parse', 'prompts', 'categorizer', 'triage', 'scheduler', 'scoring'], help='Benchmark suite to run')
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        getattr(self, f"bench_{options['suite']}")(options['iterations'])
+
+    def report(self, label, seconds, iterations):
+        self.stdout.write(
+            f"{label:<40} {seconds * 1000:>10.2f} ms total {seconds / iterations * 1e6:>12.1f} us/op"
+        )
+
+    def bench_client(self, iterations):
+        """Per-request client construction: legacy configure + GenerativeModel vs the shared pool"""
+        import google.generativeai as genai
+        from google.generativeai import client as genai_client
+        from ai_module.gemini_client import GeminiAIClient
+
+        started = perf_counter()
+        for _ in range(iterations):
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            model = genai.GenerativeModel(settings.GEMINI_MODEL)
+            # The legacy path built its transport lazily on the first request
+            model._client = genai_client.get_default_generative_client()
+        self.report('configure + GenerativeModel per request', perf_counter() - started, iterations)
+
+        GeminiAIClient()  # warm the pool
+        started = perf_counter()
+        for _ in range(iterations):
+            GeminiAIClient()
+        self.report('pooled GeminiAIClient()', perf_counter() - started, iterations)
+
+    def bench_parse(self, iterations):
+        """Response parsing: greedy DOTALL regex + json.loads vs the balanced-brace extractor"""
+        import json
+        import re
+        from ai_module.schemas import SCHEMAS, conform, example_for, extract_json
+
+        payload = example_for(SCHEMAS['generate_schedule_suggestions'])
+        payload['schedule'] = payload['schedule'] * 200
+        body = json.dumps(payload, indent=2)
+        responses = {
+            'clean': body,
+            'fenced + trailing prose with braces': f"```json\n{body}\n```\nNote: {{adjust}} as needed.",
+        }
+
+        for label, text in responses.items():
+            self.stdout.write(f"{label} ({len(text) / 1024:.1f} KiB)")
+
+            failures = 0
+            started = perf_counter()
+            for _ in range(iterations):
+                try:
+                    json.loads(re.search(r'\{.*\}', text, re.DOTALL).group())
+                except ValueError:
+                    failures += 1
+            self.report(f"  regex + json.loads ({failures} failed)", perf_counter() - started, iterations)
+
+            failures = 0
+            started = perf_counter()
+            for _ in range(iterations):
+                data = extract_json(text)
+                if data is None or conform(data, SCHEMAS['generate_schedule_suggestions'])[0] is None:
+                    failures += 1
+            self.report(f"  extract_json + conform ({failures} failed)", perf_counter() - started, iterations)
+
+    def bench_prompts(self, iterations):
+        """Prompt tokens spent on the response format: inline JSON example vs compact schema hint"""
+        import json
+        from ai_module.budget import estimate_tokens
+        from ai_module.schemas import SCHEMAS, SCHEMA_HINTS, example_for
+
+        total_example = total_hint = 0
+        for method, schema in SCHEMAS.items():
+            example_tokens = estimate_tokens(json.dumps(example_for(schema), indent=4))
+            hint_tokens = estimate_tokens(SCHEMA_HINTS[method])
+            total_example += example_tokens
+            total_hint += hint_tokens
+            self.stdout.write(f"{method:<32} example {example_tokens:>5} tokens  hint {hint_tokens:>5} tokens")
+        self.stdout.write(
+            f"{'total':<32} example {total_example:>5} tokens  hint {total_hint:>5} tokens "
+            f"({100 - total_hint * 100 // total_example}% fewer)"
+        )
+
+    def bench_categorizer(self, iterations):
+        """Local Naive Bayes prediction latency on a synthetic 500-task, 8-category history"""
+        import random
+        from ai_module.categorizer import NaiveBayesCategorizer, tokenize
+
+        random.seed(0)
+        vocabulary = {
+            f"category{index}": [f"word{index}_{word}" for word in range(60)] for index in range(8)
+        }
+        shared = [f"common{word}" for word in range(200)]
+        categorizer = NaiveBayesCategorizer()
+        for _ in range(500):
+            category = random.choice(list(vocabulary))
+            words = random.sample(vocabulary[category], 4) + random.sample(shared, 6)
+            categorizer.update(tokenize(' '.join(words)), category)
+
+        texts = [
+            ' '.join(random.sample(vocabulary[category], 3) + random.sample(shared, 5))
+            for category in vocabulary
+        ]
+        categorizer.predict(tokenize(texts[0]))  # warm the vocabulary size cache
+        started = perf_counter()
+        for index in range(iterations):
+            categorizer.predict(tokenize(texts[index % len(texts)]))
+        self.report('tokenize + predict', perf_counter() - started, iterations)
+
+    def bench_triage(self, iterations):
+        """Vectorized lexicon triage over a synthetic 1,000-message chat export"""
+        from ai_module.triage import triage_batch
+
+        messages = [
+            'ok thanks', 'haha lol', 'Good morning!', '<Media omitted>', 'where are you guys', 'yeah sure',
+            'Can you send the Q3 report by Friday 5pm? urgent', 'Need to pay electricity bill before 15/10',
+            "Don't forget the dentist appointment tomorrow at 10:30", 'did you watch the match last night',
+        ]
+        entries = [{'content': messages[i % len(messages)], 'source_type': 'whatsapp'} for i in range(1000)]
+
+        started = perf_counter()
+        for _ in range(iterations):
+            results = triage_batch(entries)
+        seconds = perf_counter() - started
+        self.report('triage_batch (1,000 messages)', seconds, iterations)
+        escalated = sum(result['needs_llm'] for result in results)
+        self.stdout.write(f"  {escalated} of {len(entries)} messages would reach the LLM")
+
+    def bench_scheduler(self, iterations):
+        """Local EDF time blocking for 50 active tasks"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from ai_module.scheduler import build_time_blocks
+
+        now = timezone.now()
+        titles = ['Prepare report', 'Reply to client email', 'Design landing page', 'File expenses', 'Fix login bug']
+        tasks = [
+            {
+                'id': i, 'title': titles[i % len(titles)], 'priority': ('low', 'medium', 'high', 'urgent')[i % 4],
+                'estimated_duration': (0.25, 0.5, 1, 2.5)[i % 4], 'ai_priority_score': (i * 37 % 100) / 100,
+                'deadline': (now + timedelta(hours=i % 12)).isoformat() if i % 3 else None,
+            }
+            for i in range(50)
+        ]
+
+        started = perf_counter()
+        for _ in range(iterations):
+            plan = build_time_blocks(tasks, 8)
+        self.report('build_time_blocks (50 tasks, 8 hours)', perf_counter() - started, iterations)
+        self.stdout.write(
+            f"  {len(plan['time_blocks'])} blocks, {len(plan['unscheduled'])} unscheduled, {len(plan['at_risk'])} at risk"
+        )
+
+    def bench_scoring(self, iterations):
+        """Vectorized priority scoring of 100k tasks (no database access)"""
+        import numpy as np
+        from ai_module.budget import PRIORITY_WEIGHTS
+        from ai_module.scoring import compute_scores
+
+        size = 100_000
+        rng = np.random.default_rng(0)
+        priority = rng.choice(list(PRIORITY_WEIGHTS.values()), size)
+        hours_left = np.where(rng.random(size) < 0.3, np.nan, rng.uniform(-48, 24 * 30, size))
+        age_days = rng.uniform(0, 90, size)
+        context = np.where(rng.random(size) < 0.1, rng.random(size), 0.0)
+
+        runs = max(iterations // 20, 1)
+        started = perf_counter()
+        for _ in range(runs):
+            scores, _, _ = compute_scores(priority, hours_left, age_days, context)
+        self.report(f"compute_scores ({size} tasks)", perf_counter() - started, runs)
+        self.stdout.write(f"  mean score {scores.mean():.3f}")
@@ -0,0 +1,194 @@
+import json
+import math
+import random
+import threading
+from collections import defaultdict
+from time import monotonic, perf_counter
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from context.models import ContextEntry
+from tasks.models import Category, Task
+
+TITLES = [
+    'Prepare quarterly report', 'Book dentist appointment', 'Review pull request', 'Pay electricity bill',
+    'Plan team offsite', 'Renew passport', 'Draft blog post', 'Call the bank about the card',
+]
+MESSAGES = [
+    'Can you send me the slides before the meeting tomorrow at 10am?',
+    'Reminder: invoice #4411 is due on Friday',
+    'lol ok',
+    'Don\'t forget to pick up groceries on the way home',
+    'The client asked to move the review call to Thursday 3pm',
+    'Good morning!',
+]
+
+# (name, weight, method, path template); {task} is replaced by a random seeded task id
+SCENARIO = [
+    ('task list', 30, 'GET', '/api/tasks/tasks/'),
+    ('context create', 20, 'POST', '/api/context/entries/'),
+    ('task ai_analyze', 10, 'POST', '/api/tasks/tasks/{task}/ai_analyze/'),
+    ('ai categorize', 10, 'POST', '/api/ai/categorize-task/'),
+    ('ai deadline', 5, 'POST', '/api/ai/suggest-deadline/'),
+    ('ai analyze-context', 5, 'POST', '/api/ai/analyze-context/'),
+    ('ai prioritize', 8, 'POST', '/api/ai/prioritize-tasks/'),
+    ('ai daily-summary', 4, 'POST', '/api/ai/daily-summary/'),
+    ('ai schedule', 4, 'POST', '/api/ai/schedule-suggestions/'),
+    ('ai time-blocking', 4, 'POST', '/api/ai/time-blocking/'),
+]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive a mixed task / context / AI load against a running server and report throughput and '
+        'latency percentiles. Point the server at the fake_gemini stand-in to keep Gemini out of the loop.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent simulated clients')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+        parser.add_argument('--requests', type=int, default=None, help='Stop after this many requests instead')
+        parser.add_argument('--username', default='loadtest')
+        parser.add_argument('--tasks', type=int, default=50, help='Tasks to seed for the load-test user')
+        parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        user, token = self.seed(options['username'], options['tasks'])
+        task_ids = list(Task.objects.filter(user=user).values_list('id', flat=True))
+        self.base_url = options['base_url'].rstrip('/')
+        self.headers = {'Authorization': f"Token {token.key}", 'Content-Type': 'application/json'}
+        self.user_id = user.id
+        self.task_ids = task_ids
+        self.timeout = options['timeout']
+
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        self.remaining = options['requests']
+        self.deadline = monotonic() + options['duration'] if options['requests'] is None else None
+
+        self.stdout.write(
+            f"Load-testing {self.base_url} as {user.username} with {options['concurrency']} clients "
+            f"({len(task_ids)} seeded tasks)"
+        )
+        rng = random.Random(options['seed'])
+        workers = [
+            threading.Thread(target=self.client_loop, args=(random.Random(rng.random()),), daemon=True)
+            for _ in range(options['concurrency'])
+        ]
+        started = perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.report(perf_counter() - started)
+
+    def seed(self, username, task_count):
+        user, created = User.objects.get_or_create(username=username)
+        if created:
+            user.set_unusable_password()
+            user.save()
+        token, _ = Token.objects.get_or_create(user=user)
+
+        categories = [Category.objects.get_or_create(name=name)[0] for name in ('Work', 'Personal', 'Finance')]
+        existing = Task.objects.filter(user=user).count()
+        for index in range(existing, task_count):
+            Task.objects.create(
+                user=user, title=TITLES[index % len(TITLES)], description=f"Load-test task {index}",
+                category=categories[index % len(categories)], priority=('low', 'medium', 'high')[index % 3],
+            )
+        if not ContextEntry.objects.filter(user=user).exists():
+            for message in MESSAGES:
+                ContextEntry.objects.create(user=user, source_type='email', content=message)
+        return user, token
+
+    def take(self) -> bool:
+        """Claim the next request slot; False once the run is over"""
+        if self.deadline is not None:
+            return monotonic() < self.deadline
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def client_loop(self, rng):
+        names = [step[0] for step in SCENARIO]
+        weights = [step[1] for step in SCENARIO]
+        steps = {step[0]: step for step in SCENARIO}
+        while self.take():
+            name = rng.choices(names, weights)[0]
+            _, _, method, path = steps[name]
+            path = path.format(task=rng.choice(self.task_ids) if self.task_ids else 0)
+            body = self.body(name, rng) if method == 'POST' else None
+
+            started = perf_counter()
+            failed = not self.send(method, path, body)
+            elapsed = perf_counter() - started
+            with self.lock:
+                self.latencies[name].append(elapsed)
+                if failed:
+                    self.errors[name] += 1
+
+    def body(self, name, rng):
+        title = rng.choice(TITLES)
+        message = rng.choice(MESSAGES)
+        if name == 'context create':
+            return {'source_type': rng.choice(['email', 'whatsapp', 'notes']), 'content': message}
+        if name == 'ai analyze-context':
+            return {'source_type': 'email', 'content': message}
+        if name in ('ai categorize', 'ai deadline'):
+            return {'title': title, 'description': message, 'user_id': self.user_id}
+        if name == 'ai time-blocking':
+            return {'user_id': self.user_id, 'available_hours': 6}
+        return {'user_id': self.user_id}
+
+    def send(self, method, path, body) -> bool:
+        data = json.dumps(body).encode() if body is not None else None
+        request = Request(self.base_url + path, data=data, headers=self.headers, method=method)
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status < 400
+        except HTTPError as e:
+            e.read()
+            return False
+        except (URLError, OSError):
+            return False
+
+    def report(self, seconds):
+        total = sum(len(values) for values in self.latencies.values())
+        self.stdout.write(
+            f"\n{'endpoint':<22}{'count':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        )
+        everything = []
+        for name, *_ in SCENARIO:
+            values = sorted(self.latencies.get(name, []))
+            if not values:
+                continue
+            everything.extend(values)
+            self.stdout.write(self.row(name, values, self.errors[name], seconds))
+        everything.sort()
+        self.stdout.write(self.row('all', everything, sum(self.errors.values()), seconds))
+        self.stdout.write(f"\n{total} requests in {seconds:.1f}s: {total / seconds:.1f} req/s")
+
+    @staticmethod
+    def row(name, values, errors, seconds):
+        return (
+            f"{name:<22}{len(values):>7}{errors:>8}{len(values) / seconds:>9.1f}"
+            f"{percentile(values, 0.50) * 1000:>10.1f}{percentile(values, 0.95) * 1000:>10.1f}"
+            f"{percentile(values, 0.99) * 1000:>10.1f}"
+        )
@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from ai_module.metrics import merge, render_prometheus, stored_snapshots, summarize
+
+SORT_KEYS = ('p95', 'p99', 'mean', 'total_seconds', 'calls', 'fallback_rate', 'avg_prompt_tokens')
+
+
+class Command(BaseCommand):
+    help = 'Show per-method AI call metrics aggregated from the snapshots saved by each worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=SORT_KEYS, default='p95', help='Slowest/largest first')
+        parser.add_argument('--format', choices=['table', 'json', 'prometheus'], default='table')
+        parser.add_argument('--max-age', type=float, default=None,
+                            help='Ignore workers that have not saved metrics for this many seconds')
+
+    def handle(self, *args, **options):
+        snapshots = stored_snapshots(max_age=options['max_age'])
+        merged = merge(snapshots.values())
+
+        if options['format'] == 'prometheus':
+            self.stdout.write(render_prometheus(merged), ending='')
+            return
+
+        summaries = {method: summarize(values) for method, values in merged.items()}
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps({'workers': len(snapshots), 'methods': summaries}, indent=2))
+            return
+
+        if not summaries:
+            self.stdout.write('No AI metrics recorded yet')
+            return
+
+        self.stdout.write(
+            f"{'method':<34}{'calls':>7}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'mean s':>8}"
+            f"{'prompt tok':>11}{'resp tok':>9}{'parse err':>10}{'fallback':>9}{'cache':>7}"
+        )
+        ordered = sorted(summaries.items(), key=lambda item: item[1][options['sort']] or 0, reverse=True)
+        for method, row in ordered:
+            self.stdout.write(
+                f"{method:<34}{row['calls']:>7}{self.fmt(row['p50'], 2):>8}{self.fmt(row['p95'], 2):>8}"
+                f"{self.fmt(row['p99'], 2):>8}{self.fmt(row['mean'], 2):>8}"
+                f"{self.fmt(row['avg_prompt_tokens'], 0):>11}{self.fmt(row['avg_response_tokens'], 0):>9}"
+                f"{row['parse_failures']:>10}{row['fallbacks']:>9}{row['cache_hits']:>7}"
+            )
+        self.stdout.write(f"\n{len(snapshots)} worker snapshot(s); token counts are estimates")
+
+    @staticmethod
+    def fmt(value, digits):
+        return '-' if value is None else f"{value:.{digits}f}"
@@ -0,0 +1,78 @@
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from ai_module.jobs import claim, expire_exhausted, run, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Run queued AI jobs (context analysis, task enhancement, daily summaries) on a thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=None,
+                            help='Concurrent jobs (default AI_JOBS_WORKER_THREADS)')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Seconds to sleep when the queue is empty (default AI_JOBS_POLL_INTERVAL)')
+        parser.add_argument('--once', action='store_true', help='Exit when no job is due instead of polling')
+
+    def handle(self, *args, **options):
+        threads = max(options['threads'] or getattr(settings, 'AI_JOBS_WORKER_THREADS', 4), 1)
+        interval = options['poll_interval'] or getattr(settings, 'AI_JOBS_POLL_INTERVAL', 1.0)
+        worker = worker_name()
+        stopping = threading.Event()
+        slots = threading.Semaphore(threads)
+
+        def stop(signum, frame):
+            self.stdout.write('Finishing running jobs before exiting...')
+            stopping.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        def execute(job):
+            try:
+                run(job)
+            finally:
+                # Worker threads get their own DB connections; do not leave them open
+                connections.close_all()
+                slots.release()
+
+        self.stdout.write(f"AI worker {worker} running with {threads} thread(s)")
+        processed = 0
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='ai-job') as pool:
+            while not stopping.is_set():
+                slots.acquire()
+                if stopping.is_set():
+                    slots.release()
+                    break
+                free = 1
+                while slots.acquire(blocking=False):
+                    free += 1
+                expire_exhausted()
+                jobs = claim(worker, free)
+                for _ in range(free - len(jobs)):
+                    slots.release()
+                for job in jobs:
+                    pool.submit(execute, job)
+                processed += len(jobs)
+
+                if not jobs:
+                    if options['once'] and self.idle(slots, threads):
+                        break
+                    stopping.wait(interval)
+            # Leaving the with block waits for the jobs already submitted
+        self.stdout.write(f"AI worker {worker} stopped after {processed} job(s)")
+
+    @staticmethod
+    def idle(slots, threads):
+        """True when no job is running; leaves the semaphore as it found it"""
+        taken = 0
+        while taken < threads and slots.acquire(blocking=False):
+            taken += 1
+        for _ in range(taken):
+            slots.release()
+        return taken == threads
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from ai_module.fake_gemini import FakeGeminiServer
+
+
+class Command(BaseCommand):
+    help = 'Serve a local Gemini stand-in with schema-valid responses, injected latency and errors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=float, default=800, help='Median response latency')
+        parser.add_argument('--latency-sigma', type=float, default=0.4, help='Log-normal shape; 0 for a fixed latency')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests that fail (0-1)')
+        parser.add_argument('--error-status', type=int, default=503, choices=[429, 500, 503])
+        parser.add_argument('--stream-chunks', type=int, default=4, help='Pieces per streamed response')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        server = FakeGeminiServer(
+            (options['host'], options['port']),
+            latency_ms=options['latency_ms'],
+            latency_sigma=options['latency_sigma'],
+            error_rate=options['error_rate'],
+            error_status=options['error_status'],
+            stream_chunks=options['stream_chunks'],
+            seed=options['seed'],
+        )
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(
+            f"Fake Gemini listening on http://{host}:{port} "
+            f"(set GEMINI_API_ENDPOINT=http://{host}:{port}); Ctrl+C to stop"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served {server.requests} requests, {server.errors} injected errors")
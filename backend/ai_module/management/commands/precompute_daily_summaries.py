@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+from time import sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ai_module.summaries import precompute_daily_summaries
+
+
+class Command(BaseCommand):
+    help = ('Generate daily context summaries ahead of time for every active user with new context, '
+            'so the first dashboard visit of the day reads a stored summary')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', default=None, help='YYYY-MM-DD (default today)')
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only this user id (repeatable)')
+        parser.add_argument('--threads', type=int, default=None,
+                            help='Users processed concurrently (default AI_SUMMARY_PRECOMPUTE_THREADS)')
+        parser.add_argument('--at', default=None,
+                            help='Stay running and precompute every day at this local HH:MM '
+                                 '(AI_SUMMARY_PRECOMPUTE_AT when given without a value)', nargs='?', const='')
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError:
+            raise CommandError('--date must be YYYY-MM-DD')
+
+        if options['at'] is None:
+            self.run_once(day, options)
+            return
+
+        at = options['at'] or getattr(settings, 'AI_SUMMARY_PRECOMPUTE_AT', '05:00')
+        try:
+            hour, minute = (int(part) for part in at.split(':'))
+        except ValueError:
+            raise CommandError('--at must be HH:MM')
+        while True:
+            now = timezone.localtime()
+            next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if next_run <= now:
+                next_run += timedelta(days=1)
+            self.stdout.write(f"Next precompute at {next_run.isoformat()}")
+            sleep((next_run - now).total_seconds())
+            self.run_once(None, options)
+
+    def run_once(self, day, options):
+        stats = precompute_daily_summaries(day, user_ids=options['users'], threads=options['threads'])
+        self.stdout.write(
+            f"{stats['date']}: {stats['generated']} generated, {stats['refreshed']} refreshed, {stats['failed']} failed "
+            f"of {stats['due']} due users in {stats['seconds']:.2f}s"
+        )
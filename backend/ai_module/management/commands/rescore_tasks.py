@@ -0,0 +1,28 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand
+
+from ai_module.scoring import rescore_tasks
+
+
+class Command(BaseCommand):
+    help = ('Recompute ai_priority_score for active tasks; run it from cron, or with --interval '
+            'as a long-lived process, so scores follow approaching deadlines')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only this user id (repeatable)')
+        parser.add_argument('--due-within', type=float, default=None,
+                            help='Only tasks due within this many hours, including overdue ones')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Repeat every this many seconds instead of running once')
+
+    def handle(self, *args, **options):
+        while True:
+            stats = rescore_tasks(
+                user_ids=options['users'], due_within_hours=options['due_within'], batch_size=options['batch_size']
+            )
+            self.stdout.write(f"Scored {stats['scanned']} tasks, updated {stats['updated']} in {stats['seconds']:.2f}s")
+            if not options['interval']:
+                return
+            sleep(options['interval'])
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ai_module.categorizer import NaiveBayesCategorizer, categorizer_registry, tokenize
+from ai_module.models import CategorizerState
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = "Rebuild users' local task categorizers from their categorized tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only rebuild these user ids')
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.filter(category__isnull=False)
+        if options['users']:
+            tasks = tasks.filter(user_id__in=options['users'])
+
+        categorizers = {}
+        rows = tasks.order_by('user_id').values_list('user_id', 'title', 'description', 'category__name')
+        for user_id, title, description, category in rows.iterator():
+            categorizer = categorizers.setdefault(user_id, NaiveBayesCategorizer())
+            categorizer.update(tokenize(title, description), category)
+
+        max_features = getattr(settings, 'AI_LOCAL_CATEGORIZER_MAX_FEATURES', 2000)
+        for user_id, categorizer in categorizers.items():
+            categorizer.prune(max_features)
+            state, _ = CategorizerState.objects.get_or_create(user_id=user_id)
+            state.update_from(categorizer)
+            state.save()
+
+        categorizer_registry.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(categorizers)} categorizers from {sum(c.documents for c in categorizers.values())} tasks"
+        ))
@@ -0,0 +1,214 @@
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from .budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the upstream latency histogram; a final +Inf bucket is implied
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30)
+
+COUNTERS = (
+    'calls', 'prompt_chars', 'prompt_tokens', 'response_chars', 'response_tokens',
+    'parse_failures', 'fallbacks', 'partial_fallbacks', 'errors', 'rejected', 'timeouts', 'cache_hits',
+)
+
+# Prometheus help text per counter; token counts are estimates (about four characters per token)
+COUNTER_HELP = {
+    'calls': 'Gemini calls that returned a response',
+    'prompt_chars': 'Characters sent in prompts',
+    'prompt_tokens': 'Estimated prompt tokens',
+    'response_chars': 'Characters received in responses',
+    'response_tokens': 'Estimated response tokens',
+    'parse_failures': 'Responses discarded because they could not be parsed or validated',
+    'fallbacks': 'Requests answered with the default result',
+    'partial_fallbacks': 'Response sections replaced with the default result',
+    'errors': 'Gemini calls that raised',
+    'rejected': 'Calls refused by the circuit breaker or concurrency limiter',
+    'timeouts': 'Concurrent calls abandoned after AI_CALL_TIMEOUT',
+    'cache_hits': 'Requests answered from the response cache',
+}
+
+
+def _empty() -> Dict[str, Any]:
+    metrics = {name: 0 for name in COUNTERS}
+    metrics['buckets'] = [0] * (len(LATENCY_BUCKETS) + 1)
+    metrics['latency_sum'] = 0.0
+    return metrics
+
+
+def merge(snapshots: Iterable[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Sum per-method snapshots, e.g. from several worker processes"""
+    merged = {}
+    for snapshot in snapshots:
+        for method, values in snapshot.items():
+            target = merged.setdefault(method, _empty())
+            for name in COUNTERS:
+                target[name] += values.get(name, 0)
+            target['latency_sum'] += values.get('latency_sum', 0.0)
+            for index, count in enumerate(values.get('buckets', [])[:len(target['buckets'])]):
+                target['buckets'][index] += count
+    return merged
+
+
+def quantile(buckets: List[int], q: float) -> Optional[float]:
+    """Estimate a latency quantile from histogram bucket counts (linear within a bucket)"""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = q * total
+    seen, lower = 0, 0.0
+    for index, count in enumerate(buckets):
+        if index == len(LATENCY_BUCKETS):
+            # The +Inf bucket has no upper bound; report the largest finite one
+            return LATENCY_BUCKETS[-1]
+        upper = LATENCY_BUCKETS[index]
+        if count and seen + count >= rank:
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+        lower = upper
+    return LATENCY_BUCKETS[-1]
+
+
+def summarize(method_metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """Derived per-method figures: latency quantiles, averages and rates"""
+    calls = method_metrics['calls']
+    requests = calls + method_metrics['errors'] + method_metrics['rejected'] + method_metrics['cache_hits']
+    return {
+        'calls': calls,
+        'p50': quantile(method_metrics['buckets'], 0.5),
+        'p95': quantile(method_metrics['buckets'], 0.95),
+        'p99': quantile(method_metrics['buckets'], 0.99),
+        'mean': method_metrics['latency_sum'] / calls if calls else None,
+        'total_seconds': method_metrics['latency_sum'],
+        'avg_prompt_tokens': method_metrics['prompt_tokens'] / calls if calls else None,
+        'avg_response_tokens': method_metrics['response_tokens'] / calls if calls else None,
+        'parse_failures': method_metrics['parse_failures'],
+        'fallbacks': method_metrics['fallbacks'],
+        'fallback_rate': method_metrics['fallbacks'] / requests if requests else None,
+        'cache_hits': method_metrics['cache_hits'],
+        'errors': method_metrics['errors'],
+        'rejected': method_metrics['rejected'],
+        'timeouts': method_metrics['timeouts'],
+    }
+
+
+def render_prometheus(snapshot: Dict[str, Dict[str, Any]], prefix: str = 'smart_todo_ai') -> str:
+    """Prometheus text exposition (format 0.0.4) of a per-method snapshot"""
+    lines = [
+        f"# HELP {prefix}_upstream_seconds Latency of Gemini calls that returned a response",
+        f"# TYPE {prefix}_upstream_seconds histogram",
+    ]
+    for method, values in sorted(snapshot.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), values['buckets']):
+            cumulative += count
+            lines.append(f'{prefix}_upstream_seconds_bucket{{method="{method}",le="{bound}"}} {cumulative}')
+        lines.append(f'{prefix}_upstream_seconds_sum{{method="{method}"}} {values["latency_sum"]:.6f}')
+        lines.append(f'{prefix}_upstream_seconds_count{{method="{method}"}} {cumulative}')
+
+    for name in COUNTERS:
+        metric = f"{prefix}_{name}_total"
+        lines.append(f"# HELP {metric} {COUNTER_HELP[name]}")
+        lines.append(f"# TYPE {metric} counter")
+        for method, values in sorted(snapshot.items()):
+            lines.append(f'{metric}{{method="{method}"}} {values[name]}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsRegistry:
+    """Per-method counters and latency histograms for Gemini calls in this process.
+
+    Every ``AI_METRICS_FLUSH_SECONDS`` the process writes its snapshot to ``AIMetricsSnapshot``
+    so the metrics endpoint and the ``ai_metrics`` command can aggregate all workers.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self._lock = threading.Lock()
+        self._methods = {}
+        self._last_flush = monotonic()
+        self.process = f"{socket.gethostname()}:{os.getpid()}"
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'AI_METRICS_ENABLED', True)
+
+    def observe(self, method: str, seconds: float, prompt: str, response: str) -> None:
+        """Record one Gemini call that returned a response"""
+        if not self.enabled:
+            return
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+        with self._lock:
+            metrics = self._methods.setdefault(method, _empty())
+            metrics['calls'] += 1
+            metrics['buckets'][index] += 1
+            metrics['latency_sum'] += seconds
+            metrics['prompt_chars'] += len(prompt)
+            metrics['prompt_tokens'] += estimate_tokens(prompt)
+            metrics['response_chars'] += len(response)
+            metrics['response_tokens'] += estimate_tokens(response)
+        self._maybe_flush()
+
+    def increment(self, method: str, name: str, amount: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._methods.setdefault(method, _empty())[name] += amount
+        self._maybe_flush()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                method: {**values, 'buckets': list(values['buckets'])}
+                for method, values in self._methods.items()
+            }
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """This process's live metrics merged with recent snapshots of the other workers"""
+        return merge([self.snapshot()] + list(stored_snapshots(exclude=self.process).values()))
+
+    def flush(self) -> None:
+        from .models import AIMetricsSnapshot
+
+        self._last_flush = monotonic()
+        try:
+            AIMetricsSnapshot.objects.update_or_create(process=self.process, defaults={'data': self.snapshot()})
+        except Exception:
+            logger.warning("AI metrics flush failed", exc_info=True)
+
+    def _maybe_flush(self) -> None:
+        if monotonic() - self._last_flush >= getattr(settings, 'AI_METRICS_FLUSH_SECONDS', 30):
+            self.flush()
+
+
+def stored_snapshots(exclude: Optional[str] = None, max_age: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    """Snapshots written by worker processes within ``max_age`` seconds, keyed by process"""
+    from .models import AIMetricsSnapshot
+
+    if max_age is None:
+        max_age = getattr(settings, 'AI_METRICS_MAX_AGE', 3600)
+    rows = AIMetricsSnapshot.objects.filter(updated_at__gte=timezone.now() - timedelta(seconds=max_age))
+    if exclude:
+        rows = rows.exclude(process=exclude)
+    try:
+        return dict(rows.values_list('process', 'data'))
+    except Exception:
+        logger.warning("AI metrics read failed", exc_info=True)
+        return {}
+
+
+metrics = MetricsRegistry()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=metrics.reset)
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIResponseCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Fingerprint of method and normalized prompt', max_length=64, unique=True)),
+                ('method', models.CharField(max_length=50)),
+                ('response', models.JSONField(default=dict)),
+                ('hit_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['expires_at'], name='ai_module_a_expires_fc5a83_idx'), models.Index(fields=['method'], name='ai_module_a_method_b3bf0f_idx')],
+            },
+        ),
+    ]
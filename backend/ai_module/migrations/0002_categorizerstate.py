@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ai_module', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorizerState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_counts', models.JSONField(default=dict, help_text='Training documents per category')),
+                ('token_counts', models.JSONField(default=dict, help_text='Token counts per category')),
+                ('documents', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='categorizer_state', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
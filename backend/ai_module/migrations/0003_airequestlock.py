@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_module', '0002_categorizerstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIRequestLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Response cache fingerprint of the request', max_length=64, unique=True)),
+                ('method', models.CharField(max_length=50)),
+                ('owner', models.CharField(max_length=32)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_module', '0003_airequestlock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIMetricsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('process', models.CharField(help_text='host:pid of the worker', max_length=100, unique=True)),
+                ('data', models.JSONField(default=dict, help_text='Per-method counters and latency histogram')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
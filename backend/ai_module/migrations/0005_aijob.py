@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ai_module', '0004_aimetricssnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(help_text='Name of the registered job handler', max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=3)),
+                ('run_after', models.DateTimeField(help_text='Not claimed before this time (retry backoff)')),
+                ('locked_by', models.CharField(blank=True, help_text='host:pid of the worker running it', max_length=100)),
+                ('locked_until', models.DateTimeField(blank=True, help_text='Running jobs past this are reclaimed', null=True)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ai_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='ai_module_a_status_80d190_idx'), models.Index(fields=['status', 'locked_until'], name='ai_module_a_status_1b9a99_idx'), models.Index(fields=['user', 'kind', 'status'], name='ai_module_a_user_id_c85034_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,106 @@
 from django.db import models
+from django.contrib.auth.models import User
 
-# Create your models here.
+
+class AIResponseCache(models.Model):
+    """Persistent tier of the Gemini response cache"""
+    
+    key = models.CharField(max_length=64, unique=True, help_text="Fingerprint of method and normalized prompt")
+    method = models.CharField(max_length=50)
+    response = models.JSONField(default=dict)
+    hit_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['expires_at']),
+            models.Index(fields=['method']),
+        ]
+    
+    def __str__(self):
+        return f"{self.method} - {self.key[:12]}"
+
+
+class AIRequestLock(models.Model):
+    """Marks a Gemini request in flight in some worker so identical requests elsewhere wait for it"""
+    
+    key = models.CharField(max_length=64, unique=True, help_text="Response cache fingerprint of the request")
+    method = models.CharField(max_length=50)
+    owner = models.CharField(max_length=32)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.method} - {self.key[:12]}"
+
+
+class AIMetricsSnapshot(models.Model):
+    """Latest AI call metrics of one worker process, so all workers can be aggregated"""
+    
+    process = models.CharField(max_length=100, unique=True, help_text="host:pid of the worker")
+    data = models.JSONField(default=dict, help_text="Per-method counters and latency histogram")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.process} - {self.updated_at}"
+
+
+class CategorizerState(models.Model):
+    """Persisted counts of a user's local Naive Bayes task categorizer"""
+    
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='categorizer_state')
+    doc_counts = models.JSONField(default=dict, help_text="Training documents per category")
+    token_counts = models.JSONField(default=dict, help_text="Token counts per category")
+    documents = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.documents} documents"
+    
+    def to_categorizer(self):
+        from .categorizer import NaiveBayesCategorizer
+        return NaiveBayesCategorizer(self.doc_counts, self.token_counts)
+    
+    def update_from(self, categorizer):
+        self.doc_counts = categorizer.doc_counts
+        self.token_counts = categorizer.token_counts
+        self.documents = categorizer.documents
+
+
+class AIJob(models.Model):
+    """Durable queue entry for AI work run by the ``ai_worker`` command instead of the request"""
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_jobs')
+    kind = models.CharField(max_length=50, help_text="Name of the registered job handler")
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_after = models.DateTimeField(help_text="Not claimed before this time (retry backoff)")
+    locked_by = models.CharField(max_length=100, blank=True, help_text="host:pid of the worker running it")
+    locked_until = models.DateTimeField(null=True, blank=True, help_text="Running jobs past this are reclaimed")
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['status', 'locked_until']),
+            models.Index(fields=['user', 'kind', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} #{self.pk} - {self.status}"
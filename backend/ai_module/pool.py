@@ -0,0 +1,108 @@
+import itertools
+import logging
+import os
+import threading
+from typing import List, Optional
+
+import google.ai.generativelanguage as glm
+import google.generativeai as genai
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ModelPool:
+    """Process-wide, lazily built registry of Gemini transports and models.
+
+    One transport is kept per API key and one ``GenerativeModel`` per (API key, model name),
+    so requests stop paying for ``genai.configure`` and client construction. When several
+    keys are configured in ``GEMINI_API_KEYS`` requests are spread across them round-robin.
+    The pool is emptied in forked children (e.g. gunicorn workers) because gRPC channels
+    cannot be shared across a fork.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._transports = {}
+        self._models = {}
+        # api_key -> the transport setup error, so a bad key is not retried and logged per request
+        self._failed = {}
+        self._round_robin = itertools.count()
+        self.created_transports = 0
+        self.created_models = 0
+
+    def api_keys(self) -> List[str]:
+        keys = getattr(settings, 'GEMINI_API_KEYS', None) or [settings.GEMINI_API_KEY]
+        return [key for key in keys if key] or ['']
+
+    def get_model(self, model_name: Optional[str] = None, api_key: Optional[str] = None) -> genai.GenerativeModel:
+        model_name = model_name or getattr(settings, 'GEMINI_MODEL', 'gemini-2.0-flash')
+        if api_key is None:
+            keys = self.api_keys()
+            api_key = keys[next(self._round_robin) % len(keys)]
+
+        pool_key = (api_key, model_name)
+        model = self._models.get(pool_key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(pool_key)
+            if model is None:
+                model = genai.GenerativeModel(model_name)
+                if api_key in self._failed:
+                    return model
+                try:
+                    # GenerativeModel normally binds the module-level default client, which
+                    # supports a single key; bind the pooled per-key transport instead.
+                    model._client = self._get_transport(api_key)
+                except Exception as e:
+                    # Missing or invalid credentials: return an unpooled model so the error
+                    # surfaces on generate_content, where callers apply their fallbacks.
+                    logger.warning("Gemini transport setup failed: %s", e)
+                    self._failed[api_key] = str(e)
+                    return model
+                self._models[pool_key] = model
+                self.created_models += 1
+        return model
+
+    def _get_transport(self, api_key: str) -> glm.GenerativeServiceClient:
+        """Return the shared transport for api_key; the caller must hold the pool lock"""
+        transport = self._transports.get(api_key)
+        if transport is None:
+            options = {'client_options': {'api_key': api_key}}
+            if getattr(settings, 'GEMINI_TRANSPORT', None):
+                options['transport'] = settings.GEMINI_TRANSPORT
+            endpoint = getattr(settings, 'GEMINI_API_ENDPOINT', None)
+            if endpoint:
+                # Alternative hosts (such as the fake_gemini stand-in) are reached over REST
+                options['client_options']['api_endpoint'] = endpoint
+                options.setdefault('transport', 'rest')
+            transport = glm.GenerativeServiceClient(**options)
+            self._transports[api_key] = transport
+            self.created_transports += 1
+        return transport
+
+    def reset(self) -> None:
+        """Drop every pooled model and transport; they are rebuilt on next use"""
+        self._lock = threading.Lock()
+        self._transports = {}
+        self._models = {}
+        self._failed = {}
+
+    def stats(self) -> dict:
+        return {
+            'pid': os.getpid(),
+            'api_keys': len(self.api_keys()),
+            'pooled_models': len(self._models),
+            'pooled_transports': len(self._transports),
+            'failed_api_keys': len(self._failed),
+            'created_models': self.created_models,
+            'created_transports': self.created_transports,
+        }
+
+
+model_pool = ModelPool()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=model_pool.reset)
@@ -0,0 +1,233 @@
+import logging
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from time import monotonic
+from typing import Iterator
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling Gemini when the breaker is open or the limiter is saturated"""
+
+
+class CircuitBreaker:
+    """Error- and latency-based circuit breaker for upstream calls.
+
+    The outcomes of the last ``AI_BREAKER_WINDOW`` calls are kept; a call counts as failed if
+    it raised or took longer than ``AI_BREAKER_SLOW_CALL_SECONDS``. Once at least
+    ``AI_BREAKER_MIN_CALLS`` outcomes are recorded and the failure rate reaches
+    ``AI_BREAKER_FAILURE_RATE`` the breaker opens and calls are rejected immediately. After
+    ``AI_BREAKER_COOLDOWN`` seconds it lets a single probe through (half-open); a successful
+    probe closes it again and a failed one reopens it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.outcomes = deque(maxlen=self.window)
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def window(self) -> int:
+        return getattr(settings, 'AI_BREAKER_WINDOW', 20)
+
+    @property
+    def min_calls(self) -> int:
+        return getattr(settings, 'AI_BREAKER_MIN_CALLS', 5)
+
+    @property
+    def failure_rate(self) -> float:
+        return getattr(settings, 'AI_BREAKER_FAILURE_RATE', 0.5)
+
+    @property
+    def slow_call_seconds(self) -> float:
+        return getattr(settings, 'AI_BREAKER_SLOW_CALL_SECONDS', 10)
+
+    @property
+    def cooldown(self) -> float:
+        return getattr(settings, 'AI_BREAKER_COOLDOWN', 30)
+
+    def allow(self) -> bool:
+        """Whether a call may proceed; in half-open state only one probe is let through"""
+        with self._lock:
+            if self.state == OPEN and monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                logger.info("Gemini circuit half-open, probing upstream")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def cancel_probe(self) -> None:
+        """Give back a half-open probe slot that was granted but not used"""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def record(self, succeeded: bool, seconds: float) -> None:
+        failed = not succeeded or seconds >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probe_in_flight = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self.outcomes.clear()
+                    logger.info("Gemini circuit closed")
+                return
+            if self.state == OPEN:
+                # A call admitted before the breaker opened finished late; keep it open
+                return
+
+            self.outcomes.append(failed)
+            if len(self.outcomes) >= self.min_calls and \
+                    sum(self.outcomes) / len(self.outcomes) >= self.failure_rate:
+                self._open()
+
+    def _open(self) -> None:
+        """Open the breaker; the caller must hold the lock"""
+        self.state = OPEN
+        self.opened_at = monotonic()
+        self.outcomes.clear()
+        self.times_opened += 1
+        logger.warning("Gemini circuit opened for %ss", self.cooldown)
+
+    def stats(self) -> dict:
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(self.cooldown - (monotonic() - self.opened_at), 0), 1)
+            return {
+                'state': self.state,
+                'recent_calls': len(self.outcomes),
+                'recent_failures': sum(self.outcomes),
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'retry_in_seconds': retry_in,
+            }
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight upstream calls per process.
+
+    Callers beyond ``AI_UPSTREAM_CONCURRENCY`` wait up to ``AI_UPSTREAM_QUEUE_TIMEOUT`` seconds
+    for a slot and are rejected after that, so a slow upstream cannot absorb every worker.
+    """
+
+    def __init__(self):
+        self.limit = max(int(getattr(settings, 'AI_UPSTREAM_CONCURRENCY', 8)), 1)
+        self._slots = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.rejected = 0
+
+    @property
+    def queue_timeout(self) -> float:
+        return getattr(settings, 'AI_UPSTREAM_QUEUE_TIMEOUT', 5)
+
+    def acquire(self) -> bool:
+        with self._lock:
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self.waiting -= 1
+            if acquired:
+                self.in_flight += 1
+            else:
+                self.rejected += 1
+        return acquired
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'queue_depth': self.waiting,
+            'peak_queue_depth': self.peak_waiting,
+            'rejected': self.rejected,
+        }
+
+
+class UpstreamGuard:
+    """Process-wide breaker and limiter shared by every ``GeminiAIClient``"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.breaker = CircuitBreaker()
+        self.limiter = ConcurrencyLimiter()
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'AI_BREAKER_ENABLED', True)
+
+    @contextmanager
+    def call(self, method: str) -> Iterator[None]:
+        """Admit one upstream call, timing it and recording the outcome.
+
+        Raises ``UpstreamUnavailable`` without calling upstream when the breaker is open or
+        no slot frees up in time. Everything inside the block counts towards the call's
+        latency, so streamed responses should be consumed inside it.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        breaker = self.breaker
+        if not breaker.allow():
+            raise UpstreamUnavailable(f"{method}: circuit open")
+        limiter = self.limiter
+        if not limiter.acquire():
+            # Not the upstream's fault, so no outcome is recorded
+            breaker.cancel_probe()
+            raise UpstreamUnavailable(f"{method}: upstream concurrency limit reached")
+
+        started = monotonic()
+        succeeded = False
+        try:
+            yield
+            succeeded = True
+        except GeneratorExit:
+            # The consumer of a streamed response went away; not an upstream failure
+            succeeded = True
+            raise
+        finally:
+            limiter.release()
+            breaker.record(succeeded, monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            'pid': os.getpid(),
+            'enabled': self.enabled,
+            'breaker': self.breaker.stats(),
+            'limiter': self.limiter.stats(),
+        }
+
+
+upstream = UpstreamGuard()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=upstream.reset)
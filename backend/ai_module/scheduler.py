@@ -0,0 +1,214 @@
+import math
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .budget import PRIORITY_WEIGHTS, _parse_datetime
+
+SLOT_MINUTES = 5
+MIN_ALLOCATION = 15
+# Every this many work blocks the break is a long one
+LONG_BREAK_EVERY = 3
+
+COMMUNICATION_WORDS = re.compile(r'\b(call|email|e-mail|reply|meet|meeting|message|chat|follow up|sync)\b', re.IGNORECASE)
+CREATIVE_WORDS = re.compile(r'\b(design|write|draft|brainstorm|sketch|plan|blog|outline|idea)\w*', re.IGNORECASE)
+
+
+def _minutes(task: Dict[str, Any]) -> int:
+    """Task duration in minutes from ``estimated_duration`` hours, rounded up to the slot size"""
+    try:
+        hours = float(task.get('estimated_duration') or 1)
+    except (TypeError, ValueError):
+        hours = 1
+    minutes = max(hours * 60, MIN_ALLOCATION)
+    return int(math.ceil(minutes / SLOT_MINUTES) * SLOT_MINUTES)
+
+
+def _kind(task: Dict[str, Any], minutes: int) -> str:
+    title = task.get('title') or ''
+    if COMMUNICATION_WORDS.search(title):
+        return 'communication'
+    if CREATIVE_WORDS.search(title):
+        return 'creative'
+    if minutes <= 30 and task.get('priority') not in ('high', 'urgent'):
+        return 'admin'
+    return 'deep_work'
+
+
+def _edf_order(tasks: List[Dict[str, Any]]) -> List[Tuple[Optional[datetime], Dict[str, Any]]]:
+    """Earliest deadline first; undated tasks follow, most important first"""
+    keyed = []
+    for position, task in enumerate(tasks):
+        deadline = _parse_datetime(task.get('deadline'))
+        importance = float(task.get('ai_priority_score') or 0.5) + PRIORITY_WEIGHTS.get(task.get('priority'), 0.5)
+        key = (deadline is None, deadline.timestamp() if deadline else 0, -importance, str(task.get('id', '')), position)
+        keyed.append((key, deadline, task))
+    keyed.sort(key=lambda item: item[0])
+    return [(deadline, task) for _, deadline, task in keyed]
+
+
+def _clock(start: datetime, offset: int) -> str:
+    return (start + timedelta(minutes=offset)).strftime('%H:%M')
+
+
+class _Packer:
+    """Lays task chunks out back to back, opening a new block (after a break) when the kind
+    changes or the open block is full"""
+
+    def __init__(self, block_limit: int, short_break: int, long_break: int):
+        self.block_limit = block_limit
+        self.short_break = short_break
+        self.long_break = long_break
+        self.blocks = []
+        self.block = None
+        self.offset = 0
+
+    def pause(self, closed: int) -> int:
+        return self.long_break if closed % LONG_BREAK_EVERY == 0 else self.short_break
+
+    def chunks(self, minutes: int, kind: str):
+        """Yield (needs_new_block, chunk) for placing ``minutes`` of work, without changing state"""
+        open_kind = self.block['block_type'] if self.block else None
+        open_duration = self.block['duration'] if self.block else 0
+        while minutes > 0:
+            new_block = open_kind is None or open_kind != kind or open_duration >= self.block_limit
+            if new_block:
+                open_kind, open_duration = kind, 0
+            chunk = min(minutes, self.block_limit - open_duration)
+            open_duration += chunk
+            minutes -= chunk
+            yield new_block, chunk
+
+    def end_offset(self, minutes: int, kind: str) -> int:
+        """Where work of this length and kind would end if placed now"""
+        offset, closed, has_block = self.offset, len(self.blocks), self.block is not None
+        for new_block, chunk in self.chunks(minutes, kind):
+            if new_block and has_block:
+                closed += 1
+                offset += self.pause(closed)
+            has_block = True
+            offset += chunk
+        return offset
+
+    def place(self, task: Dict[str, Any], minutes: int, kind: str) -> int:
+        pieces = list(self.chunks(minutes, kind))
+        for part, (new_block, chunk) in enumerate(pieces, start=1):
+            if new_block:
+                self.close()
+                self.block = {'start_offset': self.offset, 'duration': 0, 'tasks': [], 'block_type': kind}
+            title = task.get('title', 'Task') + (f" (part {part}/{len(pieces)})" if len(pieces) > 1 else '')
+            self.block['tasks'].append({
+                'task_id': str(task.get('id', '')),
+                'task_title': title,
+                'allocated_time': chunk,
+                'priority': task.get('priority') or 'medium',
+            })
+            self.block['duration'] += chunk
+            self.offset += chunk
+        return self.offset
+
+    def close(self) -> None:
+        if self.block is None:
+            return
+        self.blocks.append(self.block)
+        self.block['break_after'] = self.pause(len(self.blocks))
+        self.offset += self.block['break_after']
+        self.block = None
+
+    def finish(self) -> List[Dict[str, Any]]:
+        if self.block is not None:
+            self.blocks.append(self.block)
+            self.block['break_after'] = 0
+            self.block = None
+        return self.blocks
+
+
+def build_time_blocks(tasks_data: List[Dict[str, Any]], available_hours: float,
+                      start_time: Optional[str] = None, plan_date: Optional[date] = None) -> Dict[str, Any]:
+    """Pack tasks into time blocks without calling Gemini.
+
+    Tasks are taken earliest-deadline-first (undated ones by ``ai_priority_score`` and
+    priority) and laid out back to back from ``start_time`` (default
+    ``AI_TIME_BLOCK_DAY_START``) on ``plan_date``, within ``available_hours`` including
+    breaks. Consecutive tasks of the same kind share a block of at most
+    ``AI_TIME_BLOCK_MAX_MINUTES``; longer tasks are split across blocks. Every block is
+    followed by a break, a long one after every third block. Returns the
+    ``generate_time_blocks`` response shape plus ``unscheduled`` (tasks that did not fit),
+    ``at_risk`` (tasks scheduled to finish after their deadline) and ``warnings`` about both.
+    """
+    packer = _Packer(
+        max(int(getattr(settings, 'AI_TIME_BLOCK_MAX_MINUTES', 90)), MIN_ALLOCATION),
+        int(getattr(settings, 'AI_TIME_BLOCK_BREAK_MINUTES', 10)),
+        int(getattr(settings, 'AI_TIME_BLOCK_LONG_BREAK_MINUTES', 30)),
+    )
+    capacity = int(float(available_hours) * 60)
+
+    hour, minute = (int(part) for part in (start_time or getattr(settings, 'AI_TIME_BLOCK_DAY_START', '09:00')).split(':'))
+    plan_date = plan_date or timezone.localdate()
+    day_start = timezone.make_aware(datetime.combine(plan_date, time(hour, minute)))
+
+    unscheduled, at_risk = [], []
+    worked = 0
+    for deadline, task in _edf_order(tasks_data):
+        minutes = _minutes(task)
+        kind = _kind(task, minutes)
+        if packer.end_offset(minutes, kind) > capacity:
+            unscheduled.append({'task_id': str(task.get('id', '')), 'task_title': task.get('title', 'Task'),
+                                'needed_minutes': minutes, 'deadline': task.get('deadline')})
+            continue
+
+        finish = day_start + timedelta(minutes=packer.place(task, minutes, kind))
+        worked += minutes
+        if deadline is not None and finish > deadline:
+            at_risk.append({'task_id': str(task.get('id', '')), 'task_title': task.get('title', 'Task'),
+                            'scheduled_end': finish.isoformat(), 'deadline': deadline.isoformat()})
+    blocks = packer.finish()
+    break_total = sum(block['break_after'] for block in blocks)
+
+    time_blocks = []
+    for index, block in enumerate(blocks):
+        start = block.pop('start_offset')
+        label = block['block_type'].replace('_', ' ').title()
+        block_type = block['block_type']
+        time_blocks.append({
+            'block_name': f"{label} {index + 1}",
+            'start_time': _clock(day_start, start),
+            'end_time': _clock(day_start, start + block['duration']),
+            'duration': block['duration'],
+            'tasks': block['tasks'],
+            'block_type': block_type,
+            # Demanding work early in the day, lighter work later
+            'energy_requirement': 'high' if block_type in ('deep_work', 'creative') and index < 2
+            else 'medium' if block_type in ('deep_work', 'creative') else 'low',
+            'break_after': block['break_after'],
+        })
+
+    warnings = []
+    if at_risk:
+        warnings.append(f"{len(at_risk)} task(s) finish after their deadline: " +
+                        ', '.join(item['task_title'] for item in at_risk[:3]))
+    if unscheduled:
+        warnings.append(f"{len(unscheduled)} task(s) did not fit in {available_hours} hours; "
+                        "consider delegating or moving them to another day")
+
+    return {
+        'time_blocks': time_blocks,
+        'blocking_strategy': {
+            'total_blocks': len(time_blocks),
+            'deep_work_blocks': sum(1 for block in time_blocks if block['block_type'] == 'deep_work'),
+            'admin_blocks': sum(1 for block in time_blocks if block['block_type'] == 'admin'),
+            'buffer_time': max(capacity - worked - break_total, 0),
+            'break_time': break_total,
+        },
+        'productivity_tips': [
+            "Tasks are ordered by deadline, then by priority",
+            "Take the scheduled breaks; a longer break follows every third block",
+        ],
+        'warnings': warnings,
+        'unscheduled': unscheduled,
+        'at_risk': at_risk,
+        'source': 'local',
+    }
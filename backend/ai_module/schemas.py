@@ -0,0 +1,445 @@
+"""Typed response schemas for each GeminiAIClient method.
+
+Schemas use the OpenAPI subset accepted by Gemini's structured-output mode
+(``response_schema``). The same definitions render the compact hints embedded in prompts,
+validate and repair parsed responses, and produce schema-valid example responses.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from .streaming import IncrementalJSONParser
+
+_decoder = json.JSONDecoder()
+_FAST_PATH_ATTEMPTS = 4
+
+
+def _string(*enum: str, nullable: bool = False) -> Dict[str, Any]:
+    schema = {'type': 'string'}
+    if enum:
+        schema['enum'] = list(enum)
+    if nullable:
+        schema['nullable'] = True
+    return schema
+
+
+def _number() -> Dict[str, Any]:
+    return {'type': 'number'}
+
+
+def _integer() -> Dict[str, Any]:
+    return {'type': 'integer'}
+
+
+def _array(items: Dict[str, Any]) -> Dict[str, Any]:
+    return {'type': 'array', 'items': items}
+
+
+def _object(required: Tuple[str, ...] = (), **properties: Dict[str, Any]) -> Dict[str, Any]:
+    schema = {'type': 'object', 'properties': properties}
+    if required:
+        schema['required'] = list(required)
+    return schema
+
+
+PRIORITY = _string('low', 'medium', 'high', 'urgent')
+LEVEL = _string('high', 'medium', 'low')
+STRINGS = _array(_string())
+
+INSIGHT = _object(
+    ('type', 'title'),
+    type=_string('deadline', 'priority', 'category', 'task_creation', 'schedule', 'reminder', 'pattern'),
+    title=_string(),
+    description=_string(),
+    confidence=_number(),
+    impact=LEVEL,
+    suggested_action=_object(
+        action_type=_string('create_task', 'update_priority', 'set_deadline', 'schedule_reminder'),
+        details=_string(),
+    ),
+)
+
+TASK_SUGGESTION = _object(
+    ('title',),
+    title=_string(),
+    description=_string(),
+    priority=PRIORITY,
+    category=_string(),
+    deadline=_string(nullable=True),
+)
+
+CONTEXT_ANALYSIS = _object(
+    ('keywords', 'insights', 'task_suggestions'),
+    keywords=STRINGS,
+    sentiment_analysis=_object(
+        overall_sentiment=_string('positive', 'negative', 'neutral'),
+        sentiment_score=_number(),
+        emotional_indicators=STRINGS,
+        confidence=_number(),
+    ),
+    urgency_analysis=_object(
+        urgency_level=_string('low', 'medium', 'high', 'critical'),
+        urgency_score=_number(),
+        urgency_indicators=STRINGS,
+        time_sensitivity=_string('immediate', 'today', 'this_week', 'flexible'),
+    ),
+    context_classification=_object(
+        primary_category=_string('work', 'personal', 'health', 'finance', 'social', 'education'),
+        subcategories=STRINGS,
+        relevance_score=_number(),
+    ),
+    task_extraction=_object(
+        potential_tasks=_array(_object(
+            ('title',),
+            title=_string(),
+            description=_string(),
+            priority=PRIORITY,
+            category=_string(),
+            deadline=_string(nullable=True),
+            confidence=_number(),
+        )),
+    ),
+    insights=_array(INSIGHT),
+    task_suggestions=_array(TASK_SUGGESTION),
+)
+
+CONTEXT_BATCH = _object(
+    ('results',),
+    results=_array(_object(
+        ('id', 'keywords', 'relevance_score'),
+        id=_integer(),
+        keywords=STRINGS,
+        sentiment_score=_number(),
+        urgency_indicators=STRINGS,
+        relevance_score=_number(),
+        insights=_array(INSIGHT),
+        task_suggestions=_array(TASK_SUGGESTION),
+    )),
+)
+
+PRIORITIZATION = _object(
+    ('prioritized_tasks',),
+    prioritized_tasks=_array(_object(
+        ('task_id', 'priority_score'),
+        task_id=_string(),
+        priority_score=_number(),
+        priority_level=PRIORITY,
+        reasoning=_string(),
+        suggested_deadline=_string(nullable=True),
+        estimated_duration=_string(),
+        dependencies=STRINGS,
+    )),
+    overall_insights=_string(),
+)
+
+DEADLINE_SUGGESTION = _object(
+    ('suggested_deadline',),
+    suggested_deadline=_string(),
+    reasoning=_string(),
+    estimated_duration=_string(),
+    complexity_score=_number(),
+    alternative_deadlines=_array(_object(deadline=_string(), scenario=_string())),
+)
+
+CATEGORIZATION = _object(
+    ('suggested_category',),
+    suggested_category=_string(),
+    confidence=_number(),
+    alternative_categories=STRINGS,
+    suggested_tags=STRINGS,
+    reasoning=_string(),
+)
+
+ENHANCEMENT = _object(
+    ('enhanced_description',),
+    enhanced_description=_string(),
+    added_details=STRINGS,
+    suggested_subtasks=_array(_object(('title',), title=_string(), description=_string())),
+    resources_needed=STRINGS,
+    potential_blockers=STRINGS,
+)
+
+TASK_ANALYSIS = _object(
+    enhancement=ENHANCEMENT,
+    deadline_suggestion=DEADLINE_SUGGESTION,
+    categorization=CATEGORIZATION,
+)
+
+DAILY_SUMMARY = _object(
+    ('summary',),
+    summary=_string(),
+    key_themes=STRINGS,
+    priority_areas=STRINGS,
+    recommendations=_array(_object(
+        ('title',),
+        type=_string('task_creation', 'priority_adjustment', 'schedule_change'),
+        title=_string(),
+        description=_string(),
+        urgency=LEVEL,
+    )),
+    schedule_suggestions=_array(_object(
+        ('time_slot', 'activity'),
+        time_slot=_string(),
+        activity=_string(),
+        reasoning=_string(),
+    )),
+)
+
+SCHEDULE = _object(
+    ('schedule',),
+    schedule=_array(_object(
+        ('time_slot', 'task_id'),
+        time_slot=_string(),
+        task_id=_string(),
+        task_title=_string(),
+        duration=_integer(),
+        priority=PRIORITY,
+        reasoning=_string(),
+        energy_level=LEVEL,
+        focus_required=LEVEL,
+    )),
+    schedule_insights=_object(
+        total_scheduled_hours=_number(),
+        high_priority_tasks=_integer(),
+        optimal_productivity_windows=STRINGS,
+        break_suggestions=STRINGS,
+    ),
+    recommendations=_array(_object(
+        ('title',),
+        type=_string('scheduling', 'productivity', 'break'),
+        title=_string(),
+        description=_string(),
+    )),
+)
+
+TIME_BLOCKS = _object(
+    ('time_blocks',),
+    time_blocks=_array(_object(
+        ('start_time', 'end_time'),
+        block_name=_string(),
+        start_time=_string(),
+        end_time=_string(),
+        duration=_integer(),
+        tasks=_array(_object(
+            ('task_id',),
+            task_id=_string(),
+            task_title=_string(),
+            allocated_time=_integer(),
+            priority=PRIORITY,
+        )),
+        block_type=_string('deep_work', 'admin', 'creative', 'communication'),
+        energy_requirement=LEVEL,
+        break_after=_integer(),
+    )),
+    blocking_strategy=_object(
+        total_blocks=_integer(),
+        deep_work_blocks=_integer(),
+        admin_blocks=_integer(),
+        buffer_time=_integer(),
+        break_time=_integer(),
+    ),
+    productivity_tips=STRINGS,
+)
+
+TIME_BLOCK_NOTES = _object(
+    ('blocks',),
+    blocks=_array(_object(
+        ('index', 'block_name'),
+        index=_integer(),
+        block_name=_string(),
+    )),
+    productivity_tips=STRINGS,
+)
+
+SCHEMAS = {
+    'analyze_context': CONTEXT_ANALYSIS,
+    'analyze_context_batch': CONTEXT_BATCH,
+    'prioritize_tasks': PRIORITIZATION,
+    'suggest_deadline': DEADLINE_SUGGESTION,
+    'categorize_task': CATEGORIZATION,
+    'enhance_task_description': ENHANCEMENT,
+    'analyze_task': TASK_ANALYSIS,
+    'generate_daily_summary': DAILY_SUMMARY,
+    'generate_schedule_suggestions': SCHEDULE,
+    'generate_time_blocks': TIME_BLOCKS,
+    'annotate_time_blocks': TIME_BLOCK_NOTES,
+}
+
+
+def schema_hint(schema: Dict[str, Any]) -> str:
+    """Compact one-line rendering of a schema for prompts, e.g. {"title":string,"tags":[string]}"""
+    kind = schema['type']
+    if kind == 'object':
+        fields = ','.join(f'"{name}":{schema_hint(prop)}' for name, prop in schema['properties'].items())
+        return '{' + fields + '}'
+    if kind == 'array':
+        return '[' + schema_hint(schema['items']) + ']'
+    if kind == 'string' and 'enum' in schema:
+        hint = '"' + '|'.join(schema['enum']) + '"'
+    else:
+        hint = kind
+    return hint + '|null' if schema.get('nullable') else hint
+
+
+SCHEMA_HINTS = {method: schema_hint(schema) for method, schema in SCHEMAS.items()}
+
+
+def example_for(schema: Dict[str, Any]) -> Any:
+    """A minimal value that conforms to the schema"""
+    kind = schema['type']
+    if kind == 'object':
+        return {name: example_for(prop) for name, prop in schema['properties'].items()}
+    if kind == 'array':
+        return [example_for(schema['items'])]
+    if kind == 'string':
+        return schema['enum'][0] if 'enum' in schema else 'example'
+    if kind == 'number':
+        return 0.5
+    if kind == 'integer':
+        return 1
+    return True
+
+
+def extract_json(text: str) -> Optional[Dict[str, Any]]:
+    """Extract the first top-level JSON object from model output in linear time.
+
+    Prose, Markdown fences and trailing text around the object are ignored, and braces inside
+    strings do not confuse the scan. A response truncated mid-object is repaired by closing
+    the open string and containers, backing off to the last complete member if needed.
+    """
+    # Fast path: let the C decoder parse from the first few candidate braces; raw_decode
+    # stops at the end of the object and ignores whatever follows it.
+    start = text.find('{')
+    if start < 0:
+        return None
+    for _ in range(_FAST_PATH_ATTEMPTS):
+        if start < 0:
+            break
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+            if isinstance(value, dict):
+                return value
+        except ValueError:
+            pass
+        start = text.find('{', start + 1)
+
+    parser = IncrementalJSONParser(())
+    parser.feed(text)
+    result = parser.result()
+    if result is not None or parser.root_start is None:
+        return result
+    return _repair_truncated(parser)
+
+
+def _repair_truncated(parser: IncrementalJSONParser) -> Optional[Dict[str, Any]]:
+    body = parser.buffer[parser.root_start:]
+    if parser.in_string:
+        body += '"'
+    closers = ''.join('}' if frame[0] == 'object' else ']' for frame in reversed(parser.stack))
+
+    # Back off to earlier member boundaries until the closed document parses (a few tries)
+    for _ in range(4):
+        candidate = body.rstrip().rstrip(',:')
+        try:
+            value = json.loads(candidate + closers)
+            return value if isinstance(value, dict) else None
+        except ValueError:
+            cut = body.rfind(',')
+            if cut <= 0:
+                return None
+            body = body[:cut]
+    return None
+
+
+def conform(value: Any, schema: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    """Validate a parsed value against a schema, coercing and pruning what can be repaired.
+
+    Returns ``(value, errors)``. ``value`` is None when it cannot be repaired; array items and
+    object members of the wrong type are dropped, numeric strings are coerced to numbers and a
+    bare value where a list is expected is wrapped. Objects missing required members are kept
+    and the gaps reported, so callers decide whether such an item is usable. Numbers are
+    accepted where strings are expected and unknown enum values are kept; the latter are reported.
+    """
+    errors = []
+    repaired = _conform(value, schema, None, errors)
+    return repaired, errors
+
+
+def _path(path: Optional[tuple]) -> str:
+    """Render a lazily built (parent, segment) path chain such as ``$.schedule[0].start``"""
+    segments = []
+    while path is not None:
+        path, segment = path
+        segments.append(f"[{segment}]" if isinstance(segment, int) else f".{segment}")
+    return '$' + ''.join(reversed(segments))
+
+
+def _conform(value: Any, schema: Dict[str, Any], path: Optional[tuple], errors: List[str]) -> Any:
+    kind = schema['type']
+
+    if value is None:
+        if not schema.get('nullable'):
+            errors.append(f"{_path(path)}: null")
+        return None
+
+    if kind == 'object':
+        if not isinstance(value, dict):
+            errors.append(f"{_path(path)}: expected object")
+            return None
+        result = {}
+        properties = schema['properties']
+        for name, member in value.items():
+            if name not in properties:
+                result[name] = member
+                continue
+            repaired = _conform(member, properties[name], (path, name), errors)
+            if repaired is not None or properties[name].get('nullable'):
+                result[name] = repaired
+        for name in schema.get('required', []):
+            if name not in result:
+                errors.append(f"{_path((path, name))}: missing")
+        return result
+
+    if kind == 'array':
+        if not isinstance(value, list):
+            value = [value]
+        items = []
+        for index, item in enumerate(value):
+            repaired = _conform(item, schema['items'], (path, index), errors)
+            if repaired is not None:
+                items.append(repaired)
+        return items
+
+    if kind in ('number', 'integer'):
+        if isinstance(value, bool):
+            errors.append(f"{_path(path)}: expected {kind}")
+            return None
+        if isinstance(value, str):
+            try:
+                value = float(value.strip().rstrip('%'))
+            except ValueError:
+                errors.append(f"{_path(path)}: expected {kind}")
+                return None
+        if not isinstance(value, (int, float)):
+            errors.append(f"{_path(path)}: expected {kind}")
+            return None
+        return int(round(value)) if kind == 'integer' else value
+
+    if kind == 'string':
+        if isinstance(value, (dict, list)):
+            errors.append(f"{_path(path)}: expected string")
+            return None
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            # Ids are often returned as numbers; keep them as the caller sent them
+            return value
+        value = value if isinstance(value, str) else str(value)
+        if 'enum' in schema and value not in schema['enum']:
+            lowered = value.strip().lower()
+            if lowered in schema['enum']:
+                return lowered
+            errors.append(f"{_path(path)}: unexpected value {value!r}")
+        return value
+
+    if kind == 'boolean':
+        return bool(value)
+
+    return value
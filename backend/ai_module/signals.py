@@ -0,0 +1,92 @@
+import logging
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from tasks.models import Category, Task
+from .categorizer import categorizer_registry, tokenize
+
+logger = logging.getLogger(__name__)
+
+# The task fields the categorizer learns from
+TRAINED_FIELDS = ('title', 'description', 'category_id')
+
+
+def _category_name(category_id):
+    if category_id is None:
+        return None
+    return Category.objects.filter(pk=category_id).values_list('name', flat=True).first()
+
+
+def _trained_state(instance):
+    """The task's trained fields as last saved or loaded, if every one is known"""
+    saved = getattr(instance, '_categorizer_state', None)
+    if saved is not None:
+        return saved
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    if all(name in loaded for name in TRAINED_FIELDS):
+        return {name: loaded[name] for name in TRAINED_FIELDS}
+    return None
+
+
+def _queue_training(user_id, updates):
+    """Hand the updates to a ``train_categorizer`` job once the task write has committed.
+
+    Training locks the user's CategorizerState row; doing it in the worker keeps that lock
+    out of the request transaction.
+    """
+    def submit():
+        from .jobs import enqueue
+
+        user = User.objects.filter(pk=user_id).first()
+        if user is None:
+            # Deleted along with its tasks; the model went with it
+            return
+        try:
+            enqueue('train_categorizer', user, {'updates': updates})
+        except Exception:
+            logger.warning("Could not queue categorizer training for user %s", user_id, exc_info=True)
+
+    transaction.on_commit(submit)
+
+
+def _update(title, description, category, weight):
+    return {'tokens': tokenize(title or '', description or ''), 'category': category, 'weight': weight}
+
+
+@receiver(post_save, sender=Task)
+def train_categorizer_on_save(sender, instance, created, raw=False, **kwargs):
+    """Teach the owner's categorizer the task's category, replacing what it learned before"""
+    if raw or not categorizer_registry.enabled:
+        return
+
+    current = {name: getattr(instance, name) for name in TRAINED_FIELDS}
+    previous = {} if created else _trained_state(instance)
+    instance._categorizer_state = current
+    if previous is None or previous == current:
+        # Unknown previous state (instance not loaded from the DB) or nothing relevant changed
+        return
+
+    updates = []
+    old_name = _category_name(previous.get('category_id'))
+    if old_name:
+        updates.append(_update(previous.get('title'), previous.get('description'), old_name, -1))
+    if instance.category_id is not None:
+        updates.append(_update(instance.title, instance.description, instance.category.name, 1))
+    if updates:
+        _queue_training(instance.user_id, updates)
+
+
+@receiver(post_delete, sender=Task)
+def forget_deleted_task(sender, instance, **kwargs):
+    if not categorizer_registry.enabled or instance.category_id is None:
+        return
+    previous = _trained_state(instance) or {}
+    name = _category_name(previous.get('category_id', instance.category_id))
+    if not name:
+        return
+    _queue_training(instance.user_id, [_update(
+        previous.get('title', instance.title), previous.get('description', instance.description), name, -1
+    )])
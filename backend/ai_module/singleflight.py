@@ -0,0 +1,207 @@
+import copy
+import logging
+import os
+import threading
+import uuid
+from datetime import timedelta
+from time import monotonic, sleep
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Coalesces identical in-flight Gemini requests so only one of them reaches upstream.
+
+    Requests are keyed like the response cache (method + normalized prompt). Within a
+    process, callers that arrive while a request with the same key is running wait for it
+    and get a copy of its result. With ``AI_SINGLEFLIGHT_SHARED`` the leader also takes a
+    row in ``AIRequestLock``, and leaders in other workers poll the response cache until
+    that row is released instead of calling Gemini themselves.
+    """
+
+    def __init__(self):
+        self.reset()
+        self.leaders = 0
+        self.coalesced = 0
+        self.shared_waits = 0
+        self.shared_hits = 0
+        self.timeouts = 0
+
+    def reset(self) -> None:
+        """Forget in-flight calls; a forked child cannot be woken by its parent's threads"""
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'AI_SINGLEFLIGHT_ENABLED', True)
+
+    @property
+    def shared(self) -> bool:
+        # Results travel between workers through the cache's DB tier
+        return getattr(settings, 'AI_SINGLEFLIGHT_SHARED', False) and response_cache.enabled
+
+    @property
+    def wait_timeout(self) -> float:
+        return getattr(settings, 'AI_SINGLEFLIGHT_WAIT', 30)
+
+    def do(
+        self, method: str, prompt: str, func: Callable[[], Dict[str, Any]], model: str = ''
+    ) -> Dict[str, Any]:
+        """Return func()'s result, sharing one execution among concurrent identical requests.
+
+        func is expected to store successful results in the response cache; that is what
+        lets late arrivals and other workers pick them up.
+        """
+        if not self.enabled:
+            return func()
+
+        key = response_cache.fingerprint(method, prompt, model)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                call.followers += 1
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                with self._lock:
+                    self.timeouts += 1
+                return func()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            result = self._lead(key, method, prompt, func, model)
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                followers = call.followers
+            if followers and call.error is None:
+                # The leader's caller may mutate its result; followers copy a private one
+                call.result = copy.deepcopy(result)
+            call.done.set()
+
+    def _lead(
+        self, key: str, method: str, prompt: str, func: Callable[[], Dict[str, Any]], model: str
+    ) -> Dict[str, Any]:
+        if not self.shared:
+            return func()
+
+        owner = self._acquire(key, method)
+        if owner is None:
+            with self._lock:
+                self.shared_waits += 1
+            cached, owner = self._await_other_worker(key, method, prompt, model)
+            if cached is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                return cached
+        try:
+            return func()
+        finally:
+            if owner:
+                self._release(key, owner)
+
+    def _acquire(self, key: str, method: str) -> Optional[str]:
+        """Take the cross-worker lock for key.
+
+        Returns the owner token, None when another worker holds the lock, or '' when the
+        lock table cannot be used (the caller then proceeds unlocked).
+        """
+        from .models import AIRequestLock
+
+        owner = uuid.uuid4().hex
+        now = timezone.now()
+        try:
+            AIRequestLock.objects.filter(key=key, expires_at__lte=now).delete()
+            with transaction.atomic():
+                AIRequestLock.objects.create(
+                    key=key, method=method, owner=owner,
+                    expires_at=now + timedelta(seconds=getattr(settings, 'AI_SINGLEFLIGHT_LOCK_TTL', 30))
+                )
+            return owner
+        except IntegrityError:
+            return None
+        except Exception:
+            logger.warning("AI request lock failed", exc_info=True)
+            return ''
+
+    def _await_other_worker(self, key: str, method: str, prompt: str, model: str):
+        """Poll for another worker's result; returns (cached result, None) or (None, owner token)"""
+        from .models import AIRequestLock
+
+        interval = getattr(settings, 'AI_SINGLEFLIGHT_POLL_INTERVAL', 0.2)
+        deadline = monotonic() + self.wait_timeout
+        while monotonic() < deadline:
+            sleep(interval)
+            cached = response_cache.get(method, prompt, count=False, model=model)
+            if cached is not None:
+                return cached, None
+            try:
+                released = not AIRequestLock.objects.filter(key=key).exists()
+            except Exception:
+                logger.warning("AI request lock failed", exc_info=True)
+                return None, ''
+            if released:
+                # The other worker gave up without caching a result; take over
+                owner = self._acquire(key, method)
+                if owner is not None:
+                    return None, owner
+        with self._lock:
+            self.timeouts += 1
+        return None, ''
+
+    def _release(self, key: str, owner: str) -> None:
+        from .models import AIRequestLock
+
+        try:
+            AIRequestLock.objects.filter(key=key, owner=owner).delete()
+        except Exception:
+            logger.warning("AI request lock release failed", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'shared': self.shared,
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'shared_waits': self.shared_waits,
+                'shared_hits': self.shared_hits,
+                'timeouts': self.timeouts,
+            }
+
+
+single_flight = SingleFlight()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=single_flight.reset)
@@ -0,0 +1,97 @@
+import json
+import re
+from typing import Any, Iterable, List, Optional, Tuple
+
+_STRUCTURAL = re.compile(r'[{}\[\]":,]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class IncrementalJSONParser:
+    """Incrementally scan a streamed JSON object and emit completed array items.
+
+    Text is fed as it arrives. Every object that is a direct element of one of the named
+    top-level arrays (e.g. ``"schedule": [{...}, {...}]``) is parsed and returned as soon as
+    its closing brace arrives, so callers can forward it before the response is complete.
+    Leading prose or Markdown fences before the first ``{`` are ignored, and braces inside
+    strings are not counted. The scan is linear and jumps between structural characters.
+    """
+
+    def __init__(self, array_keys: Iterable[str]):
+        self.array_keys = set(array_keys)
+        self.buffer = ''
+        self.pos = 0
+        self.root_start = None
+        self.root_end = None
+        # Each frame is [container type, key it is stored under, start offset if tracked]
+        self.stack = []
+        self.in_string = False
+        self.string_start = 0
+        self.last_string = None
+        self.pending_key = None
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        self.buffer += text
+        items = []
+        buffer = self.buffer
+
+        while self.root_end is None:
+            # Jump straight to the next character that can change the scanner state
+            pattern = _STRING_SPECIAL if self.in_string else _STRUCTURAL
+            match = pattern.search(buffer, self.pos)
+            if match is None:
+                self.pos = len(buffer)
+                break
+            self.pos = match.start()
+            ch = buffer[self.pos]
+
+            if self.in_string:
+                if ch == '\\':
+                    # Skip the escaped character; wait for more input if it has not arrived
+                    if self.pos + 1 >= len(buffer):
+                        break
+                    self.pos += 1
+                else:
+                    self.in_string = False
+                    self.last_string = buffer[self.string_start + 1:self.pos]
+            elif self.root_start is None:
+                if ch == '{':
+                    self.root_start = self.pos
+                    self.stack.append(['object', None, None])
+            elif ch == '"':
+                self.in_string = True
+                self.string_start = self.pos
+            elif ch == ':':
+                self.pending_key = self.last_string
+            elif ch == ',':
+                self.pending_key = None
+            elif ch in '{[':
+                parent = self.stack[-1]
+                key = self.pending_key if parent[0] == 'object' else None
+                tracked = (
+                    ch == '{' and len(self.stack) == 2
+                    and parent[0] == 'array' and parent[1] in self.array_keys
+                )
+                self.stack.append(['object' if ch == '{' else 'array', key, self.pos if tracked else None])
+                self.pending_key = None
+            else:
+                frame = self.stack.pop()
+                if frame[2] is not None:
+                    try:
+                        items.append((self.stack[-1][1], json.loads(buffer[frame[2]:self.pos + 1])))
+                    except ValueError:
+                        pass
+                if not self.stack:
+                    self.root_end = self.pos + 1
+
+            self.pos += 1
+
+        return items
+
+    def result(self) -> Optional[dict]:
+        """The complete top-level object, or None if the stream ended early or was invalid"""
+        if self.root_end is None:
+            return None
+        try:
+            return json.loads(self.buffer[self.root_start:self.root_end])
+        except ValueError:
+            return None
@@ -0,0 +1,175 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, DateTimeField, Exists, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from context.models import DEADLINE_KEYWORDS, ContextEntry, DailyContextSummary
+from tasks.models import Task
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_MENTION = Q()
+for _keyword in DEADLINE_KEYWORDS:
+    DEADLINE_MENTION |= Q(content__icontains=_keyword)
+
+
+def _floor(day: date) -> datetime:
+    """Earliest context a summary for ``day`` covers: AI_SUMMARY_LOOKBACK_DAYS before the day"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start - timedelta(days=getattr(settings, 'AI_SUMMARY_LOOKBACK_DAYS', 1))
+
+
+def window_start(user, day: date) -> datetime:
+    """Context since the user's previous summary was generated, bounded by the lookback"""
+    previous = DailyContextSummary.objects.filter(user=user, date__lt=day).order_by('-created_at') \
+        .values_list('created_at', flat=True).first()
+    floor = _floor(day)
+    return max(previous, floor) if previous else floor
+
+
+def _summary_inputs(user, since: datetime):
+    entries = ContextEntry.objects.filter(user=user, created_at__gte=since)
+    context_data = [
+        {'content': content, 'source_type': source_type, 'created_at': created_at.isoformat()}
+        for content, source_type, created_at in entries.order_by('created_at')
+        .values_list('content', 'source_type', 'created_at')
+    ]
+    tasks_data = [
+        {'title': title, 'priority': priority, 'deadline': deadline.isoformat() if deadline else None}
+        for title, priority, deadline in Task.objects.filter(
+            user=user, status__in=['pending', 'in_progress']
+        ).values_list('title', 'priority', 'deadline')
+    ]
+    return entries, context_data, tasks_data
+
+
+def _text_fields(summary_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'new_task_suggestions': len(summary_data.get('recommendations', [])),
+        'summary_text': summary_data.get('summary', ''),
+        'key_themes': summary_data.get('key_themes', []),
+        'priority_areas': summary_data.get('priority_areas', []),
+        'recommended_actions': summary_data.get('recommendations', []),
+        'schedule_suggestions': summary_data.get('schedule_suggestions', []),
+        'text_generated_at': timezone.now(),
+    }
+
+
+def _create_summary(user, day: date) -> DailyContextSummary:
+    """The day's summary row with its counters, created before the text is generated.
+
+    From here on entries saved for the user are counted into the row by
+    ``DailyContextSummary.bump``, so none saved while Gemini is writing is missed.
+    """
+    since = window_start(user, day)
+    with transaction.atomic():
+        counts = ContextEntry.objects.filter(user=user, created_at__gte=since).aggregate(
+            total=Count('id'),
+            high_priority=Count('id', filter=~Q(urgency_indicators=[])),
+            deadline_mentions=Count('id', filter=DEADLINE_MENTION),
+        )
+        summary, _ = DailyContextSummary.objects.get_or_create(
+            user=user, date=day,
+            defaults={
+                'total_entries': counts['total'],
+                'high_priority_indicators': counts['high_priority'],
+                'deadline_mentions': counts['deadline_mentions'],
+                'covers_from': since,
+            }
+        )
+    return summary
+
+
+def generate_daily_summary(user, day: date, refresh: bool = False) -> DailyContextSummary:
+    """The user's summary for ``day``, generating its text with Gemini unless it already has one.
+
+    With ``refresh`` an existing summary gets new AI text from its current context; its
+    counters are maintained incrementally and left as they are.
+    """
+    from .gemini_client import GeminiAIClient
+
+    summary = DailyContextSummary.objects.filter(user=user, date=day).first()
+    if summary is None:
+        summary = _create_summary(user, day)
+    elif not refresh and not summary.text_pending:
+        return summary
+
+    observed = summary.changes_since_text
+    _, context_data, tasks_data = _summary_inputs(user, summary.covers_from or window_start(user, day))
+    summary_data = GeminiAIClient().generate_daily_summary(context_data, tasks_data)
+    # Changes counted while Gemini was writing stay pending
+    DailyContextSummary.objects.filter(pk=summary.pk).update(
+        changes_since_text=F('changes_since_text') - observed, updated_at=timezone.now(),
+        **_text_fields(summary_data)
+    )
+    summary.refresh_from_db()
+    return summary
+
+
+def stale_summaries(day: date, user_ids: Optional[List[int]] = None):
+    """Summaries for ``day`` whose counters moved past the regeneration threshold, or without text"""
+    outdated = Q(
+        changes_since_text__gte=F('total_entries') * getattr(settings, 'AI_SUMMARY_REGENERATE_RATIO', 0.2)
+    ) & Q(changes_since_text__gte=getattr(settings, 'AI_SUMMARY_REGENERATE_MIN_CHANGES', 5))
+    # A row whose text generation failed after it was created
+    pending = Q(text_generated_at__isnull=True, summary_text='')
+    summaries = DailyContextSummary.objects.filter(outdated | pending, date=day).select_related('user')
+    if user_ids is not None:
+        summaries = summaries.filter(user_id__in=user_ids)
+    return summaries
+
+
+def users_due(day: date, user_ids: Optional[List[int]] = None):
+    """Active users without a summary for ``day`` who added context since their last one"""
+    last_summary = DailyContextSummary.objects.filter(user=OuterRef('pk')).order_by('-created_at').values('created_at')[:1]
+    users = User.objects.filter(is_active=True).exclude(daily_summaries__date=day).annotate(
+        last_summary=Subquery(last_summary)
+    )
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    since = Coalesce(OuterRef('last_summary'), Value(_floor(day), output_field=DateTimeField()))
+    return users.filter(Exists(ContextEntry.objects.filter(
+        user=OuterRef('pk'), created_at__gt=since, created_at__gte=_floor(day)
+    ))).order_by('pk')
+
+
+def precompute_daily_summaries(day: Optional[date] = None, user_ids: Optional[List[int]] = None,
+                               threads: Optional[int] = None) -> Dict[str, Any]:
+    """Generate ``day``'s summary for every due user on a bounded thread pool"""
+    started = perf_counter()
+    day = day or timezone.now().date()
+    threads = max(threads or getattr(settings, 'AI_SUMMARY_PRECOMPUTE_THREADS', 4), 1)
+    users = list(users_due(day, user_ids))
+    stale = [summary.user for summary in stale_summaries(day, user_ids)]
+
+    def generate(user, refresh=False) -> bool:
+        try:
+            generate_daily_summary(user, day, refresh=refresh)
+            return True
+        except Exception:
+            logger.exception("Daily summary for %s failed", user.username)
+            return False
+        finally:
+            # Pool threads open their own DB connections
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='daily-summary') as pool:
+        results = list(pool.map(generate, users))
+        refreshed = list(pool.map(lambda user: generate(user, refresh=True), stale))
+
+    return {
+        'date': day.isoformat(),
+        'due': len(users),
+        'generated': sum(results),
+        'refreshed': sum(refreshed),
+        'failed': len(results) - sum(results) + len(refreshed) - sum(refreshed),
+        'seconds': round(perf_counter() - started, 3),
+    }
@@ -1,3 +1,1056 @@
-from django.test import TestCase
+import threading
+from datetime import date, timedelta
+from io import StringIO
+from time import sleep
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from context.models import BulkProcessRun, ContextEntry
+from tasks.counters import usage_counters
+from tasks.models import Category, Task, TaskDailyRollup
+from tasks.rollups import COUNTERS, rebuild_rollups
+from . import jobs, schemas, scoring
+from .bulk import describe_run, drain, process_context_entries, start_run
+from .cache import ResponseCache
+from .categorizer import categorizer_registry
+from .dedup import BANDS, bands, closest, fingerprint, hamming, split_repeats
+from .gemini_client import GeminiAIClient
+from .models import AIJob, CategorizerState
+from .pool import ModelPool
+from .resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, UpstreamGuard, UpstreamUnavailable, upstream
+from .scheduler import build_time_blocks
+from .singleflight import SingleFlight
+from .triage import triage, triage_batch
+
+
+class ResponseCacheFingerprintTests(TestCase):
+    """Cached answers are keyed by model and response schema as well as the prompt"""
+
+    def key(self, prompt='a prompt', model='gemini-2.0-flash'):
+        return ResponseCache.fingerprint('prioritize_tasks', prompt, model)
+
+    def test_whitespace_does_not_change_the_key(self):
+        self.assertEqual(self.key('a  prompt\n'), self.key())
+
+    def test_model_changes_the_key(self):
+        self.assertNotEqual(self.key(model='gemini-1.5-pro'), self.key())
+
+    def test_schema_and_version_change_the_key(self):
+        key = self.key()
+        with mock.patch.dict(schemas.SCHEMA_HINTS, {'prioritize_tasks': 'changed'}):
+            self.assertNotEqual(self.key(), key)
+        with mock.patch.object(ResponseCache, 'CACHE_VERSION', ResponseCache.CACHE_VERSION + 1):
+            self.assertNotEqual(self.key(), key)
+
+
+class FakeStreamingModel:
+    def __init__(self, pieces, error=None):
+        self.pieces = pieces
+        self.error = error
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        for piece in self.pieces:
+            yield SimpleNamespace(text=piece)
+        if self.error:
+            raise self.error
+
+
+@override_settings(AI_CACHE_ENABLED=False)
+class StreamJSONTests(TestCase):
+    """Streamed items are conformed to their schema and failures are announced"""
+
+    tasks = [{'id': 1, 'title': 'Write report', 'priority': 'high', 'estimated_duration': 60}]
+
+    def stream(self, pieces, error=None):
+        client = GeminiAIClient()
+        client.model = FakeStreamingModel(pieces, error)
+        return list(client.stream_time_blocks(self.tasks, 4))
+
+    def test_items_are_conformed_before_they_are_sent(self):
+        events = self.stream([
+            '{"time_blocks": [{"start_time": "09:00", "end_time": "10:00", "duration": "60"}, ',
+            '"not a block"]}',
+        ])
+
+        items = [data['item'] for event, data in events if event == 'item']
+        self.assertEqual(items, [{'start_time': '09:00', 'end_time': '10:00', 'duration': 60}])
+        self.assertEqual(events[-1], ('result', {'time_blocks': items}))
+
+    def test_mid_stream_failure_sends_an_error_before_the_fallback(self):
+        with self.assertLogs('ai_module.gemini_client', 'ERROR'):
+            events = self.stream(
+                ['{"time_blocks": [{"start_time": "09:00", "end_time": "10:00"}, '], RuntimeError('reset')
+            )
+
+        self.assertEqual([event for event, _ in events], ['item', 'error', 'result'])
+        self.assertEqual(events[1][1], {'reason': 'errors', 'discarded_items': 1, 'fallback': True})
+        self.assertEqual(
+            events[2][1], GeminiAIClient()._default_time_blocks(self.tasks, 4)
+        )
+
+
+class CategorizerTrainingTests(TestCase):
+    """Task writes queue categorizer training instead of locking its state in the request"""
+
+    def setUp(self):
+        categorizer_registry.clear()
+        self.user = User.objects.create_user(username='trainer', password='x')
+        self.work = Category.objects.create(name='Work')
+        self.home = Category.objects.create(name='Home')
+
+    def tearDown(self):
+        # Category usage is buffered; drop it with the test data
+        usage_counters.reset()
+
+    def doc_counts(self):
+        return CategorizerState.objects.get(user=self.user).doc_counts
+
+    def test_save_queues_a_job_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(user=self.user, title='Quarterly report', category=self.work)
+
+        job = AIJob.objects.get(kind='train_categorizer')
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.payload['updates'], [{'tokens': ['quarterly', 'report'], 'category': 'Work', 'weight': 1}])
+        self.assertFalse(CategorizerState.objects.exists())
+
+    @override_settings(AI_JOBS_ENABLED=False)
+    def test_relabel_and_delete_move_the_counts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(user=self.user, title='Quarterly report', category=self.work)
+        self.assertEqual(self.doc_counts(), {'Work': 1})
+
+        task = Task.objects.get(pk=task.pk)
+        loaded = dict(task._loaded_values)
+        task.category = self.home
+        with self.captureOnCommitCallbacks(execute=True):
+            task.save()
+        self.assertEqual(self.doc_counts(), {'Home': 1})
+        # The snapshot for the next save lives apart from the values the task was loaded with
+        self.assertEqual(task._loaded_values, loaded)
+        self.assertEqual(task._categorizer_state['category_id'], self.home.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.delete()
+        self.assertEqual(self.doc_counts(), {})
+
+    def test_unchanged_save_queues_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(user=self.user, title='Report', category=self.work)
+        task = Task.objects.get(pk=task.pk)
+        task.priority = 'high'
+        with self.captureOnCommitCallbacks(execute=True):
+            task.save()
+        self.assertEqual(AIJob.objects.filter(kind='train_categorizer').count(), 1)
+
+
+MEETING = (
+    'Reminder: the quarterly planning review with the product and design teams is moved to the large '
+    'conference room, please bring your roadmap notes and the open questions from last week'
+)
+
+
+class DedupTests(TestCase):
+    """SimHash banding finds near-duplicate entries whose analyses can be reused"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='dedup', password='x')
+
+    def entry(self, content, **fields):
+        return ContextEntry.objects.create(user=self.user, source_type='whatsapp', content=content, **fields)
+
+    def test_fingerprint_ignores_chat_noise_and_tolerates_small_edits(self):
+        self.assertEqual(fingerprint('[12/03/2024, 10:15] Alice: ' + MEETING), fingerprint(MEETING))
+        self.assertEqual(fingerprint('Fwd: ' + MEETING), fingerprint(MEETING))
+        self.assertLessEqual(hamming(fingerprint(MEETING), fingerprint(MEETING.replace('bring', 'bring along'))), 3)
+        self.assertGreater(hamming(fingerprint(MEETING), fingerprint('Lunch order for friday: two wraps')), 3)
+        self.assertTrue(-(1 << 63) <= fingerprint(MEETING) < (1 << 63))
+
+    def test_fingerprints_within_bands_minus_one_bits_share_a_band(self):
+        value = fingerprint(MEETING)
+        for bits in ((0, 17, 33), (5, 21, 40), (15, 31, 47), (63, 62, 61)):
+            near = value
+            for bit in bits:
+                near ^= 1 << bit
+            near = near - (1 << 64) if near >= 1 << 63 else near
+            self.assertEqual(hamming(value, near), BANDS - 1)
+            self.assertTrue(set(enumerate(bands(value))) & set(enumerate(bands(near))), bits)
+
+    def test_numbers_must_match(self):
+        entry = SimpleNamespace(user_id=1, simhash=42, content=MEETING + ' at 10:30')
+        other_time = SimpleNamespace(user_id=1, simhash=42, content=MEETING + ' at 11:30')
+        same_time = SimpleNamespace(user_id=1, simhash=43, content=MEETING + ' at 10:30')
+        other_user = SimpleNamespace(user_id=2, simhash=42, content=MEETING + ' at 10:30')
+
+        self.assertIsNone(closest(entry, [other_time, other_user]))
+        self.assertIs(closest(entry, [other_time, same_time]), same_time)
+
+    def test_short_texts_must_match_exactly(self):
+        entry = SimpleNamespace(user_id=1, simhash=0b1000, content='call mum')
+        self.assertIsNone(closest(entry, [SimpleNamespace(user_id=1, simhash=0b1001, content='call mom')]))
+        self.assertIsNotNone(closest(entry, [SimpleNamespace(user_id=1, simhash=0b1000, content='Call mum')]))
+
+    def test_split_repeats_groups_behind_the_first_occurrence(self):
+        first = self.entry(MEETING)
+        repeat = self.entry('Fwd: ' + MEETING)
+        distinct = self.entry(MEETING + ' at 10:30')
+
+        representatives, repeats = split_repeats([first, repeat, distinct])
+
+        self.assertEqual(representatives, [first, distinct])
+        self.assertEqual(repeats, {first.pk: [repeat]})
+
+    def test_find_analyzed_duplicates_uses_the_bands(self):
+        original = self.entry(MEETING)
+        original.apply_analysis({'keywords': ['planning'], 'relevance_score': 0.9})
+        self.entry(MEETING + ' at 10:30').apply_analysis({'keywords': ['other']})
+        near = self.entry(MEETING.replace('bring', 'bring along'))
+        unrelated = self.entry('Lunch order for friday: two veggie wraps, one soup and a large salad please')
+
+        matches = ContextEntry.find_analyzed_duplicates([near, unrelated])
+
+        self.assertEqual(matches, {near.pk: original})
+
+    def test_copy_analysis_points_at_the_root(self):
+        original = self.entry(MEETING)
+        original.apply_analysis({'keywords': ['planning'], 'urgency_indicators': ['moved'], 'relevance_score': 0.9})
+        copy = self.entry('Fwd: ' + MEETING)
+        copy.copy_analysis_from(original)
+        copy_of_copy = self.entry('> ' + MEETING)
+        copy_of_copy.copy_analysis_from(copy)
+
+        copy_of_copy.refresh_from_db()
+        self.assertEqual(copy_of_copy.duplicate_of_id, original.pk)
+        self.assertEqual(copy_of_copy.processed_insights['copied_from'], original.pk)
+        self.assertEqual(copy_of_copy.keywords, ['planning'])
+        self.assertEqual(copy_of_copy.urgency_indicators, ['moved'])
+        self.assertTrue(copy_of_copy.is_processed)
+
+    @override_settings(AI_TRIAGE_ENABLED=False, AI_DEDUP_ENABLED=True)
+    def test_bulk_processing_analyzes_each_distinct_entry_once(self):
+        first = self.entry(MEETING)
+        repeat = self.entry('Fwd: ' + MEETING)
+        distinct = self.entry(MEETING + ' at 10:30')
+        client = mock.Mock(upstream_calls=0)
+        client.analyze_context_batch.side_effect = lambda batch: {
+            item['id']: {'keywords': [f"entry{item['id']}"], 'relevance_score': 0.7} for item in batch
+        }
+
+        processed = process_context_entries([first, repeat, distinct], client)
+
+        self.assertEqual(processed, 3)
+        (batch,), _ = client.analyze_context_batch.call_args
+        self.assertEqual([item['id'] for item in batch], [first.pk, distinct.pk])
+        repeat.refresh_from_db()
+        self.assertEqual((repeat.duplicate_of_id, repeat.keywords), (first.pk, [f'entry{first.pk}']))
+        distinct.refresh_from_db()
+        self.assertIsNone(distinct.duplicate_of_id)
+
+
+@override_settings(
+    AI_TIME_BLOCK_MAX_MINUTES=90, AI_TIME_BLOCK_BREAK_MINUTES=10, AI_TIME_BLOCK_LONG_BREAK_MINUTES=30
+)
+class TimeBlockSchedulerTests(SimpleTestCase):
+    """The local engine packs tasks earliest deadline first into blocks separated by breaks"""
+
+    day = date(2026, 3, 2)
+
+    def plan(self, tasks, hours=8):
+        return build_time_blocks(tasks, hours, start_time='09:00', plan_date=self.day)
+
+    def task_ids(self, plan):
+        # Split tasks appear once per part; keep the order of their first part
+        return list(dict.fromkeys(task['task_id'] for block in plan['time_blocks'] for task in block['tasks']))
+
+    def test_deadline_order_then_importance(self):
+        plan = self.plan([
+            {'id': 1, 'title': 'Undated low', 'priority': 'low', 'estimated_duration': 1},
+            {'id': 2, 'title': 'Due friday', 'priority': 'low', 'estimated_duration': 1, 'deadline': '2026-03-06T17:00:00Z'},
+            {'id': 3, 'title': 'Undated urgent', 'priority': 'urgent', 'estimated_duration': 1},
+            {'id': 4, 'title': 'Due tomorrow', 'priority': 'low', 'estimated_duration': 1, 'deadline': '2026-03-03T17:00:00Z'},
+        ])
+
+        self.assertEqual(self.task_ids(plan), ['4', '2', '3', '1'])
+        self.assertEqual(plan['unscheduled'], [])
+        self.assertEqual(plan['at_risk'], [])
+
+    def test_blocks_are_capped_and_separated_by_breaks(self):
+        plan = self.plan([{'id': i, 'title': f'Analysis {i}', 'estimated_duration': 1.5} for i in range(4)], hours=7)
+
+        blocks = plan['time_blocks']
+        self.assertEqual([(block['start_time'], block['end_time']) for block in blocks], [
+            ('09:00', '10:30'), ('10:40', '12:10'), ('12:20', '13:50'), ('14:20', '15:50'),
+        ])
+        # A long break follows every third block and the last block has none
+        self.assertEqual([block['break_after'] for block in blocks], [10, 10, 30, 0])
+        self.assertEqual(plan['blocking_strategy']['break_time'], 50)
+        self.assertEqual(plan['blocking_strategy']['buffer_time'], 7 * 60 - 4 * 90 - 50)
+
+    def test_long_tasks_are_split_and_kinds_get_their_own_blocks(self):
+        plan = self.plan([
+            {'id': 1, 'title': 'Migration', 'estimated_duration': 2},
+            {'id': 2, 'title': 'Call the client', 'estimated_duration': 0.5},
+        ])
+
+        blocks = plan['time_blocks']
+        self.assertEqual([block['block_type'] for block in blocks], ['deep_work', 'deep_work', 'communication'])
+        self.assertEqual([task['task_title'] for task in blocks[0]['tasks']], ['Migration (part 1/2)'])
+        self.assertEqual(blocks[1]['tasks'][0]['allocated_time'], 30)
+        self.assertEqual(blocks[2]['start_time'], '11:20')
+
+    def test_tasks_that_do_not_fit_are_unscheduled(self):
+        plan = self.plan([
+            {'id': 1, 'title': 'First', 'estimated_duration': 1.5, 'deadline': '2026-03-02T12:00:00Z'},
+            {'id': 2, 'title': 'Second', 'estimated_duration': 1.5, 'deadline': '2026-03-02T13:00:00Z'},
+            {'id': 3, 'title': 'Tidy inbox', 'priority': 'low', 'estimated_duration': 0.25},
+        ], hours=2)
+
+        self.assertEqual(self.task_ids(plan), ['1', '3'])
+        self.assertEqual(plan['unscheduled'], [{
+            'task_id': '2', 'task_title': 'Second', 'needed_minutes': 90, 'deadline': '2026-03-02T13:00:00Z',
+        }])
+        self.assertIn('did not fit in 2 hours', plan['warnings'][0])
+
+    def test_tasks_finishing_after_their_deadline_are_at_risk(self):
+        plan = self.plan([
+            {'id': 1, 'title': 'Slides', 'estimated_duration': 1, 'deadline': '2026-03-02T09:30:00Z'},
+            {'id': 2, 'title': 'Notes', 'estimated_duration': 1, 'deadline': '2026-03-02T12:00:00Z'},
+        ])
+
+        self.assertEqual([item['task_id'] for item in plan['at_risk']], ['1'])
+        self.assertEqual(plan['at_risk'][0]['scheduled_end'], '2026-03-02T10:00:00+00:00')
+        self.assertIn('finish after their deadline: Slides', plan['warnings'][0])
+
+
+@override_settings(
+    AI_BREAKER_ENABLED=True, AI_BREAKER_WINDOW=10, AI_BREAKER_MIN_CALLS=4, AI_BREAKER_FAILURE_RATE=0.5,
+    AI_BREAKER_SLOW_CALL_SECONDS=5, AI_BREAKER_COOLDOWN=30
+)
+class CircuitBreakerTests(SimpleTestCase):
+    """The breaker opens on failing or slow calls and probes upstream once after its cooldown"""
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('ai_module.resilience.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker()
+
+    def trip(self):
+        for _ in range(4):
+            self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_needs_min_calls_before_tripping(self):
+        for _ in range(3):
+            self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats()['rejected'], 1)
+
+    def test_trips_at_the_failure_rate(self):
+        for succeeded in (True, True, True, False, False):
+            self.breaker.record(succeeded, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.stats()['times_opened'], 1)
+
+    def test_slow_calls_count_as_failures(self):
+        for _ in range(4):
+            self.breaker.record(True, 5)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_single_probe_after_cooldown(self):
+        self.trip()
+        self.now += 29
+        self.assertFalse(self.breaker.allow())
+
+        self.now += 1
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.breaker.cancel_probe()
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record(True, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.stats()['recent_calls'], 0)
+
+    def test_failed_probe_reopens(self):
+        self.trip()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(False, 0.1)
+
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.stats()['retry_in_seconds'], 30)
+        self.assertEqual(self.breaker.stats()['times_opened'], 2)
+
+    def test_guard_rejects_while_open_and_treats_abandoned_streams_as_success(self):
+        guard = UpstreamGuard()
+
+        def stream():
+            with guard.call('stream'):
+                yield 1
+                yield 2
+
+        for _ in range(4):
+            chunks = stream()
+            next(chunks)
+            # The client disconnected: closing raises GeneratorExit inside the call
+            chunks.close()
+        self.assertEqual(guard.breaker.state, CLOSED)
+        self.assertEqual(guard.breaker.stats()['recent_failures'], 0)
+        self.assertEqual(guard.limiter.stats()['in_flight'], 0)
+
+        for _ in range(4):
+            with self.assertRaises(RuntimeError), guard.call('boom'):
+                raise RuntimeError('upstream error')
+        with self.assertRaises(UpstreamUnavailable), guard.call('rejected'):
+            self.fail('called while the circuit is open')
+
+
+class HealthEndpointTests(TestCase):
+    """/api/ai/health/ reports 503 while the circuit is open"""
+
+    def tearDown(self):
+        upstream.reset()
+
+    @override_settings(AI_BREAKER_ENABLED=True)
+    def test_status_follows_the_breaker(self):
+        upstream.reset()
+        client = APIClient()
+        response = client.get('/api/ai/health/')
+        self.assertEqual((response.status_code, response.data['status']), (200, 'ok'))
+
+        upstream.breaker.state = OPEN
+        upstream.breaker.opened_at = 0
+        with mock.patch('ai_module.resilience.monotonic', return_value=1):
+            response = client.get('/api/ai/health/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data['status'], 'degraded')
+        self.assertEqual(response.data['breaker']['state'], OPEN)
+
+
+class StatsEndpointTests(TestCase):
+    """/api/ai/stats/ is limited to staff and the metrics token, like /api/ai/metrics/"""
+
+    url = '/api/ai/stats/'
+
+    def setUp(self):
+        self.client = APIClient()
+
+    @override_settings(AI_METRICS_TOKEN='')
+    def test_staff_only(self):
+        self.client.force_authenticate(User.objects.create_user(username='member', password='x'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='x', is_staff=True))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('single_flight', response.data)
+
+    @override_settings(AI_METRICS_TOKEN='scrape')
+    def test_metrics_token(self):
+        self.assertIn(self.client.get(self.url).status_code, (401, 403))
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer scrape')
+        self.assertEqual(response.status_code, 200)
+
+
+def wait_until(condition, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        sleep(0.01)
+    raise AssertionError('condition not reached')
+
+
+class ModelPoolTests(SimpleTestCase):
+    """A key whose transport cannot be built is logged once, not on every request"""
+
+    def test_transport_failure_is_remembered_per_key(self):
+        pool = ModelPool()
+        with mock.patch('ai_module.pool.glm.GenerativeServiceClient', side_effect=ValueError('bad key')) as client:
+            with self.assertLogs('ai_module.pool', 'WARNING') as logs:
+                for _ in range(3):
+                    model = pool.get_model('gemini-test', api_key='bad')
+                pool.get_model('gemini-test', api_key='other')
+
+        self.assertEqual(client.call_count, 2)
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(model.model_name, 'models/gemini-test')
+        self.assertEqual(pool.stats()['failed_api_keys'], 2)
+        self.assertEqual(pool.stats()['pooled_models'], 0)
+
+        pool.reset()
+        self.assertEqual(pool.stats()['failed_api_keys'], 0)
+
+
+class SchemaTests(SimpleTestCase):
+    """Model output is extracted and repaired against the response schemas"""
+
+    def test_extract_json_from_fences_and_prose(self):
+        fenced = '```json\n{"category": "Work", "confidence": 0.9}\n```'
+        prose = 'Sure! Here is the analysis: {"note": "use {braces} freely", "n": [1, 2]} Hope this helps {'
+
+        self.assertEqual(schemas.extract_json(fenced), {'category': 'Work', 'confidence': 0.9})
+        self.assertEqual(schemas.extract_json(prose), {'note': 'use {braces} freely', 'n': [1, 2]})
+        self.assertIsNone(schemas.extract_json('No JSON here'))
+        self.assertIsNone(schemas.extract_json('[1, 2, 3]'))
+
+    def test_extract_json_repairs_truncated_output(self):
+        self.assertEqual(
+            schemas.extract_json('{"keywords": ["report", "dead'), {'keywords': ['report', 'dead']}
+        )
+        self.assertEqual(
+            schemas.extract_json('```json\n{"summary": "Busy day", "recommendations": [{"title": "Pl'),
+            {'summary': 'Busy day', 'recommendations': [{'title': 'Pl'}]}
+        )
+        # A dangling key backs off to the last complete member
+        self.assertEqual(schemas.extract_json('{"a": 1, "b": {"c": 2, "d":'), {'a': 1, 'b': {'c': 2}})
+
+    def test_conform_coerces_and_drops_wrong_types(self):
+        value, errors = schemas.conform({
+            'keywords': 'report',
+            'sentiment_score': '0.4',
+            'relevance_score': 'high',
+            'insights': [{'type': 'deadline', 'title': 'Due Friday', 'confidence': '80%'}, 'not an insight'],
+            'extra': 1,
+        }, schemas.CONTEXT_BATCH['properties']['results']['items'])
+
+        self.assertEqual(value, {
+            'keywords': ['report'],
+            'sentiment_score': 0.4,
+            'insights': [{'type': 'deadline', 'title': 'Due Friday', 'confidence': 80.0}],
+            'extra': 1,
+        })
+        self.assertIn('$.relevance_score: expected number', errors)
+        self.assertIn('$.insights[1]: expected object', errors)
+        self.assertIn('$.id: missing', errors)
+
+    def test_conform_keeps_objects_missing_required_members(self):
+        value, errors = schemas.conform(
+            {'keywords': [], 'insights': [], 'task_suggestions': [{'description': 'No title'}]},
+            schemas.CONTEXT_ANALYSIS
+        )
+
+        self.assertEqual(value['task_suggestions'], [{'description': 'No title'}])
+        self.assertEqual(errors, ['$.task_suggestions[0].title: missing'])
+
+    def test_conform_enums_and_nulls(self):
+        value, errors = schemas.conform(
+            {'title': 'Plan', 'priority': 'URGENT', 'deadline': None}, schemas.TASK_SUGGESTION
+        )
+        self.assertEqual((value['priority'], value['deadline'], errors), ('urgent', None, []))
+
+        value, errors = schemas.conform({'title': 'Plan', 'priority': 'someday'}, schemas.TASK_SUGGESTION)
+        self.assertEqual(value['priority'], 'someday')
+        self.assertEqual(errors, ["$.priority: unexpected value 'someday'"])
+
+        self.assertEqual(schemas.conform('text', schemas.TASK_SUGGESTION), (None, ['$: expected object']))
+
+
+class TriageTests(SimpleTestCase):
+    """Local triage scores entries and escalates only the relevant ones to Gemini"""
+
+    URGENT = 'URGENT: please submit the quarterly report by friday, the deadline is 5pm'
+    NEGATIVE = 'Unfortunately the release failed again and the client is upset'
+
+    def test_urgent_entry_is_escalated(self):
+        result = triage(self.URGENT, 'email')
+
+        self.assertTrue(result['needs_llm'])
+        self.assertGreater(result['relevance_score'], 0.9)
+        self.assertEqual(result['urgency_indicators'], ['by friday', 'deadline', 'urgent'])
+        self.assertIn('submit', result['keywords'])
+        self.assertEqual(result['time_mentions'], 2)
+
+    def test_chatter_stays_local(self):
+        result = triage('lol ok', 'whatsapp')
+
+        self.assertFalse(result['needs_llm'])
+        self.assertLess(result['relevance_score'], 0.1)
+        self.assertEqual(result['sentiment_score'], 0.0)
+        self.assertEqual((result['urgency_indicators'], result['keywords']), ([], []))
+
+    def test_negative_entry(self):
+        result = triage(self.NEGATIVE, 'email')
+
+        self.assertLess(result['sentiment_score'], -0.5)
+        self.assertFalse(result['needs_llm'])
+
+    def test_relevance_threshold(self):
+        relevance = triage(self.NEGATIVE, 'email')['relevance_score']
+
+        with override_settings(AI_TRIAGE_RELEVANCE_THRESHOLD=relevance - 0.001):
+            self.assertTrue(triage(self.NEGATIVE, 'email')['needs_llm'])
+        with override_settings(AI_TRIAGE_RELEVANCE_THRESHOLD=relevance + 0.001):
+            self.assertFalse(triage(self.NEGATIVE, 'email')['needs_llm'])
+
+    def test_batch_matches_single_entries(self):
+        entries = [
+            {'content': self.URGENT, 'source_type': 'email'},
+            {'content': 'lol ok', 'source_type': 'whatsapp'},
+            {'content': self.NEGATIVE, 'source_type': 'notes'},
+        ]
+
+        self.assertEqual(triage_batch(entries), [triage(**entry) for entry in entries])
+        self.assertEqual(triage_batch([]), [])
+
+
+class ScoreFormulaTests(SimpleTestCase):
+    """compute_scores blends deadline, priority, context and age with the configured weights"""
+
+    def scores(self, priority, hours_left, age_days, context):
+        return scoring.compute_scores(
+            np.array(priority, dtype=float), np.array(hours_left, dtype=float),
+            np.array(age_days, dtype=float), np.array(context, dtype=float)
+        )
+
+    def test_components_and_weighted_score(self):
+        score, deadline, age = self.scores(
+            [1.0, 0.5, 0.25, 0.5], [0, 48, np.nan, -10], [0, 14, 28, 0], [0, 0.5, 2.0, 0]
+        )
+
+        np.testing.assert_allclose(deadline, [1.0, 0.5, 0.0, 1.0])
+        np.testing.assert_allclose(age, [0.0, 0.5, 0.75, 0.0])
+        # 0.4 deadline + 0.3 priority + 0.2 context (clipped to 1) + 0.1 age
+        np.testing.assert_allclose(score, [0.7, 0.5, 0.35, 0.55])
+
+    @override_settings(AI_SCORING_WEIGHTS={'deadline': 0, 'priority': 1, 'context': 0, 'age': 0})
+    def test_weights_are_normalized(self):
+        score, _, _ = self.scores([0.75, 0.25], [0, np.nan], [100, 0], [1, 0])
+        np.testing.assert_allclose(score, [0.75, 0.25])
+
+    @override_settings(AI_SCORING_DEADLINE_HALF_LIFE_HOURS=12, AI_SCORING_AGE_HALF_LIFE_DAYS=7)
+    def test_half_lives(self):
+        _, deadline, age = self.scores([0.5], [24], [7], [0])
+        np.testing.assert_allclose((deadline[0], age[0]), (0.25, 0.5))
+
+
+class RescoreTests(TestCase):
+    """Rescoring writes the changed scores with one UPDATE per distinct value"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='scorer', password='x')
+        self.now = timezone.now()
+
+    def task(self, title, hours_left=None, **fields):
+        deadline = self.now + timedelta(hours=hours_left) if hours_left is not None else None
+        return Task.objects.create(user=self.user, title=title, deadline=deadline, **fields)
+
+    def scored(self, *tasks):
+        return [Task.objects.get(pk=task.pk).ai_priority_score for task in tasks]
+
+    def test_grouped_update_writes_each_value_to_its_rows(self):
+        a, b, c = self.task('a'), self.task('b'), self.task('c')
+
+        with self.assertNumQueries(2):
+            scoring._grouped_update([a.pk, b.pk, c.pk], [0.9, 0.1, 0.9], 'ai_priority_score')
+        self.assertEqual(self.scored(a, b, c), [0.9, 0.1, 0.9])
+
+        with mock.patch.object(scoring, 'UPDATE_CHUNK', 1), self.assertNumQueries(3):
+            scoring._grouped_update([a.pk, b.pk, c.pk], [0.2, 0.3, 0.2], 'ai_priority_score')
+        self.assertEqual(self.scored(a, b, c), [0.2, 0.3, 0.2])
+
+    def test_rescore_scores_active_tasks_and_skips_unchanged_rows(self):
+        overdue = self.task('Overdue', hours_left=-2, priority='urgent')
+        tomorrow = self.task('Tomorrow', hours_left=24, priority='low')
+        undated = self.task('Undated', priority='medium')
+        done = self.task('Done', hours_left=-2, priority='urgent', status='completed')
+        touched = Task.objects.get(pk=overdue.pk).updated_at
+
+        stats = scoring.rescore_tasks(now=self.now)
+
+        self.assertEqual((stats['scanned'], stats['updated']), (3, 3))
+        # (0.4 * 0.5 ** (hours / 48) + 0.3 * priority weight), age and context negligible
+        self.assertEqual(self.scored(overdue, tomorrow, undated, done), [0.7, 0.36, 0.15, 0.5])
+        overdue = Task.objects.get(pk=overdue.pk)
+        self.assertEqual(overdue.ai_priority_reasoning, 'Scored locally: overdue, urgent priority')
+        self.assertEqual(overdue.updated_at, touched)
+        self.assertEqual(scoring.rescore_tasks(now=self.now)['updated'], 0)
+
+    def test_command_limits_to_tasks_due_within(self):
+        overdue = self.task('Overdue', hours_left=-2)
+        soon = self.task('Soon', hours_left=12)
+        later = self.task('Later', hours_left=72)
+        undated = self.task('Undated')
+        out = StringIO()
+
+        call_command('rescore_tasks', '--due-within', '24', stdout=out)
+
+        self.assertIn('Scored 2 tasks, updated 2', out.getvalue())
+        reasoning = dict(Task.objects.values_list('title', 'ai_priority_reasoning'))
+        self.assertEqual(
+            {title for title, text in reasoning.items() if text}, {overdue.title, soon.title}
+        )
+        self.assertEqual(self.scored(later, undated), [0.5, 0.5])
+
+
+@override_settings(AI_SINGLEFLIGHT_ENABLED=True, AI_SINGLEFLIGHT_SHARED=False, AI_SINGLEFLIGHT_WAIT=5)
+class SingleFlightTests(SimpleTestCase):
+    """Concurrent identical requests share one upstream call; its failure reaches every caller"""
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.key = ResponseCache.fingerprint('analyze_context', 'prompt')
+        self.release = threading.Event()
+        self.calls = 0
+
+    def upstream(self, result=None, error=None):
+        def call():
+            self.calls += 1
+            self.release.wait(5)
+            if error is not None:
+                raise error
+            return result
+        return call
+
+    def follower_call(self):
+        self.calls += 1
+        return {'from': 'follower'}
+
+    def in_background(self, func, outcomes):
+        def run():
+            try:
+                outcomes.append(self.flight.do('analyze_context', 'prompt', func))
+            except Exception as e:
+                outcomes.append(e)
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def start_with_followers(self, leader_func, followers=2):
+        """Start a leader blocked in its upstream call, then followers that join its flight"""
+        outcomes = []
+        threads = [self.in_background(leader_func, outcomes)]
+        wait_until(lambda: self.key in self.flight._calls)
+        for _ in range(followers):
+            threads.append(self.in_background(self.follower_call, outcomes))
+        wait_until(lambda: self.flight._calls[self.key].followers == followers)
+        return threads, outcomes
+
+    def finish(self, threads):
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+
+    def test_followers_share_a_copy_of_the_leader_result(self):
+        threads, outcomes = self.start_with_followers(self.upstream({'keywords': ['report']}))
+        self.finish(threads)
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(outcomes, [{'keywords': ['report']}] * 3)
+        self.assertEqual(len({id(outcome) for outcome in outcomes}), 3)
+        stats = self.flight.stats()
+        self.assertEqual((stats['leaders'], stats['coalesced'], stats['in_flight']), (1, 2, 0))
+
+    def test_leader_error_reaches_the_followers(self):
+        error = RuntimeError('upstream down')
+        threads, outcomes = self.start_with_followers(self.upstream(error=error))
+        self.finish(threads)
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(outcomes, [error] * 3)
+        self.assertEqual(self.flight._calls, {})
+
+    def test_finished_keys_are_forgotten(self):
+        self.release.set()
+        with self.assertRaises(RuntimeError):
+            self.flight.do('analyze_context', 'prompt', self.upstream(error=RuntimeError('down')))
+        self.assertEqual(self.flight._calls, {})
+
+        # Nothing of the failed flight is reused; the next request calls upstream again
+        self.assertEqual(self.flight.do('analyze_context', 'prompt', self.upstream({'ok': True})), {'ok': True})
+        self.assertEqual(self.flight.do('analyze_context', 'prompt', self.upstream({'ok': 2})), {'ok': 2})
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(self.flight.stats()['in_flight'], 0)
+
+    def test_different_prompts_do_not_coalesce(self):
+        outcomes = []
+        threads = [self.in_background(self.upstream({'n': 1}), outcomes)]
+        wait_until(lambda: self.key in self.flight._calls)
+        other = self.flight.do('analyze_context', 'other prompt', lambda: {'n': 2})
+        self.finish(threads)
+
+        self.assertEqual((other, outcomes), ({'n': 2}, [{'n': 1}]))
+        self.assertEqual(self.flight.stats()['coalesced'], 0)
+
+    @override_settings(AI_SINGLEFLIGHT_WAIT=0.05)
+    def test_follower_calls_upstream_itself_after_the_wait(self):
+        threads, outcomes = self.start_with_followers(self.upstream({'from': 'leader'}), followers=1)
+        threads[1].join(5)
+        self.finish(threads)
+
+        self.assertEqual(outcomes, [{'from': 'follower'}, {'from': 'leader'}])
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.flight.stats()['timeouts'], 1)
+
+
+@override_settings(AI_JOBS_ENABLED=False)
+class TaskJobWriteTests(TestCase):
+    """Task jobs write only their AI fields, so edits made during the Gemini call survive"""
+
+    def setUp(self):
+        categorizer_registry.clear()
+        self.user = User.objects.create_user(username='enhancer', password='x')
+        self.task = Task.objects.create(user=self.user, title='Draft report')
+        self.job = AIJob.objects.create(
+            user=self.user, kind='enhance_task', payload={'task_id': self.task.pk}, run_after=timezone.now()
+        )
+
+    def tearDown(self):
+        usage_counters.reset()
+
+    def bundle(self, **edits):
+        """A Gemini call during which the user saves ``edits`` to the task"""
+        def analyze(*args, **kwargs):
+            task = Task.objects.get(pk=self.task.pk)
+            for name, value in edits.items():
+                setattr(task, name, value)
+            task.save()
+            return {
+                'enhancement': {'enhanced_description': 'Draft and send the report'},
+                'deadline_suggestion': {},
+                'categorization': {'suggested_category': 'Work'},
+                'usage': {},
+            }
+        return mock.patch.object(GeminiAIClient, 'analyze_task_bundle', side_effect=analyze)
+
+    def rollups(self):
+        return sorted(
+            (rollup.day, rollup.category_id, rollup.priority, tuple(getattr(rollup, name) for name in COUNTERS))
+            for rollup in TaskDailyRollup.objects.filter(user=self.user)
+            if any(getattr(rollup, name) for name in COUNTERS)
+        )
+
+    def test_enhancement_keeps_concurrent_edits(self):
+        with self.bundle(title='Send report', priority='high', status='completed'):
+            with self.captureOnCommitCallbacks(execute=True):
+                jobs.enhance_task_job(self.job)
+
+        task = Task.objects.get(pk=self.task.pk)
+        self.assertEqual((task.title, task.priority, task.status), ('Send report', 'high', 'completed'))
+        self.assertEqual(task.ai_enhanced_description, 'Draft and send the report')
+        self.assertEqual(task.category.name, 'Work')
+        # The category move was recorded against the current row, not the job's snapshot
+        tracked = self.rollups()
+        rebuild_rollups(self.user.pk)
+        self.assertEqual(tracked, self.rollups())
+        self.assertEqual(CategorizerState.objects.get(user=self.user).doc_counts, {'Work': 1})
+
+    def test_category_set_during_the_call_is_kept(self):
+        home = Category.objects.create(name='Home')
+        with self.bundle(category=home):
+            jobs.enhance_task_job(self.job)
+
+        self.assertEqual(Task.objects.get(pk=self.task.pk).category, home)
+
+    def test_analysis_keeps_concurrent_edits(self):
+        with self.bundle(title='Send report', status='in_progress'):
+            jobs.analyze_task_job(self.job)
+
+        task = Task.objects.get(pk=self.task.pk)
+        self.assertEqual((task.title, task.status), ('Send report', 'in_progress'))
+        self.assertEqual(task.ai_enhanced_description, 'Draft and send the report')
+        self.assertIsNone(task.category)
+
+
+def echo_job(job):
+    if job.payload.get('fail'):
+        raise RuntimeError('handler failed')
+    return {'echo': job.payload.get('value')}
+
+
+@override_settings(
+    AI_JOBS_ENABLED=True, AI_JOBS_MAX_ATTEMPTS=3, AI_JOBS_VISIBILITY_TIMEOUT=300,
+    AI_JOBS_RETRY_BACKOFF=10, AI_JOBS_RETRY_BACKOFF_MAX=60
+)
+class JobQueueTests(TestCase):
+    """AI jobs are claimed by one worker at a time and retried with backoff"""
+
+    def setUp(self):
+        patcher = mock.patch.dict(jobs.HANDLERS, {'echo': echo_job})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='jobs', password='x')
+
+    def job(self, **fields):
+        fields.setdefault('run_after', timezone.now())
+        return AIJob.objects.create(user=self.user, kind='echo', payload=fields.pop('payload', {}), **fields)
+
+    def test_claim_takes_due_jobs_in_order(self):
+        later = self.job(run_after=timezone.now() - timedelta(minutes=1))
+        first = self.job(run_after=timezone.now() - timedelta(minutes=5))
+        self.job(run_after=timezone.now() + timedelta(minutes=5))
+
+        claimed = jobs.claim('worker-a', 5)
+
+        self.assertEqual([job.pk for job in claimed], [first.pk, later.pk])
+        self.assertTrue(all(job.status == 'running' and job.attempts == 1 for job in claimed))
+        self.assertTrue(all(job.locked_by == 'worker-a' for job in claimed))
+        self.assertEqual(jobs.claim('worker-b', 5), [])
+
+    def test_expired_locks_are_reclaimed_until_attempts_run_out(self):
+        expired = timezone.now() - timedelta(seconds=1)
+        stale = self.job(status='running', attempts=1, locked_by='gone', locked_until=expired)
+        exhausted = self.job(status='running', attempts=3, locked_by='gone', locked_until=expired)
+
+        self.assertEqual([job.pk for job in jobs.claim('worker-a', 5)], [stale.pk])
+        self.assertEqual(jobs.expire_exhausted(), 1)
+        exhausted.refresh_from_db()
+        self.assertEqual((exhausted.status, exhausted.locked_by), ('failed', ''))
+        self.assertIn('Visibility timeout', exhausted.error)
+        self.assertEqual(AIJob.objects.get(pk=stale.pk).status, 'running')
+
+    def test_two_workers_racing_for_a_job(self):
+        job = self.job()
+        claim_as_b = []
+        claimable = jobs._claimable
+
+        def interleaved(now):
+            # Worker B claims the job between A listing its candidates and taking one
+            interleaved.calls += 1
+            if interleaved.calls == 2:
+                claim_as_b.extend(jobs.claim('worker-b', 1))
+            return claimable(now)
+        interleaved.calls = 0
+
+        with mock.patch.object(jobs, '_claimable', interleaved):
+            claim_as_a = jobs.claim('worker-a', 1)
+
+        self.assertEqual(claim_as_a, [])
+        self.assertEqual([claimed.pk for claimed in claim_as_b], [job.pk])
+        job.refresh_from_db()
+        self.assertEqual((job.locked_by, job.attempts), ('worker-b', 1))
+
+    def test_heartbeat_extends_only_the_current_lock(self):
+        self.job()
+        job = jobs.claim('worker-a', 1)[0]
+        AIJob.objects.filter(pk=job.pk).update(locked_until=timezone.now() + timedelta(seconds=5))
+
+        self.assertTrue(jobs.heartbeat(job))
+        self.assertGreater(AIJob.objects.get(pk=job.pk).locked_until, timezone.now() + timedelta(seconds=200))
+
+        # Reclaimed by another worker: the first one's heartbeat and outcome no longer count
+        AIJob.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        reclaimed = jobs.claim('worker-b', 1)[0]
+        # Keep the two claims apart even if they shared a timestamp
+        AIJob.objects.filter(pk=job.pk).update(started_at=reclaimed.started_at + timedelta(seconds=1))
+        self.assertFalse(jobs.heartbeat(job))
+        jobs.run(job)
+        self.assertEqual(AIJob.objects.get(pk=job.pk).status, 'running')
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        with mock.patch('ai_module.jobs.random.uniform', return_value=1.0):
+            self.assertEqual([jobs.backoff(attempts) for attempts in (1, 2, 3, 4, 5)], [10, 20, 40, 60, 60])
+        with mock.patch('ai_module.jobs.random.uniform', return_value=0.5):
+            self.assertEqual(jobs.backoff(2), 10)
+
+    def test_failures_are_retried_then_failed(self):
+        self.job(payload={'fail': True}, max_attempts=2)
+
+        with self.assertLogs('ai_module.jobs', 'WARNING'):
+            job = jobs.run(jobs.claim('worker-a', 1)[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertIn('handler failed', job.error)
+        self.assertGreater(job.run_after, timezone.now())
+
+        AIJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs('ai_module.jobs', 'WARNING'):
+            jobs.run(jobs.claim('worker-a', 1)[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_success_records_the_result(self):
+        self.job(payload={'value': 7})
+        job = jobs.run(jobs.claim('worker-a', 1)[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.locked_by), ('succeeded', {'echo': 7}, ''))
+
+    def test_unique_returns_the_pending_job(self):
+        first = jobs.enqueue('echo', self.user, {'value': 1}, unique=True)
+        self.assertEqual(jobs.enqueue('echo', self.user, {'value': 1}, unique=True).pk, first.pk)
+        self.assertNotEqual(jobs.enqueue('echo', self.user, {'value': 2}, unique=True).pk, first.pk)
+        with self.assertRaises(ValueError):
+            jobs.enqueue('missing', self.user, {})
+
+    @override_settings(AI_JOBS_ENABLED=False)
+    def test_inline_jobs_run_in_the_caller(self):
+        job = jobs.enqueue('echo', self.user, {'value': 3})
+        self.assertEqual((job.status, job.result, job.max_attempts), ('succeeded', {'echo': 3}, 1))
+        self.assertFalse(jobs.pending(job))
+
+        with self.assertLogs('ai_module.jobs', 'WARNING'):
+            job = jobs.enqueue('echo', self.user, {'fail': True})
+        self.assertEqual(job.status, 'failed')
+
+
+class BulkRunProgressTests(TestCase):
+    """A backlog run reports its progress from the current backlog, not a stale total"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='backlog', password='x')
+        self.entries = [self.entry(i) for i in range(3)]
+
+    def entry(self, number):
+        return ContextEntry.objects.create(user=self.user, source_type='notes', content=f'note {number}')
+
+    def interrupt(self, run, handled):
+        for entry in handled:
+            entry.apply_analysis({'keywords': []})
+        BulkProcessRun.objects.filter(pk=run.pk).update(
+            status='failed', processed=len(handled), checkpoint=handled[-1].pk
+        )
+
+    def test_resumed_run_recomputes_its_total(self):
+        run = start_run(self.user)
+        self.assertEqual(run.total, 3)
+        self.interrupt(run, self.entries[:2])
+        self.entry(3)
+        self.entry(4)
+
+        resumed = start_run(self.user)
+
+        self.assertEqual(resumed.pk, run.pk)
+        self.assertEqual((resumed.status, resumed.total), ('running', 5))
+        self.assertEqual({key: describe_run(resumed)[key] for key in ('total', 'processed', 'remaining')}, {
+            'total': 5, 'processed': 2, 'remaining': 3,
+        })
+
+    def test_entries_processed_elsewhere_leave_the_total(self):
+        run = start_run(self.user)
+        self.entries[2].apply_analysis({'keywords': []})
+
+        progress = describe_run(run)
+
+        self.assertEqual((progress['total'], progress['remaining']), (2, 2))
+
+    def test_completed_run_keeps_its_figures(self):
+        run = start_run(self.user)
+        self.interrupt(run, self.entries)
+        run.refresh_from_db()
+
+        drain(run)
+        self.entry(5)
+        run.refresh_from_db()
+
+        self.assertEqual(run.status, 'completed')
+        progress = describe_run(run)
+        self.assertEqual((progress['total'], progress['processed'], progress['remaining']), (3, 3, 0))
+        self.assertNotEqual(start_run(self.user).pk, run.pk)
@@ -0,0 +1,164 @@
+import re
+import threading
+from typing import Any, Dict, List
+
+import numpy as np
+from django.conf import settings
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+TIME_PATTERN = re.compile(
+    r"\b\d{1,2}(:\d{2})?\s?(am|pm)\b|\b\d{1,2}:\d{2}\b|\b\d{1,2}[/.-]\d{1,2}([/.-]\d{2,4})?\b|"
+    r"\b(mon|tues|wednes|thurs|fri|satur|sun)day\b|\b(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\s\d{1,2}\b",
+    re.IGNORECASE
+)
+
+# Lexicon weights; bigrams are matched as "first second"
+URGENCY_TERMS = {
+    'urgent': 1.0, 'urgently': 1.0, 'asap': 1.0, 'immediately': 1.0, 'emergency': 1.0, 'critical': 0.9,
+    'overdue': 0.9, 'deadline': 0.8, 'eod': 0.8, 'end of': 0.3, 'due': 0.6, 'today': 0.5, 'tonight': 0.5,
+    'tomorrow': 0.4, 'now': 0.3, 'soon': 0.3, 'quickly': 0.4, 'important': 0.6, 'priority': 0.5,
+    "don't forget": 0.6, 'reminder': 0.5, 'remind': 0.4, 'last chance': 0.8, 'right away': 0.9,
+    'by monday': 0.5, 'by friday': 0.5, 'this week': 0.3, 'before': 0.2,
+}
+ACTION_TERMS = {
+    'please': 0.4, 'can you': 0.6, 'could you': 0.6, 'need to': 0.7, 'have to': 0.6, 'must': 0.6,
+    'should': 0.3, 'send': 0.6, 'submit': 0.7, 'review': 0.6, 'prepare': 0.6, 'finish': 0.6,
+    'complete': 0.5, 'fix': 0.6, 'call': 0.5, 'email': 0.4, 'reply': 0.5, 'schedule': 0.6,
+    'book': 0.5, 'pay': 0.6, 'buy': 0.5, 'pick up': 0.5, 'meeting': 0.7, 'appointment': 0.7,
+    'interview': 0.7, 'report': 0.5, 'presentation': 0.6, 'invoice': 0.6, 'bill': 0.5,
+    'assignment': 0.6, 'exam': 0.6, 'project': 0.4, 'task': 0.5, 'todo': 0.6, 'follow up': 0.6,
+    'sign': 0.4, 'approve': 0.6, 'update': 0.3, 'draft': 0.5, 'renew': 0.6, 'register': 0.5,
+    'groceries': 0.6, 'shopping': 0.5,
+}
+CHATTER_TERMS = {
+    'lol': 1.0, 'haha': 1.0, 'hahaha': 1.0, 'hehe': 1.0, 'lmao': 1.0, 'ok': 0.6, 'okay': 0.6, 'k': 0.8,
+    'thanks': 0.5, 'thank you': 0.5, 'thx': 0.6, 'good morning': 0.8, 'good night': 0.8, 'gm': 0.8,
+    'gn': 0.8, 'hi': 0.6, 'hello': 0.5, 'hey': 0.5, 'bye': 0.6, 'cool': 0.6, 'nice': 0.5, 'yes': 0.4,
+    'no': 0.3, 'yeah': 0.5, 'yep': 0.6, 'sure': 0.4, 'congrats': 0.6, 'omg': 0.7, 'wow': 0.6,
+    'media omitted': 1.0, 'deleted': 0.5,
+}
+SENTIMENT_TERMS = {
+    'good': 0.5, 'great': 0.8, 'excellent': 0.9, 'awesome': 0.8, 'happy': 0.7, 'love': 0.7, 'thanks': 0.4,
+    'thank you': 0.5, 'glad': 0.6, 'nice': 0.5, 'perfect': 0.8, 'done': 0.3, 'success': 0.7,
+    'congrats': 0.7, 'well done': 0.8, 'appreciate': 0.6, 'excited': 0.7,
+    'bad': -0.5, 'problem': -0.5, 'issue': -0.4, 'error': -0.5, 'failed': -0.7, 'fail': -0.6,
+    'late': -0.4, 'delay': -0.5, 'delayed': -0.5, 'angry': -0.8, 'upset': -0.7, 'sorry': -0.3,
+    'worried': -0.6, 'stress': -0.6, 'stressed': -0.7, 'broken': -0.6, 'urgent': -0.2,
+    'complaint': -0.7, 'disappointed': -0.8, 'unfortunately': -0.5, 'cancel': -0.4, 'cancelled': -0.4,
+    'overdue': -0.5, 'missed': -0.6, 'wrong': -0.5, 'sick': -0.5,
+}
+
+# Sources that rarely carry trivia get a head start
+SOURCE_PRIOR = {'calendar': 0.8, 'email': 0.4, 'notes': 0.4, 'manual': 0.6, 'whatsapp': -0.3}
+
+VOCABULARY = sorted(set(URGENCY_TERMS) | set(ACTION_TERMS) | set(CHATTER_TERMS) | set(SENTIMENT_TERMS))
+TERM_INDEX = {term: index for index, term in enumerate(VOCABULARY)}
+
+
+def _weights(lexicon: Dict[str, float]) -> np.ndarray:
+    weights = np.zeros(len(VOCABULARY))
+    for term, weight in lexicon.items():
+        weights[TERM_INDEX[term]] = weight
+    return weights
+
+
+URGENCY_WEIGHTS = _weights(URGENCY_TERMS)
+ACTION_WEIGHTS = _weights(ACTION_TERMS)
+CHATTER_WEIGHTS = _weights(CHATTER_TERMS)
+SENTIMENT_WEIGHTS = _weights(SENTIMENT_TERMS)
+
+
+def _term_counts(texts: List[str]) -> np.ndarray:
+    """Document-term count matrix over the lexicon vocabulary (unigrams and bigrams)"""
+    rows, columns = [], []
+    for row, text in enumerate(texts):
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        for term in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            column = TERM_INDEX.get(term)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+    counts = np.zeros((len(texts), len(VOCABULARY)))
+    np.add.at(counts, (rows, columns), 1)
+    return counts
+
+
+def triage_batch(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Score context entries locally from lexicons and surface features.
+
+    Each entry needs ``content`` and ``source_type``. Returns, per entry, ``relevance_score``
+    (0-1), ``sentiment_score`` (-1 to 1), the matched ``urgency_indicators`` and
+    ``keywords``, and ``needs_llm`` when relevance reaches ``AI_TRIAGE_RELEVANCE_THRESHOLD``.
+    """
+    if not entries:
+        return []
+
+    texts = [entry.get('content') or '' for entry in entries]
+    counts = _term_counts(texts)
+    present = counts > 0
+
+    urgency = present @ URGENCY_WEIGHTS
+    action = present @ ACTION_WEIGHTS
+    chatter = present @ CHATTER_WEIGHTS
+    polarity = counts @ SENTIMENT_WEIGHTS
+    sentiment = np.tanh(polarity / np.maximum(counts @ np.abs(SENTIMENT_WEIGHTS), 1.0) * 2)
+
+    words = np.array([len(text.split()) for text in texts], dtype=float)
+    times = np.array([len(TIME_PATTERN.findall(text)) for text in texts], dtype=float)
+    emphasis = np.array([text.count('!') + text.count('?') for text in texts], dtype=float)
+    source = np.array([SOURCE_PRIOR.get(entry.get('source_type'), 0.0) for entry in entries])
+
+    # Logistic score: task and time signals raise relevance, short chit-chat lowers it
+    z = (
+        -1.5 + 1.6 * np.minimum(urgency, 2.5) + 1.2 * np.minimum(action, 2.5)
+        + 0.8 * np.minimum(times, 2) + 0.6 * np.minimum(words / 25, 1.5)
+        + 0.1 * np.minimum(emphasis, 3) - 1.5 * np.minimum(chatter, 2) * (words < 8) + source
+    )
+    relevance = 1 / (1 + np.exp(-z))
+
+    threshold = getattr(settings, 'AI_TRIAGE_RELEVANCE_THRESHOLD', 0.5)
+    urgent_columns = URGENCY_WEIGHTS > 0
+    keyword_columns = (ACTION_WEIGHTS > 0) | urgent_columns
+    results = []
+    for row in range(len(entries)):
+        matched = present[row]
+        results.append({
+            'relevance_score': round(float(relevance[row]), 3),
+            'sentiment_score': round(float(sentiment[row]), 3),
+            'urgency_indicators': [VOCABULARY[i] for i in np.flatnonzero(matched & urgent_columns)],
+            'keywords': [VOCABULARY[i] for i in np.flatnonzero(matched & keyword_columns)],
+            'time_mentions': int(times[row]),
+            'needs_llm': bool(relevance[row] >= threshold),
+        })
+    return results
+
+
+def triage(content: str, source_type: str) -> Dict[str, Any]:
+    return triage_batch([{'content': content, 'source_type': source_type}])[0]
+
+
+class TriageStats:
+    """Counts how many entries triage kept away from Gemini in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local = 0
+        self.escalated = 0
+
+    def record(self, results: List[Dict[str, Any]]) -> None:
+        escalated = sum(1 for result in results if result['needs_llm'])
+        with self._lock:
+            self.escalated += escalated
+            self.local += len(results) - escalated
+
+    def stats(self) -> dict:
+        total = self.local + self.escalated
+        return {
+            'enabled': getattr(settings, 'AI_TRIAGE_ENABLED', True),
+            'local_only': self.local,
+            'escalated': self.escalated,
+            'escalation_rate': round(self.escalated / total, 3) if total else None,
+        }
+
+
+triage_stats = TriageStats()
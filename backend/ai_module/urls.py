@@ -10,4 +10,11 @@ urlpatterns = [
     path('daily-summary/', views.daily_summary, name='daily_summary'),
     path('schedule-suggestions/', views.schedule_suggestions, name='schedule_suggestions'),
     path('time-blocking/', views.time_blocking_suggestions, name='time_blocking_suggestions'),
+    path('daily-summary/stream/', views.daily_summary_stream, name='daily_summary_stream'),
+    path('schedule-suggestions/stream/', views.schedule_suggestions_stream, name='schedule_suggestions_stream'),
+    path('time-blocking/stream/', views.time_blocking_stream, name='time_blocking_stream'),
+    path('stats/', views.ai_stats, name='ai_stats'),
+    path('health/', views.ai_health, name='ai_health'),
+    path('metrics/', views.ai_metrics, name='ai_metrics'),
+    path('jobs/<int:job_id>/', views.ai_job_status, name='ai_job_status'),
 ]
\ No newline at end of file
@@ -1,11 +1,17 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.permissions import AllowAny, BasePermission
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
 from tasks.models import Task, Category
 from context.models import ContextEntry
 from .gemini_client import GeminiAIClient
 import json
+import re
 
 
 @api_view(['POST'])
@@ -45,7 +51,9 @@ def prioritize_tasks(request):
             )
         
         # Get user's tasks
-        tasks = Task.objects.filter(user_id=user_id, status__in=['pending', 'in_progress'])
+        tasks = Task.objects.filter(
+            user_id=user_id, status__in=['pending', 'in_progress']
+        ).select_related('category')
         tasks_data = [
             {
                 'id': task.id,
@@ -53,7 +61,8 @@ def prioritize_tasks(request):
                 'description': task.description,
                 'current_priority': task.priority,
                 'deadline': task.deadline.isoformat() if task.deadline else None,
-                'category': task.category.name if task.category else None
+                'category': task.category.name if task.category else None,
+                'ai_priority_score': task.ai_priority_score
             }
             for task in tasks
         ]
@@ -67,7 +76,8 @@ def prioritize_tasks(request):
             {
                 'content': entry.content,
                 'source_type': entry.source_type,
-                'created_at': entry.created_at.isoformat()
+                'created_at': entry.created_at.isoformat(),
+                'relevance_score': entry.relevance_score
             }
             for entry in context_entries
         ]
@@ -147,7 +157,7 @@ def categorize_task(request):
         
         ai_client = GeminiAIClient()
         categorization = ai_client.categorize_task(
-            task_title, task_description, existing_categories
+            task_title, task_description, existing_categories, user_id=request.user.id
         )
         
         return Response(categorization, status=status.HTTP_200_OK)
@@ -202,6 +212,142 @@ def enhance_task(request):
         )
 
 
+def _daily_summary_inputs(user_id):
+    """Today's context entries and current tasks for a daily summary prompt"""
+    
+    # Get today's context entries
+    today = timezone.now().date()
+    
+    context_entries = ContextEntry.objects.filter(
+        user_id=user_id,
+        created_at__date=today
+    )
+    
+    context_data = [
+        {
+            'content': entry.content,
+            'source_type': entry.source_type,
+            'created_at': entry.created_at.isoformat()
+        }
+        for entry in context_entries
+    ]
+    
+    # Get current tasks
+    tasks = Task.objects.filter(
+        user_id=user_id,
+        status__in=['pending', 'in_progress']
+    )
+    
+    tasks_data = [
+        {
+            'title': task.title,
+            'priority': task.priority,
+            'deadline': task.deadline.isoformat() if task.deadline else None
+        }
+        for task in tasks
+    ]
+    
+    return context_data, tasks_data
+
+
+def _schedule_inputs(user_id):
+    """Active tasks and recent context for a schedule suggestions prompt"""
+    
+    # Get user's tasks and context
+    tasks = Task.objects.filter(
+        user_id=user_id,
+        status__in=['pending', 'in_progress']
+    ).order_by('-ai_priority_score')
+    
+    context_entries = ContextEntry.objects.filter(
+        user_id=user_id
+    ).order_by('-created_at')[:10]
+    
+    tasks_data = [
+        {
+            'id': task.id,
+            'title': task.title,
+            'description': task.description,
+            'priority': task.priority,
+            'estimated_duration': task.estimated_duration.total_seconds() / 3600 if task.estimated_duration else 1,
+            'deadline': task.deadline.isoformat() if task.deadline else None,
+            'ai_priority_score': task.ai_priority_score
+        }
+        for task in tasks
+    ]
+    
+    context_data = [
+        {
+            'content': entry.content,
+            'source_type': entry.source_type,
+            'created_at': entry.created_at.isoformat()
+        }
+        for entry in context_entries
+    ]
+    
+    return tasks_data, context_data
+
+
+def _time_blocking_inputs(user_id, limit=10):
+    """Highest priority active tasks for time blocking"""
+    
+    # Get high priority tasks
+    tasks = Task.objects.filter(
+        user_id=user_id,
+        status__in=['pending', 'in_progress']
+    ).order_by('-ai_priority_score')[:limit]
+    
+    tasks_data = [
+        {
+            'id': task.id,
+            'title': task.title,
+            'priority': task.priority,
+            'estimated_duration': task.estimated_duration.total_seconds() / 3600 if task.estimated_duration else 1,
+            'deadline': task.deadline.isoformat() if task.deadline else None,
+            'ai_priority_score': task.ai_priority_score
+        }
+        for task in tasks
+    ]
+    
+    return tasks_data
+
+
+def _time_blocking_options(params):
+    """Validated (engine, available_hours, start_time, annotate) from request params"""
+    engine = params.get('engine') or getattr(settings, 'AI_TIME_BLOCKING_ENGINE', 'local')
+    if engine not in ('local', 'llm'):
+        raise ValueError('engine must be local or llm')
+    try:
+        available_hours = params.get('available_hours')
+        available_hours = float(8 if available_hours in (None, '') else available_hours)
+    except (TypeError, ValueError):
+        raise ValueError('available_hours must be a number')
+    if not 0 < available_hours <= 24:
+        raise ValueError('available_hours must be between 0 and 24')
+    start_time = params.get('start_time') or None
+    if start_time is not None and not re.fullmatch(r'([01]\d|2[0-3]):[0-5]\d', str(start_time)):
+        raise ValueError('start_time must be HH:MM')
+    annotate = str(params.get('annotate', '')).lower() in ('1', 'true', 'yes')
+    return engine, available_hours, start_time, annotate
+
+
+def _local_time_blocks(user_id, available_hours, start_time, annotate):
+    """Time blocks from the deterministic scheduler, optionally named by Gemini"""
+    from .scheduler import build_time_blocks
+    
+    tasks_data = _time_blocking_inputs(user_id, limit=getattr(settings, 'AI_TIME_BLOCK_MAX_TASKS', 50))
+    plan = build_time_blocks(tasks_data, available_hours, start_time=start_time)
+    if annotate:
+        plan = GeminiAIClient().annotate_time_blocks(plan)
+    return plan
+
+
+def _plan_events(plan):
+    for block in plan['time_blocks']:
+        yield 'item', {'key': 'time_blocks', 'item': block}
+    yield 'result', plan
+
+
 @api_view(['POST'])
 def daily_summary(request):
     """Generate daily summary and recommendations"""
@@ -213,38 +359,7 @@ def daily_summary(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get today's context entries
-        from django.utils import timezone
-        today = timezone.now().date()
-        
-        context_entries = ContextEntry.objects.filter(
-            user_id=user_id,
-            created_at__date=today
-        )
-        
-        context_data = [
-            {
-                'content': entry.content,
-                'source_type': entry.source_type,
-                'created_at': entry.created_at.isoformat()
-            }
-            for entry in context_entries
-        ]
-        
-        # Get current tasks
-        tasks = Task.objects.filter(
-            user_id=user_id,
-            status__in=['pending', 'in_progress']
-        )
-        
-        tasks_data = [
-            {
-                'title': task.title,
-                'priority': task.priority,
-                'deadline': task.deadline.isoformat() if task.deadline else None
-            }
-            for task in tasks
-        ]
+        context_data, tasks_data = _daily_summary_inputs(user_id)
         
         ai_client = GeminiAIClient()
         summary = ai_client.generate_daily_summary(context_data, tasks_data)
@@ -269,37 +384,7 @@ def schedule_suggestions(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get user's tasks and context
-        tasks = Task.objects.filter(
-            user_id=user_id,
-            status__in=['pending', 'in_progress']
-        ).order_by('-ai_priority_score')
-        
-        context_entries = ContextEntry.objects.filter(
-            user_id=user_id
-        ).order_by('-created_at')[:10]
-        
-        tasks_data = [
-            {
-                'id': task.id,
-                'title': task.title,
-                'description': task.description,
-                'priority': task.priority,
-                'estimated_duration': task.estimated_duration.total_seconds() / 3600 if task.estimated_duration else 1,
-                'deadline': task.deadline.isoformat() if task.deadline else None,
-                'ai_priority_score': task.ai_priority_score
-            }
-            for task in tasks
-        ]
-        
-        context_data = [
-            {
-                'content': entry.content,
-                'source_type': entry.source_type,
-                'created_at': entry.created_at.isoformat()
-            }
-            for entry in context_entries
-        ]
+        tasks_data, context_data = _schedule_inputs(user_id)
         
         ai_client = GeminiAIClient()
         schedule = ai_client.generate_schedule_suggestions(tasks_data, context_data)
@@ -318,7 +403,6 @@ def time_blocking_suggestions(request):
     """Generate time-blocking suggestions for tasks"""
     try:
         user_id = request.data.get('user_id')
-        available_hours = request.data.get('available_hours', 8)
         
         if not user_id:
             return Response(
@@ -326,23 +410,15 @@ def time_blocking_suggestions(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get high priority tasks
-        tasks = Task.objects.filter(
-            user_id=user_id,
-            status__in=['pending', 'in_progress']
-        ).order_by('-ai_priority_score')[:10]
+        try:
+            engine, available_hours, start_time, annotate = _time_blocking_options(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        tasks_data = [
-            {
-                'id': task.id,
-                'title': task.title,
-                'priority': task.priority,
-                'estimated_duration': task.estimated_duration.total_seconds() / 3600 if task.estimated_duration else 1,
-                'deadline': task.deadline.isoformat() if task.deadline else None,
-                'ai_priority_score': task.ai_priority_score
-            }
-            for task in tasks
-        ]
+        if engine == 'local':
+            return Response(_local_time_blocks(user_id, available_hours, start_time, annotate))
+        
+        tasks_data = _time_blocking_inputs(user_id)
         
         ai_client = GeminiAIClient()
         time_blocks = ai_client.generate_time_blocks(tasks_data, available_hours)
@@ -354,3 +430,169 @@ def time_blocking_suggestions(request):
             {'error': str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets DRF negotiate text/event-stream; plain Response data is rendered as an error event"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return _sse_event('error', data)
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _sse_response(events):
+    """Stream (event, data) pairs from a GeminiAIClient stream_* method as server-sent events"""
+    def render():
+        for event, data in events:
+            yield _sse_event(event, data)
+        yield _sse_event('done', {})
+    
+    response = StreamingHttpResponse(render(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _request_param(request, name, default=None):
+    return request.data.get(name) or request.query_params.get(name) or default
+
+
+@api_view(['GET', 'POST'])
+@renderer_classes([EventStreamRenderer, JSONRenderer])
+def daily_summary_stream(request):
+    """Stream the daily summary, pushing each recommendation as soon as it is generated"""
+    user_id = _request_param(request, 'user_id')
+    if not user_id:
+        return Response(
+            {'error': 'User ID is required'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    context_data, tasks_data = _daily_summary_inputs(user_id)
+    
+    ai_client = GeminiAIClient()
+    return _sse_response(ai_client.stream_daily_summary(context_data, tasks_data))
+
+
+@api_view(['GET', 'POST'])
+@renderer_classes([EventStreamRenderer, JSONRenderer])
+def schedule_suggestions_stream(request):
+    """Stream schedule suggestions, pushing each schedule item as soon as it is generated"""
+    user_id = _request_param(request, 'user_id')
+    if not user_id:
+        return Response(
+            {'error': 'User ID is required'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    tasks_data, context_data = _schedule_inputs(user_id)
+    
+    ai_client = GeminiAIClient()
+    return _sse_response(ai_client.stream_schedule_suggestions(tasks_data, context_data))
+
+
+@api_view(['GET', 'POST'])
+@renderer_classes([EventStreamRenderer, JSONRenderer])
+def time_blocking_stream(request):
+    """Stream time blocks, pushing each block as soon as it is generated"""
+    user_id = _request_param(request, 'user_id')
+    if not user_id:
+        return Response(
+            {'error': 'User ID is required'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    params = {name: _request_param(request, name) for name in ('engine', 'available_hours', 'start_time', 'annotate')}
+    try:
+        engine, available_hours, start_time, annotate = _time_blocking_options(params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if engine == 'local':
+        return _sse_response(_plan_events(_local_time_blocks(user_id, available_hours, start_time, annotate)))
+    
+    tasks_data = _time_blocking_inputs(user_id)
+    
+    ai_client = GeminiAIClient()
+    return _sse_response(ai_client.stream_time_blocks(tasks_data, available_hours))
+
+
+class MetricsPermission(BasePermission):
+    """Staff users, or scrapers presenting the AI_METRICS_TOKEN bearer token"""
+    
+    def has_permission(self, request, view):
+        token = getattr(settings, 'AI_METRICS_TOKEN', '')
+        if token and request.META.get('HTTP_AUTHORIZATION') == f"Bearer {token}":
+            return True
+        return bool(request.user and request.user.is_staff)
+
+
+@api_view(['GET'])
+@permission_classes([MetricsPermission])
+def ai_stats(request):
+    """Get AI call metrics and cache, pool, upstream guard, single-flight, categorizer, triage, dedup and job queue statistics"""
+    from .cache import response_cache
+    from .categorizer import categorizer_registry
+    from .dedup import dedup_stats
+    from .jobs import queue_stats
+    from .metrics import metrics, summarize
+    from .pool import model_pool
+    from .resilience import upstream
+    from .singleflight import single_flight
+    from .triage import triage_stats
+    
+    return Response({
+        'metrics': {method: summarize(values) for method, values in metrics.snapshot().items()},
+        'cache': response_cache.stats(),
+        'pool': model_pool.stats(),
+        'upstream': upstream.stats(),
+        'single_flight': single_flight.stats(),
+        'categorizer': categorizer_registry.stats(),
+        'triage': triage_stats.stats(),
+        'dedup': dedup_stats.stats(),
+        'jobs': queue_stats(),
+    })
+
+
+@api_view(['GET'])
+def ai_job_status(request, job_id):
+    """Get the status and result of one of the user's queued AI jobs"""
+    from .jobs import describe
+    from .models import AIJob
+    
+    job = AIJob.objects.filter(pk=job_id, user=request.user).first()
+    if job is None:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(describe(job))
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def ai_health(request):
+    """Report whether Gemini calls are being admitted; 503 while the circuit is open"""
+    from .resilience import OPEN, upstream
+    
+    stats = upstream.stats()
+    healthy = stats['breaker']['state'] != OPEN
+    return Response(
+        {'status': 'ok' if healthy else 'degraded', **stats},
+        status=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
+@api_view(['GET'])
+@permission_classes([MetricsPermission])
+def ai_metrics(request):
+    """Per-method AI call metrics of all workers in Prometheus text format"""
+    from .metrics import metrics, render_prometheus
+    
+    return HttpResponse(
+        render_prometheus(metrics.collect()), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ContextEntry, ContextInsight, DailyContextSummary
+from .models import BulkProcessRun, ContextEntry, ContextInsight, DailyContextSummary
 
 
 @admin.register(ContextEntry)
@@ -98,3 +98,11 @@ class DailyContextSummaryAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         })
     )
+
+
+@admin.register(BulkProcessRun)
+class BulkProcessRunAdmin(admin.ModelAdmin):
+    list_display = ['user', 'status', 'total', 'processed', 'failed', 'started_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['user__username']
+    readonly_fields = ['started_at', 'updated_at', 'finished_at']
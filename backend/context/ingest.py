@@ -0,0 +1,228 @@
+import codecs
+import json
+import logging
+import re
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ContextEntry, DailyContextSummary, mentions_deadline
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TYPES = {choice for choice, _ in ContextEntry.SOURCE_CHOICES}
+READ_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+WHITESPACE = re.compile(r'\s*')
+# What may still follow a number that ends a read, e.g. "6" before ".5" or "1e" before "3"
+NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+
+
+def _chunks(stream) -> Iterator[str]:
+    decode = codecs.getincrementaldecoder('utf-8')(errors='replace').decode
+    while True:
+        data = stream.read(READ_SIZE) if stream is not None else b''
+        if not data:
+            tail = decode(b'', final=True)
+            if tail:
+                yield tail
+            return
+        yield decode(data)
+
+
+def iter_rows(stream) -> Iterator[Tuple[int, Any, Optional[str]]]:
+    """Yield ``(row number, value, parse error)`` from an NDJSON or JSON-array body.
+
+    The body is read in ``READ_SIZE`` pieces, so memory stays bounded by the largest row.
+    NDJSON rows are numbered by line and a bad line only fails that row; a JSON array is
+    numbered by element and a syntax error ends it.
+    """
+    chunks = _chunks(stream)
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        if buffer.strip():
+            break
+    buffer = buffer.lstrip()
+    if buffer.startswith('['):
+        yield from _iter_array(buffer[1:], chunks)
+    else:
+        yield from _iter_lines(buffer, chunks)
+
+
+def _iter_lines(buffer: str, chunks: Iterator[str]):
+    number = 0
+    exhausted = False
+    while True:
+        *lines, buffer = buffer.split('\n')
+        if exhausted:
+            lines.append(buffer)
+        for line in lines:
+            number += 1
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line), None
+            except ValueError as e:
+                yield number, None, f'Invalid JSON: {e}'
+        if exhausted:
+            return
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+        else:
+            buffer += chunk
+
+
+def _iter_array(buffer: str, chunks: Iterator[str]):
+    number = 0
+    position = 0
+    expect_value = True
+    can_close = True
+
+    def more() -> bool:
+        nonlocal buffer, position
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        buffer, position = buffer[position:] + chunk, 0
+        return True
+
+    while True:
+        position = WHITESPACE.match(buffer, position).end()
+        if position == len(buffer):
+            if more():
+                continue
+            yield number + 1, None, 'Invalid JSON: unterminated array'
+            return
+
+        char = buffer[position]
+        if char == ']' and (can_close or not expect_value):
+            return
+        if not expect_value:
+            if char != ',':
+                yield number + 1, None, f'Invalid JSON: expected "," or "]", got {char!r}'
+                return
+            position += 1
+            expect_value, can_close = True, False
+            continue
+
+        try:
+            value, end = _decoder.raw_decode(buffer, position)
+        except ValueError as e:
+            if more():
+                continue
+            yield number + 1, None, f'Invalid JSON: {e}'
+            return
+        is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if is_number and NUMBER_TAIL.match(buffer, end).end() == len(buffer) and more():
+            # A number reaching the end of the buffer may continue in the next piece
+            continue
+        number += 1
+        yield number, value, None
+        position, expect_value = end, False
+
+
+def build_entry(user, row: Any) -> Tuple[Optional[ContextEntry], Optional[Dict[str, List[str]]]]:
+    """An unsaved entry for one row, or its field errors (a light stand-in for the serializer)"""
+    if not isinstance(row, dict):
+        return None, {'non_field_errors': ['Expected a JSON object.']}
+
+    errors = {}
+    source_type = row.get('source_type')
+    if source_type not in SOURCE_TYPES:
+        errors['source_type'] = [f'"{source_type}" is not a valid choice.']
+    content = row.get('content')
+    if not isinstance(content, str) or not content.strip():
+        errors['content'] = ['This field is required.']
+
+    original_timestamp = row.get('original_timestamp')
+    if original_timestamp in (None, ''):
+        original_timestamp = None
+    else:
+        try:
+            original_timestamp = parse_datetime(original_timestamp) if isinstance(original_timestamp, str) else None
+        except ValueError:
+            original_timestamp = None
+        if original_timestamp is None:
+            errors['original_timestamp'] = ['Datetime has wrong format.']
+        elif timezone.is_naive(original_timestamp):
+            original_timestamp = timezone.make_aware(original_timestamp)
+
+    if errors:
+        return None, errors
+    entry = ContextEntry(user=user, source_type=source_type, content=content, original_timestamp=original_timestamp)
+    # bulk_create skips save(), which normally fingerprints the content
+    entry.update_fingerprint()
+    return entry, None
+
+
+def _write(batch: List[Tuple[int, ContextEntry]]) -> Optional[str]:
+    entries = [entry for _, entry in batch]
+    try:
+        with transaction.atomic():
+            ContextEntry.objects.bulk_create(entries)
+    except Exception as e:
+        logger.exception("Context ingest chunk failed")
+        return str(e)
+    # bulk_create sends no post_save; count the chunk in today's summary at once
+    DailyContextSummary.bump(
+        entries[0].user_id, min(entry.created_at for entry in entries), total=len(entries),
+        deadline_mentions=sum(mentions_deadline(entry.content) for entry in entries)
+    )
+    return None
+
+
+def ingest_entries(user, stream, chunk_size: Optional[int] = None) -> Dict[str, Any]:
+    """Create context entries from an NDJSON or JSON-array stream in chunked transactions.
+
+    Rows are validated with ``build_entry`` and written ``CONTEXT_INGEST_CHUNK_SIZE`` per
+    ``bulk_create``; a chunk commits on its own, so a failed chunk fails only its rows.
+    No AI runs here: entries are stored unprocessed for the bulk processing run. At most
+    ``CONTEXT_INGEST_MAX_ERRORS`` row errors are reported.
+    """
+    started = perf_counter()
+    chunk_size = max(chunk_size or getattr(settings, 'CONTEXT_INGEST_CHUNK_SIZE', 1000), 1)
+    max_errors = getattr(settings, 'CONTEXT_INGEST_MAX_ERRORS', 100)
+    stats = {'received': 0, 'created': 0, 'failed': 0}
+    errors = []
+
+    def fail(row, row_errors):
+        stats['failed'] += 1
+        if len(errors) < max_errors:
+            errors.append({'row': row, 'errors': row_errors})
+
+    def flush(batch):
+        error = _write(batch)
+        if error is None:
+            stats['created'] += len(batch)
+        else:
+            for row, _ in batch:
+                fail(row, {'non_field_errors': [f'Could not be saved: {error}']})
+
+    batch = []
+    for row, value, parse_error in iter_rows(stream):
+        stats['received'] += 1
+        if parse_error:
+            fail(row, {'non_field_errors': [parse_error]})
+            continue
+        entry, row_errors = build_entry(user, value)
+        if row_errors:
+            fail(row, row_errors)
+            continue
+        batch.append((row, entry))
+        if len(batch) >= chunk_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    stats['errors'] = errors
+    stats['errors_truncated'] = stats['failed'] > len(errors)
+    stats['seconds'] = round(perf_counter() - started, 3)
+    return stats
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+FINGERPRINT_FIELDS = ['simhash', 'simhash_band0', 'simhash_band1', 'simhash_band2', 'simhash_band3']
+
+
+def backfill_fingerprints(apps, schema_editor):
+    from ai_module.dedup import bands, fingerprint
+
+    ContextEntry = apps.get_model('context', 'ContextEntry')
+    batch = []
+    for entry in ContextEntry.objects.only('id', 'content').iterator(chunk_size=1000):
+        entry.simhash = fingerprint(entry.content)
+        entry.simhash_band0, entry.simhash_band1, entry.simhash_band2, entry.simhash_band3 = bands(entry.simhash)
+        batch.append(entry)
+        if len(batch) >= 1000:
+            ContextEntry.objects.bulk_update(batch, FINGERPRINT_FIELDS)
+            batch = []
+    if batch:
+        ContextEntry.objects.bulk_update(batch, FINGERPRINT_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('context', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contextentry',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, help_text='Earlier entry whose analysis this one reused', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='context.contextentry'),
+        ),
+        migrations.AddField(
+            model_name='contextentry',
+            name='simhash',
+            field=models.BigIntegerField(blank=True, help_text='SimHash of the normalized content', null=True),
+        ),
+        migrations.AddField(
+            model_name='contextentry',
+            name='simhash_band0',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='contextentry',
+            name='simhash_band1',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='contextentry',
+            name='simhash_band2',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='contextentry',
+            name='simhash_band3',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='contextentry',
+            index=models.Index(fields=['user', 'simhash_band0'], name='context_con_user_id_3df914_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contextentry',
+            index=models.Index(fields=['user', 'simhash_band1'], name='context_con_user_id_a1b38d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contextentry',
+            index=models.Index(fields=['user', 'simhash_band2'], name='context_con_user_id_db1453_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contextentry',
+            index=models.Index(fields=['user', 'simhash_band3'], name='context_con_user_id_71c6b1_idx'),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
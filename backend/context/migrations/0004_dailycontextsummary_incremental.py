@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('context', '0003_bulkprocessrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailycontextsummary',
+            name='changes_since_text',
+            field=models.IntegerField(default=0, help_text='Counter changes since the AI text was generated'),
+        ),
+        migrations.AddField(
+            model_name='dailycontextsummary',
+            name='covers_from',
+            field=models.DateTimeField(blank=True, help_text='Context created from here on is counted', null=True),
+        ),
+        migrations.AddField(
+            model_name='dailycontextsummary',
+            name='text_generated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
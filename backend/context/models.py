@@ -1,5 +1,15 @@
 from django.db import models
+from django.db.models import F, Q
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+# An entry mentions a deadline when its content contains any of these (case-insensitive)
+DEADLINE_KEYWORDS = ('deadline', 'due', 'by')
+
+
+def mentions_deadline(content):
+    content = (content or '').lower()
+    return any(keyword in content for keyword in DEADLINE_KEYWORDS)
 
 
 class ContextEntry(models.Model):
@@ -34,16 +44,135 @@ class ContextEntry(models.Model):
     relevance_score = models.FloatField(default=0.0, help_text="AI-calculated relevance for task management")
     related_tasks = models.ManyToManyField('tasks.Task', blank=True, help_text="Tasks related to this context")
     
+    # Near-duplicate detection: 64-bit SimHash, split into bands for indexed lookup
+    simhash = models.BigIntegerField(null=True, blank=True, help_text="SimHash of the normalized content")
+    simhash_band0 = models.IntegerField(null=True, blank=True)
+    simhash_band1 = models.IntegerField(null=True, blank=True)
+    simhash_band2 = models.IntegerField(null=True, blank=True)
+    simhash_band3 = models.IntegerField(null=True, blank=True)
+    duplicate_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='duplicates',
+        help_text="Earlier entry whose analysis this one reused"
+    )
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'source_type']),
             models.Index(fields=['created_at']),
             models.Index(fields=['relevance_score']),
+            models.Index(fields=['user', 'simhash_band0']),
+            models.Index(fields=['user', 'simhash_band1']),
+            models.Index(fields=['user', 'simhash_band2']),
+            models.Index(fields=['user', 'simhash_band3']),
         ]
     
+    # Fields written by apply_analysis/apply_triage, for bulk_update
+    ANALYSIS_FIELDS = [
+        'processed_insights', 'keywords', 'sentiment_score', 'urgency_indicators',
+        'relevance_score', 'is_processed', 'updated_at',
+    ]
+    
     def __str__(self):
         return f"{self.get_source_type_display()} - {self.content[:50]}..."
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'urgency_indicators' in field_names:
+            # Whether the daily summary counted this entry as high priority
+            instance._counted_urgent = bool(instance.urgency_indicators)
+        return instance
+    
+    def save(self, *args, **kwargs):
+        if self.simhash is None or getattr(self, '_fingerprinted_content', None) != self.content:
+            self.update_fingerprint()
+        super().save(*args, **kwargs)
+    
+    def update_fingerprint(self):
+        """Recompute the SimHash and its bands from the content (bulk_create skips save())"""
+        from ai_module.dedup import bands, fingerprint
+        
+        self.simhash = fingerprint(self.content)
+        self.simhash_band0, self.simhash_band1, self.simhash_band2, self.simhash_band3 = bands(self.simhash)
+        self._fingerprinted_content = self.content
+    
+    @classmethod
+    def find_analyzed_duplicates(cls, entries):
+        """Map entry id to the closest already-analyzed entry of the same user, in one query"""
+        from ai_module.dedup import band_filter, closest
+        
+        entries = [entry for entry in entries if entry.simhash is not None]
+        if not entries:
+            return {}
+        
+        candidates = list(
+            cls.objects.filter(user_id__in={entry.user_id for entry in entries}, is_processed=True)
+            .exclude(processed_insights={})
+            .exclude(pk__in=[entry.pk for entry in entries])
+            .filter(band_filter(entry.simhash for entry in entries))
+            .order_by('-created_at')[:500]
+        )
+        matches = {}
+        for entry in entries:
+            original = closest(entry, candidates)
+            if original is not None:
+                matches[entry.pk] = original
+        return matches
+    
+    def copy_analysis_from(self, original, save=True):
+        """Reuse a near-duplicate's analysis instead of analyzing this entry again"""
+        root_id = original.duplicate_of_id or original.pk
+        self.processed_insights = {**original.processed_insights, 'copied_from': root_id}
+        self.keywords = original.keywords
+        self.sentiment_score = original.sentiment_score
+        self.urgency_indicators = original.urgency_indicators
+        self.relevance_score = original.relevance_score
+        self.duplicate_of_id = root_id
+        self.is_processed = True
+        if save:
+            self.save()
+        else:
+            self.updated_at = timezone.now()
+    
+    def apply_analysis(self, analysis, save=True):
+        """Copy an analyze_context result onto this entry and mark it processed.
+
+        Accepts both the flat batch shape and the nested single-entry shape; scores the
+        response lacks keep their current (triage) values.
+        """
+        def score(key, section):
+            if key in analysis:
+                return analysis[key]
+            nested = analysis.get(section)
+            if isinstance(nested, dict) and key in nested:
+                return nested[key]
+            return getattr(self, key)
+
+        self.processed_insights = analysis
+        self.keywords = analysis.get('keywords') or self.keywords or []
+        self.sentiment_score = score('sentiment_score', 'sentiment_analysis')
+        self.urgency_indicators = score('urgency_indicators', 'urgency_analysis')
+        self.relevance_score = score('relevance_score', 'context_classification')
+        self.is_processed = True
+        if save:
+            self.save()
+    
+    def apply_triage(self, triage, processed=False, save=True):
+        """Copy local triage scores onto this entry; ``processed`` marks it done without the LLM"""
+        self.sentiment_score = triage['sentiment_score']
+        self.urgency_indicators = triage['urgency_indicators']
+        self.relevance_score = triage['relevance_score']
+        if not self.keywords:
+            self.keywords = triage['keywords']
+        if processed:
+            self.processed_insights = {'triage': triage, 'source': 'local'}
+            self.is_processed = True
+        if save:
+            self.save()
+        else:
+            # bulk_update bypasses auto_now
+            self.updated_at = timezone.now()
 
 
 class ContextInsight(models.Model):
@@ -99,6 +228,12 @@ class DailyContextSummary(models.Model):
     recommended_actions = models.JSONField(default=list, blank=True)
     schedule_suggestions = models.JSONField(default=list, blank=True)
     
+    # Incremental maintenance: counters follow new and processed entries; the AI text is
+    # regenerated once enough has changed since it was written
+    covers_from = models.DateTimeField(null=True, blank=True, help_text="Context created from here on is counted")
+    changes_since_text = models.IntegerField(default=0, help_text="Counter changes since the AI text was generated")
+    text_generated_at = models.DateTimeField(null=True, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -108,3 +243,89 @@ class DailyContextSummary(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.date}"
+    
+    @property
+    def text_pending(self):
+        """The row exists (so new entries are counted) but its AI text was not written yet"""
+        return self.text_generated_at is None and not self.summary_text
+    
+    @property
+    def needs_regeneration(self):
+        """Whether the counters moved enough since the AI text was written to rewrite it"""
+        from django.conf import settings
+        
+        threshold = max(
+            getattr(settings, 'AI_SUMMARY_REGENERATE_MIN_CHANGES', 5),
+            self.total_entries * getattr(settings, 'AI_SUMMARY_REGENERATE_RATIO', 0.2)
+        )
+        return self.changes_since_text >= threshold
+    
+    @classmethod
+    def bump(cls, user_id, created_at, total=0, high_priority=0, deadline_mentions=0):
+        """Atomically adjust the counters of today's summary if it covers an entry created at created_at"""
+        changes = abs(total) + abs(high_priority) + abs(deadline_mentions)
+        if not changes:
+            return 0
+        return cls.objects.filter(
+            Q(covers_from__lte=created_at) | Q(covers_from__isnull=True),
+            user_id=user_id, date=timezone.now().date()
+        ).update(
+            total_entries=F('total_entries') + total,
+            high_priority_indicators=F('high_priority_indicators') + high_priority,
+            deadline_mentions=F('deadline_mentions') + deadline_mentions,
+            changes_since_text=F('changes_since_text') + changes,
+            updated_at=timezone.now()
+        )
+    
+    @classmethod
+    def record_urgency_changes(cls, entries):
+        """Count urgency flips of entries saved with bulk_update, which sends no signals"""
+        flips = [
+            entry for entry in entries
+            if hasattr(entry, '_counted_urgent') and entry._counted_urgent != bool(entry.urgency_indicators)
+        ]
+        if not flips:
+            return
+        covers = dict(cls.objects.filter(
+            user_id__in={entry.user_id for entry in flips}, date=timezone.now().date()
+        ).values_list('user_id', 'covers_from'))
+        deltas = {}
+        for entry in flips:
+            entry._counted_urgent = bool(entry.urgency_indicators)
+            if entry.user_id in covers and (covers[entry.user_id] is None or covers[entry.user_id] <= entry.created_at):
+                deltas[entry.user_id] = deltas.get(entry.user_id, 0) + (1 if entry._counted_urgent else -1)
+        for user_id, delta in deltas.items():
+            cls.objects.filter(user_id=user_id, date=timezone.now().date()).update(
+                high_priority_indicators=F('high_priority_indicators') + delta,
+                changes_since_text=F('changes_since_text') + abs(delta),
+                updated_at=timezone.now()
+            )
+
+
+class BulkProcessRun(models.Model):
+    """Progress of draining a user's unprocessed context entries, resumable from its checkpoint"""
+    
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bulk_process_runs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    total = models.IntegerField(default=0, help_text="Unprocessed entries when the run started")
+    processed = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    upstream_calls = models.IntegerField(default=0)
+    checkpoint = models.BigIntegerField(default=0, help_text="Entries up to this id have been handled")
+    last_error = models.TextField(blank=True)
+    job = models.ForeignKey('ai_module.AIJob', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.processed + self.failed}/{self.total} ({self.status})"
@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import ContextEntry, ContextInsight, DailyContextSummary
 
@@ -34,70 +35,39 @@ class ContextEntryCreateSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
     
     def create(self, validated_data):
+        self.ai_job = None
         process_with_ai = validated_data.pop('process_with_ai', True)
         validated_data['user'] = self.context['request'].user
         
         context_entry = super().create(validated_data)
         
-        # Process with AI if requested
-        if process_with_ai:
-            from ai_module.gemini_client import GeminiAIClient
+        # Reuse the analysis of an earlier near-duplicate (re-pasted thread, forwarded message)
+        if process_with_ai and getattr(settings, 'AI_DEDUP_ENABLED', True):
+            from ai_module.dedup import dedup_stats
             
-            try:
-                ai_client = GeminiAIClient()
-                analysis = ai_client.analyze_context(
-                    context_entry.content, 
-                    context_entry.source_type
-                )
-                
-                # Update context entry with AI analysis
-                context_entry.processed_insights = analysis
-                context_entry.keywords = analysis.get('keywords', [])
-                context_entry.sentiment_score = analysis.get('sentiment_score', 0.5)
-                context_entry.urgency_indicators = analysis.get('urgency_indicators', [])
-                context_entry.relevance_score = analysis.get('relevance_score', 0.5)
-                context_entry.is_processed = True
-                context_entry.save()
-                
-                # Create insights from AI analysis
-                for insight_data in analysis.get('insights', []):
-                    ContextInsight.objects.create(
-                        context_entry=context_entry,
-                        insight_type=insight_data.get('type', 'general'),
-                        title=insight_data.get('title', ''),
-                        description=insight_data.get('description', ''),
-                        confidence_score=insight_data.get('confidence', 0.5),
-                        suggested_action=insight_data.get('suggested_action', {})
-                    )
-                
-                # Create suggested tasks if any
-                from tasks.models import Task, Category
-                for task_suggestion in analysis.get('task_suggestions', []):
-                    # Get or create category
-                    category = None
-                    if task_suggestion.get('category'):
-                        category, created = Category.objects.get_or_create(
-                            name=task_suggestion['category'],
-                            defaults={'color': '#3B82F6'}
-                        )
-                    
-                    # Create suggested task
-                    suggested_task = Task.objects.create(
-                        user=context_entry.user,
-                        title=task_suggestion.get('title', ''),
-                        description=task_suggestion.get('description', ''),
-                        priority=task_suggestion.get('priority', 'medium'),
-                        category=category,
-                        context_used={'source_context_id': context_entry.id},
-                        ai_insights={'created_from_context': True, 'suggestion_data': task_suggestion}
-                    )
-                    
-                    # Link task to context entry
-                    context_entry.related_tasks.add(suggested_task)
-                
-            except Exception as e:
-                print(f"AI processing failed: {e}")
-                # Continue with basic context entry creation
+            original = ContextEntry.find_analyzed_duplicates([context_entry]).get(context_entry.pk)
+            if original is not None:
+                context_entry.copy_analysis_from(original)
+                context_entry.related_tasks.set(original.related_tasks.all())
+                dedup_stats.record(1, 1, int(original.processed_insights.get('source') != 'local'))
+                return context_entry
+            dedup_stats.record(1, 0, 0)
+        
+        # Score the entry locally first; only relevant entries are worth an LLM call
+        needs_llm = True
+        if getattr(settings, 'AI_TRIAGE_ENABLED', True):
+            from ai_module.triage import triage, triage_stats
+            
+            result = triage(context_entry.content, context_entry.source_type)
+            triage_stats.record([result])
+            needs_llm = result['needs_llm']
+            context_entry.apply_triage(result, processed=process_with_ai and not needs_llm)
+        
+        # Queue the LLM analysis (insights and suggested tasks) for the ai_worker command
+        if process_with_ai and needs_llm:
+            from ai_module.jobs import enqueue
+            
+            self.ai_job = enqueue('analyze_context', context_entry.user, {'entry_id': context_entry.pk})
         
         return context_entry
 
@@ -122,6 +92,9 @@ class DailyContextSummarySerializer(serializers.ModelSerializer):
             'id', 'user', 'date', 'total_entries', 'high_priority_indicators',
             'new_task_suggestions', 'deadline_mentions', 'summary_text',
             'key_themes', 'priority_areas', 'recommended_actions',
-            'schedule_suggestions', 'created_at', 'updated_at'
+            'schedule_suggestions', 'covers_from', 'changes_since_text',
+            'text_generated_at', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['user', 'created_at', 'updated_at']
\ No newline at end of file
+        read_only_fields = [
+            'user', 'covers_from', 'changes_since_text', 'text_generated_at', 'created_at', 'updated_at'
+        ]
\ No newline at end of file
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import ContextEntry, DailyContextSummary, mentions_deadline
+
+
+@receiver(post_save, sender=ContextEntry)
+def count_entry_in_daily_summary(sender, instance, created, raw=False, **kwargs):
+    """Keep today's summary counters current as entries are added and processed"""
+    if raw:
+        return
+    urgent = bool(instance.urgency_indicators)
+    if created:
+        DailyContextSummary.bump(
+            instance.user_id, instance.created_at, total=1,
+            high_priority=int(urgent), deadline_mentions=int(mentions_deadline(instance.content))
+        )
+    elif hasattr(instance, '_counted_urgent') and instance._counted_urgent != urgent:
+        DailyContextSummary.bump(instance.user_id, instance.created_at, high_priority=1 if urgent else -1)
+    instance._counted_urgent = urgent
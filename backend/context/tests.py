@@ -1,3 +1,222 @@
-from django.test import TestCase
+import io
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ai_module.gemini_client import GeminiAIClient
+from ai_module.summaries import generate_daily_summary, stale_summaries
+from . import ingest
+from .ingest import ingest_entries, iter_rows
+from .models import ContextEntry, DailyContextSummary
+
+
+@override_settings(AI_JOBS_ENABLED=False)
+class DailySummaryGenerationTests(TestCase):
+    """The summary row exists before Gemini writes its text, so no entry is missed"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='summary', password='x')
+        ContextEntry.objects.create(user=self.user, source_type='notes', content='plain note')
+
+    def test_entry_saved_during_generation_is_counted(self):
+        def generate(client, context_data, tasks_data):
+            ContextEntry.objects.create(
+                user=self.user, source_type='email', content='report due friday', urgency_indicators=['asap']
+            )
+            return {'summary': 'Summary', 'recommendations': []}
+
+        with mock.patch.object(GeminiAIClient, 'generate_daily_summary', generate):
+            summary = generate_daily_summary(self.user, timezone.now().date())
+
+        self.assertEqual(summary.total_entries, 2)
+        self.assertEqual(summary.high_priority_indicators, 1)
+        self.assertEqual(summary.deadline_mentions, 1)
+        # The text did not see the new entry, so it still counts as a change
+        self.assertEqual(summary.changes_since_text, 3)
+
+    def test_failed_generation_leaves_a_pending_row_that_is_retried(self):
+        today = timezone.now().date()
+        with mock.patch.object(GeminiAIClient, 'generate_daily_summary', side_effect=RuntimeError('down')):
+            with self.assertRaises(RuntimeError):
+                generate_daily_summary(self.user, today)
+
+        summary = DailyContextSummary.objects.get(user=self.user, date=today)
+        self.assertTrue(summary.text_pending)
+        self.assertEqual(list(stale_summaries(today)), [summary])
+
+        with mock.patch.object(GeminiAIClient, 'generate_daily_summary', return_value={'summary': 'Summary'}):
+            summary = generate_daily_summary(self.user, today)
+        self.assertEqual(summary.summary_text, 'Summary')
+        self.assertFalse(summary.text_pending)
+
+
+@override_settings(AI_JOBS_ENABLED=False, AI_TRIAGE_ENABLED=True, AI_DEDUP_ENABLED=False)
+class EscalatedAnalysisTests(TestCase):
+    """An entry triage escalates to Gemini keeps the triage scores the response does not carry"""
+
+    CONTENT = 'Urgent: please submit the quarterly report today, the deadline is 5pm'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='escalated', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_entry(self, analysis):
+        with mock.patch.object(GeminiAIClient, 'analyze_context', return_value=analysis):
+            response = self.client.post(
+                '/api/context/entries/', {'source_type': 'email', 'content': self.CONTENT}, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        return ContextEntry.objects.get(pk=response.data['id'])
+
+    def test_missing_scores_keep_the_triage_values(self):
+        entry = self.create_entry({'keywords': ['report'], 'insights': [], 'task_suggestions': []})
+
+        self.assertTrue(entry.is_processed)
+        self.assertIn('urgent', entry.urgency_indicators)
+        self.assertIn('deadline', entry.urgency_indicators)
+        self.assertGreater(entry.relevance_score, 0.5)
+        self.assertEqual(entry.keywords, ['report'])
+
+    def test_nested_scores_are_mapped(self):
+        entry = self.create_entry({
+            'keywords': ['report'],
+            'sentiment_analysis': {'overall_sentiment': 'negative', 'sentiment_score': -0.4},
+            'urgency_analysis': {'urgency_level': 'high', 'urgency_indicators': ['deadline is 5pm']},
+            'context_classification': {'primary_category': 'work', 'relevance_score': 0.9},
+            'insights': [],
+            'task_suggestions': [],
+        })
+
+        self.assertEqual(entry.sentiment_score, -0.4)
+        self.assertEqual(entry.urgency_indicators, ['deadline is 5pm'])
+        self.assertEqual(entry.relevance_score, 0.9)
+
+
+def rows(body, read_size=ingest.READ_SIZE):
+    with mock.patch.object(ingest, 'READ_SIZE', read_size):
+        return list(iter_rows(io.BytesIO(body.encode('utf-8'))))
+
+
+class IngestParserTests(TestCase):
+    """iter_rows reads NDJSON and JSON arrays piece by piece"""
+
+    def test_ndjson_rows_survive_any_read_boundary(self):
+        body = '{"content": "caf\u00e9 \u2615"}\n\n{"n": 12345}\n[1, 2]'
+        expected = [(1, {'content': 'café ☕'}, None), (3, {'n': 12345}, None), (4, [1, 2], None)]
+        for read_size in (1, 2, 3, 7, 64):
+            self.assertEqual(rows(body, read_size), expected, read_size)
+
+    def test_array_values_survive_any_read_boundary(self):
+        body = ' [12345, "a,b]", {"k": [1, {"x": null}]} , 6.5]'
+        expected = [(1, 12345, None), (2, 'a,b]', None), (3, {'k': [1, {'x': None}]}, None), (4, 6.5, None)]
+        for read_size in (1, 2, 5, 64):
+            self.assertEqual(rows(body, read_size), expected, read_size)
+
+    def test_invalid_ndjson_line_fails_only_that_row(self):
+        result = rows('{"a": 1}\n{"a": \n{"a": 3}\n', read_size=4)
+
+        self.assertEqual([(number, value) for number, value, _ in result], [(1, {'a': 1}), (2, None), (3, {'a': 3})])
+        self.assertTrue(result[1][2].startswith('Invalid JSON'))
+
+    def test_array_syntax_error_ends_the_array(self):
+        result = rows('[{"a": 1} {"a": 2}]')
+
+        self.assertEqual(result[0], (1, {'a': 1}, None))
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[1][:2], (2, None))
+        self.assertIn('expected ","', result[1][2])
+        self.assertEqual(rows('[1, 2')[-1], (3, None, 'Invalid JSON: unterminated array'))
+
+    def test_empty_bodies(self):
+        self.assertEqual(rows(''), [])
+        self.assertEqual(rows(' \n\n  '), [])
+        self.assertEqual(rows('[]'), [])
+        self.assertEqual(rows('[ ]', read_size=1), [])
+
+    def test_row_larger_than_a_read(self):
+        content = 'x' * (3 * 1024)
+        body = json.dumps({'content': content}) + '\n' + json.dumps([content])
+
+        self.assertEqual(rows(body, read_size=256), [(1, {'content': content}, None), (2, [content], None)])
+        self.assertEqual(rows('[' + json.dumps(content) + ']', read_size=256), [(1, content, None)])
+
+
+@override_settings(CONTEXT_INGEST_CHUNK_SIZE=2, CONTEXT_INGEST_MAX_ERRORS=2)
+class IngestEntriesTests(TestCase):
+    """ingest_entries writes valid rows in chunks and reports the rest per row"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ingest', password='x')
+
+    def ingest(self, values):
+        body = '\n'.join(json.dumps(value) for value in values)
+        return ingest_entries(self.user, io.BytesIO(body.encode('utf-8')))
+
+    def test_valid_rows_are_created_and_invalid_rows_reported(self):
+        stats = self.ingest([
+            {'source_type': 'email', 'content': 'report due friday'},
+            {'source_type': 'fax', 'content': 'old'},
+            {'source_type': 'notes', 'content': '  '},
+            'not an object',
+            {'source_type': 'notes', 'content': 'call mum', 'original_timestamp': '2026-01-02T09:00:00'},
+            {'source_type': 'notes', 'content': 'bad time', 'original_timestamp': 'yesterday'},
+        ])
+
+        self.assertEqual((stats['received'], stats['created'], stats['failed']), (6, 2, 4))
+        self.assertEqual([error['row'] for error in stats['errors']], [2, 3])
+        self.assertIn('source_type', stats['errors'][0]['errors'])
+        self.assertTrue(stats['errors_truncated'])
+        entry = ContextEntry.objects.get(content='call mum')
+        self.assertTrue(timezone.is_aware(entry.original_timestamp))
+        self.assertFalse(entry.is_processed)
+        self.assertIsNotNone(entry.simhash)
+
+    def test_failed_chunk_fails_only_its_rows(self):
+        values = [{'source_type': 'notes', 'content': f'note {i}'} for i in range(5)]
+        original = ContextEntry.objects.bulk_create
+        calls = []
+
+        def bulk_create(entries, *args, **kwargs):
+            calls.append(len(entries))
+            if len(calls) == 2:
+                raise RuntimeError('disk full')
+            return original(entries, *args, **kwargs)
+
+        with mock.patch.object(ContextEntry.objects, 'bulk_create', bulk_create), \
+                self.assertLogs('context.ingest', 'ERROR'):
+            stats = self.ingest(values)
+
+        self.assertEqual(calls, [2, 2, 1])
+        self.assertEqual((stats['created'], stats['failed']), (3, 2))
+        self.assertEqual([error['row'] for error in stats['errors']], [3, 4])
+        self.assertIn('disk full', stats['errors'][0]['errors']['non_field_errors'][0])
+        self.assertEqual(
+            sorted(ContextEntry.objects.values_list('content', flat=True)), ['note 0', 'note 1', 'note 4']
+        )
+
+    def test_created_rows_bump_todays_summary(self):
+        summary = DailyContextSummary.objects.create(user=self.user, date=timezone.now().date())
+
+        self.ingest([
+            {'source_type': 'email', 'content': 'report due friday'},
+            {'source_type': 'notes', 'content': 'plain'},
+            {'source_type': 'notes', 'content': 'deadline moved'},
+            {'source_type': 'fax', 'content': 'rejected'},
+        ])
+
+        summary.refresh_from_db()
+        self.assertEqual((summary.total_entries, summary.deadline_mentions), (3, 2))
+        self.assertEqual(summary.changes_since_text, 5)
+
+    def test_empty_body_is_rejected_by_the_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/context/entries/bulk_ingest/', data=b'', content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ContextEntry.objects.exists())
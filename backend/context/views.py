@@ -4,11 +4,12 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from .models import ContextEntry, ContextInsight, DailyContextSummary
+from .models import BulkProcessRun, ContextEntry, ContextInsight, DailyContextSummary
 from .serializers import (
     ContextEntrySerializer, ContextEntryCreateSerializer,
     ContextInsightSerializer, DailyContextSummarySerializer
 )
+from django.conf import settings
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.db.models import Count, Q
@@ -27,6 +28,21 @@ class ContextEntryViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return ContextEntry.objects.filter(user=self.request.user).prefetch_related('related_tasks')
     
+    def create(self, request, *args, **kwargs):
+        """Create an entry; when its AI analysis is queued, answer 202 with the job"""
+        from ai_module.jobs import describe, pending
+        
+        response = super().create(request, *args, **kwargs)
+        job = getattr(self, 'ai_job', None)
+        if pending(job):
+            response.data['job'] = describe(job)
+            response.status_code = status.HTTP_202_ACCEPTED
+        return response
+    
+    def perform_create(self, serializer):
+        serializer.save()
+        self.ai_job = getattr(serializer, 'ai_job', None)
+    
     def get_serializer_class(self):
         if self.action == 'create':
             return ContextEntryCreateSerializer
@@ -58,39 +74,42 @@ class ContextEntryViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def bulk_process(self, request):
-        """Process multiple unprocessed entries with AI"""
+        """Process unprocessed entries with batched AI analysis; mode=all drains the whole backlog in the background"""
         unprocessed = self.get_queryset().filter(is_processed=False)
         
         if not unprocessed.exists():
             return Response({'message': 'No unprocessed entries found'})
         
-        processed_count = 0
+        # Drain the whole backlog in the background, resuming an unfinished run
+        if request.data.get('mode') == 'all':
+            from ai_module.bulk import describe_run, start_run
+            from ai_module.jobs import describe, enqueue, pending
+            
+            run = start_run(request.user)
+            job = enqueue('bulk_process', request.user, {'run_id': run.pk}, unique=True)
+            BulkProcessRun.objects.filter(pk=run.pk).update(job=job)
+            run.refresh_from_db()
+            if pending(job):
+                return Response({'run': describe_run(run), 'job': describe(job)}, status=status.HTTP_202_ACCEPTED)
+            return Response({'run': describe_run(run)})
         
+        max_limit = getattr(settings, 'AI_BULK_PROCESS_LIMIT', 100)
         try:
+            limit = min(max(int(request.data.get('limit', 10)), 1), max_limit)
+        except (TypeError, ValueError):
+            limit = 10
+        
+        try:
+            from ai_module.bulk import process_context_entries
             from ai_module.gemini_client import GeminiAIClient
             ai_client = GeminiAIClient()
             
-            for entry in unprocessed[:10]:  # Process max 10 at a time
-                try:
-                    analysis = ai_client.analyze_context(entry.content, entry.source_type)
-                    
-                    entry.processed_insights = analysis
-                    entry.keywords = analysis.get('keywords', [])
-                    entry.sentiment_score = analysis.get('sentiment_score', 0.5)
-                    entry.urgency_indicators = analysis.get('urgency_indicators', [])
-                    entry.relevance_score = analysis.get('relevance_score', 0.5)
-                    entry.is_processed = True
-                    entry.save()
-                    
-                    processed_count += 1
-                    
-                except Exception as e:
-                    print(f"Failed to process entry {entry.id}: {e}")
-                    continue
+            processed_count = process_context_entries(list(unprocessed[:limit]), ai_client)
             
             return Response({
                 'message': f'Processed {processed_count} entries',
-                'processed_count': processed_count
+                'processed_count': processed_count,
+                'upstream_calls': ai_client.upstream_calls
             })
             
         except Exception as e:
@@ -99,33 +118,80 @@ class ContextEntryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['get'])
+    def bulk_process_status(self, request):
+        """Get progress of a backlog run (the latest unless ?run= is given)"""
+        from ai_module.bulk import describe_run
+        
+        runs = BulkProcessRun.objects.filter(user=request.user)
+        run_id = request.query_params.get('run')
+        run = runs.filter(pk=run_id).first() if run_id and run_id.isdigit() else runs.first()
+        if run is None:
+            return Response({'error': 'No bulk processing run found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(describe_run(run))
+    
+    @action(detail=False, methods=['post'])
+    def bulk_ingest(self, request):
+        """Create many entries from an NDJSON or JSON-array body; AI analysis is left to a background run"""
+        from .ingest import ingest_entries
+        
+        # Read the raw stream; request.data would parse the whole body into memory
+        stats = ingest_entries(request.user, request.stream)
+        if not stats['received']:
+            return Response({'error': 'No rows found in the request body'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Queue a background drain of the new entries unless ?process=false
+        process = request.query_params.get('process', 'true').lower() not in ('0', 'false', 'no')
+        if stats['created'] and process and getattr(settings, 'AI_JOBS_ENABLED', True):
+            from ai_module.bulk import describe_run, start_run
+            from ai_module.jobs import describe, enqueue
+            
+            run = start_run(request.user)
+            job = enqueue('bulk_process', request.user, {'run_id': run.pk}, unique=True)
+            BulkProcessRun.objects.filter(pk=run.pk).update(job=job)
+            run.refresh_from_db()
+            stats.update(run=describe_run(run), job=describe(job))
+            return Response(stats, status=status.HTTP_202_ACCEPTED)
+        
+        return Response(stats, status=status.HTTP_201_CREATED if stats['created'] else status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['get'])
+    def dedup_stats(self, request):
+        """Get near-duplicate statistics: duplicate rate and LLM analyses reused"""
+        entries = self.get_queryset()
+        total = entries.count()
+        duplicates = entries.filter(duplicate_of__isnull=False)
+        duplicate_count = duplicates.count()
+        
+        # Copies of locally triaged entries did not avoid an LLM call
+        copied = duplicates.filter(processed_insights__has_key='copied_from')
+        llm_calls_saved = copied.count() - copied.filter(processed_insights__source='local').count()
+        
+        return Response({
+            'total_entries': total,
+            'duplicates': duplicate_count,
+            'duplicate_rate': round(duplicate_count / total, 3) if total else 0,
+            'llm_calls_saved': llm_calls_saved,
+        })
+    
     @action(detail=True, methods=['post'])
     def reprocess(self, request, pk=None):
         """Reprocess a specific context entry with AI"""
-        entry = self.get_object()
+        from ai_module.jobs import describe, enqueue, pending
         
-        try:
-            from ai_module.gemini_client import GeminiAIClient
-            ai_client = GeminiAIClient()
-            
-            analysis = ai_client.analyze_context(entry.content, entry.source_type)
-            
-            entry.processed_insights = analysis
-            entry.keywords = analysis.get('keywords', [])
-            entry.sentiment_score = analysis.get('sentiment_score', 0.5)
-            entry.urgency_indicators = analysis.get('urgency_indicators', [])
-            entry.relevance_score = analysis.get('relevance_score', 0.5)
-            entry.is_processed = True
-            entry.save()
-            
-            serializer = self.get_serializer(entry)
-            return Response(serializer.data)
-            
-        except Exception as e:
+        entry = self.get_object()
+        job = enqueue('analyze_context', request.user, {'entry_id': entry.pk, 'reprocess': True}, unique=True)
+        if pending(job):
+            return Response({'job': describe(job)}, status=status.HTTP_202_ACCEPTED)
+        if job.status == 'failed':
             return Response(
-                {'error': f'Reprocessing failed: {str(e)}'}, 
+                {'error': f'Reprocessing failed: {job.error}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        
+        entry.refresh_from_db()
+        serializer = self.get_serializer(entry)
+        return Response(serializer.data)
 
 
 class ContextInsightViewSet(viewsets.ModelViewSet):
@@ -184,80 +250,32 @@ class DailyContextSummaryViewSet(viewsets.ModelViewSet):
         """Generate summary for today"""
         today = timezone.now().date()
         
-        # Check if summary already exists
+        from ai_module.jobs import describe, enqueue, pending
+        
+        # Counters are kept current as context arrives; only stale AI text is rewritten
         existing_summary = self.get_queryset().filter(date=today).first()
-        if existing_summary:
-            serializer = self.get_serializer(existing_summary)
-            return Response(serializer.data)
+        if existing_summary and not existing_summary.text_pending:
+            data = self.get_serializer(existing_summary).data
+            if existing_summary.needs_regeneration:
+                job = enqueue('daily_summary', request.user, {'date': today.isoformat(), 'refresh': True}, unique=True)
+                if pending(job):
+                    data['job'] = describe(job)
+                elif job.status == 'succeeded':
+                    existing_summary.refresh_from_db()
+                    data = self.get_serializer(existing_summary).data
+            return Response(data)
         
-        try:
-            from ai_module.gemini_client import GeminiAIClient
-            from tasks.models import Task
-            
-            # Get today's context entries
-            context_entries = ContextEntry.objects.filter(
-                user=request.user,
-                created_at__date=today
-            )
-            
-            context_data = [
-                {
-                    'content': entry.content,
-                    'source_type': entry.source_type,
-                    'created_at': entry.created_at.isoformat()
-                }
-                for entry in context_entries
-            ]
-            
-            # Get current tasks
-            tasks = Task.objects.filter(
-                user=request.user,
-                status__in=['pending', 'in_progress']
-            )
-            
-            tasks_data = [
-                {
-                    'title': task.title,
-                    'priority': task.priority,
-                    'deadline': task.deadline.isoformat() if task.deadline else None
-                }
-                for task in tasks
-            ]
-            
-            # Generate AI summary
-            ai_client = GeminiAIClient()
-            summary_data = ai_client.generate_daily_summary(context_data, tasks_data)
-            
-            # Create summary object
-            summary = DailyContextSummary.objects.create(
-                user=request.user,
-                date=today,
-                total_entries=context_entries.count(),
-                high_priority_indicators=len([
-                    entry for entry in context_entries 
-                    if entry.urgency_indicators
-                ]),
-                new_task_suggestions=len(summary_data.get('recommendations', [])),
-                deadline_mentions=len([
-                    entry for entry in context_entries 
-                    if any(keyword in entry.content.lower() 
-                          for keyword in ['deadline', 'due', 'by'])
-                ]),
-                summary_text=summary_data.get('summary', ''),
-                key_themes=summary_data.get('key_themes', []),
-                priority_areas=summary_data.get('priority_areas', []),
-                recommended_actions=summary_data.get('recommendations', []),
-                schedule_suggestions=summary_data.get('schedule_suggestions', [])
-            )
-            
-            serializer = self.get_serializer(summary)
-            return Response(serializer.data)
-            
-        except Exception as e:
+        job = enqueue('daily_summary', request.user, {'date': today.isoformat()}, unique=True)
+        if pending(job):
+            return Response({'job': describe(job)}, status=status.HTTP_202_ACCEPTED)
+        if job.status == 'failed':
             return Response(
-                {'error': f'Summary generation failed: {str(e)}'}, 
+                {'error': f'Summary generation failed: {job.error}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        
+        serializer = self.get_serializer(self.get_queryset().get(pk=job.result['summary_id']))
+        return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def recent_summaries(self, request):
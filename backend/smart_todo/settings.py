@@ -179,6 +179,153 @@ CORS_ALLOW_ALL_ORIGINS = DEBUG  # Allow all origins in development
 
 # Gemini AI Configuration
 GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
+GEMINI_API_KEYS = config('GEMINI_API_KEYS', default='', cast=lambda v: [key.strip() for key in v.split(',') if key.strip()])
+GEMINI_MODEL = config('GEMINI_MODEL', default='gemini-2.0-flash')
+GEMINI_TRANSPORT = config('GEMINI_TRANSPORT', default='') or None  # grpc (default) or rest
+GEMINI_API_ENDPOINT = config('GEMINI_API_ENDPOINT', default='') or None  # e.g. http://127.0.0.1:8765 for the fake_gemini server
+AI_STRUCTURED_OUTPUT = config('AI_STRUCTURED_OUTPUT', default=True, cast=bool)  # JSON mode + response_schema when the SDK supports it
+
+# AI response cache (in-process LRU + database table)
+AI_CACHE_ENABLED = config('AI_CACHE_ENABLED', default=True, cast=bool)
+AI_CACHE_TTL = config('AI_CACHE_TTL', default=3600, cast=int)  # seconds
+AI_CACHE_TIME_BUCKET = config('AI_CACHE_TIME_BUCKET', default=300, cast=int)  # seconds of prompt time granularity
+AI_CACHE_LRU_SIZE = config('AI_CACHE_LRU_SIZE', default=512, cast=int)
+AI_CACHE_MAX_ROWS = config('AI_CACHE_MAX_ROWS', default=10000, cast=int)
+
+# Single-flight coalescing of identical in-flight AI requests
+AI_SINGLEFLIGHT_ENABLED = config('AI_SINGLEFLIGHT_ENABLED', default=True, cast=bool)
+AI_SINGLEFLIGHT_SHARED = config('AI_SINGLEFLIGHT_SHARED', default=False, cast=bool)  # also across workers via a DB lock table
+AI_SINGLEFLIGHT_WAIT = config('AI_SINGLEFLIGHT_WAIT', default=30, cast=float)  # seconds to wait for the leading request
+AI_SINGLEFLIGHT_LOCK_TTL = config('AI_SINGLEFLIGHT_LOCK_TTL', default=30, cast=int)  # seconds before a stale lock is ignored
+AI_SINGLEFLIGHT_POLL_INTERVAL = config('AI_SINGLEFLIGHT_POLL_INTERVAL', default=0.2, cast=float)  # seconds between cross-worker checks
+
+# AI call metrics (/api/ai/metrics/ and the ai_metrics command)
+AI_METRICS_ENABLED = config('AI_METRICS_ENABLED', default=True, cast=bool)
+AI_METRICS_FLUSH_SECONDS = config('AI_METRICS_FLUSH_SECONDS', default=30, cast=float)  # how often each worker saves its snapshot
+AI_METRICS_MAX_AGE = config('AI_METRICS_MAX_AGE', default=3600, cast=int)  # ignore snapshots of workers silent for longer
+AI_METRICS_TOKEN = config('AI_METRICS_TOKEN', default='')  # bearer token for scrapers; otherwise staff users only
+
+# Concurrent AI calls
+AI_PARALLEL_WORKERS = config('AI_PARALLEL_WORKERS', default=8, cast=int)
+AI_CALL_TIMEOUT = config('AI_CALL_TIMEOUT', default=20, cast=float)  # seconds per fan-out
+AI_UPSTREAM_CONCURRENCY = config('AI_UPSTREAM_CONCURRENCY', default=8, cast=int)  # in-flight Gemini calls per process
+AI_UPSTREAM_QUEUE_TIMEOUT = config('AI_UPSTREAM_QUEUE_TIMEOUT', default=5, cast=float)  # seconds to wait for a slot
+AI_BREAKER_ENABLED = config('AI_BREAKER_ENABLED', default=True, cast=bool)
+AI_BREAKER_WINDOW = config('AI_BREAKER_WINDOW', default=20, cast=int)  # recent calls considered
+AI_BREAKER_MIN_CALLS = config('AI_BREAKER_MIN_CALLS', default=5, cast=int)
+AI_BREAKER_FAILURE_RATE = config('AI_BREAKER_FAILURE_RATE', default=0.5, cast=float)
+AI_BREAKER_SLOW_CALL_SECONDS = config('AI_BREAKER_SLOW_CALL_SECONDS', default=10, cast=float)  # slower calls count as failures
+AI_BREAKER_COOLDOWN = config('AI_BREAKER_COOLDOWN', default=30, cast=float)  # seconds before a half-open probe
+
+# Task analysis mode per endpoint: parallel (three concurrent prompts),
+# combined (one structured prompt) or sequential
+AI_TASK_ANALYSIS_MODES = {
+    'ai_analyze': config('AI_ANALYZE_MODE', default='parallel'),
+    'task_create': config('AI_TASK_CREATE_MODE', default='parallel'),
+}
+
+# Time blocking: local (deterministic EDF packing, optionally annotated by Gemini) or llm
+AI_TIME_BLOCKING_ENGINE = config('AI_TIME_BLOCKING_ENGINE', default='local')
+AI_TIME_BLOCK_DAY_START = config('AI_TIME_BLOCK_DAY_START', default='09:00')  # HH:MM when no start_time is given
+AI_TIME_BLOCK_MAX_MINUTES = config('AI_TIME_BLOCK_MAX_MINUTES', default=90, cast=int)  # longest block before a break
+AI_TIME_BLOCK_BREAK_MINUTES = config('AI_TIME_BLOCK_BREAK_MINUTES', default=10, cast=int)
+AI_TIME_BLOCK_LONG_BREAK_MINUTES = config('AI_TIME_BLOCK_LONG_BREAK_MINUTES', default=30, cast=int)  # after every third block
+AI_TIME_BLOCK_MAX_TASKS = config('AI_TIME_BLOCK_MAX_TASKS', default=50, cast=int)  # active tasks considered by the local engine
+
+# Durable AI job queue run by `manage.py ai_worker`; when disabled, jobs run inline in the request
+AI_JOBS_ENABLED = config('AI_JOBS_ENABLED', default=True, cast=bool)
+AI_JOBS_WORKER_THREADS = config('AI_JOBS_WORKER_THREADS', default=4, cast=int)
+AI_JOBS_POLL_INTERVAL = config('AI_JOBS_POLL_INTERVAL', default=1.0, cast=float)  # seconds between polls of an empty queue
+AI_JOBS_MAX_ATTEMPTS = config('AI_JOBS_MAX_ATTEMPTS', default=3, cast=int)
+AI_JOBS_RETRY_BACKOFF = config('AI_JOBS_RETRY_BACKOFF', default=10, cast=float)  # seconds, doubled per failed attempt
+AI_JOBS_RETRY_BACKOFF_MAX = config('AI_JOBS_RETRY_BACKOFF_MAX', default=600, cast=float)
+AI_JOBS_VISIBILITY_TIMEOUT = config('AI_JOBS_VISIBILITY_TIMEOUT', default=300, cast=int)  # seconds before a running job is reclaimed
+
+# Daily context summaries; `manage.py precompute_daily_summaries` generates them ahead of the first visit
+AI_SUMMARY_LOOKBACK_DAYS = config('AI_SUMMARY_LOOKBACK_DAYS', default=1, cast=int)  # oldest context a summary covers, in days before its date
+AI_SUMMARY_PRECOMPUTE_THREADS = config('AI_SUMMARY_PRECOMPUTE_THREADS', default=4, cast=int)
+AI_SUMMARY_PRECOMPUTE_AT = config('AI_SUMMARY_PRECOMPUTE_AT', default='05:00')  # local time for --at
+# Counters update as context arrives; the AI text is rewritten once this many counter changes pile up
+AI_SUMMARY_REGENERATE_MIN_CHANGES = config('AI_SUMMARY_REGENERATE_MIN_CHANGES', default=5, cast=int)
+AI_SUMMARY_REGENERATE_RATIO = config('AI_SUMMARY_REGENERATE_RATIO', default=0.2, cast=float)  # ...and at least this share of total_entries
+
+# Local priority scoring of active tasks (ai_priority_score); weights are relative
+AI_SCORING_WEIGHTS = {
+    'deadline': config('AI_SCORING_DEADLINE_WEIGHT', default=0.4, cast=float),
+    'priority': config('AI_SCORING_PRIORITY_WEIGHT', default=0.3, cast=float),
+    'context': config('AI_SCORING_CONTEXT_WEIGHT', default=0.2, cast=float),
+    'age': config('AI_SCORING_AGE_WEIGHT', default=0.1, cast=float),
+}
+AI_SCORING_DEADLINE_HALF_LIFE_HOURS = config('AI_SCORING_DEADLINE_HALF_LIFE_HOURS', default=48, cast=float)  # deadline urgency halves per this much remaining time
+AI_SCORING_AGE_HALF_LIFE_DAYS = config('AI_SCORING_AGE_HALF_LIFE_DAYS', default=14, cast=float)
+AI_SCORING_CONTEXT_DAYS = config('AI_SCORING_CONTEXT_DAYS', default=7, cast=int)  # context entries considered for urgency signals
+
+# Batched context analysis
+AI_BATCH_TOKEN_BUDGET = config('AI_BATCH_TOKEN_BUDGET', default=6000, cast=int)  # estimated input tokens per batch prompt
+AI_BATCH_MAX_ENTRIES = config('AI_BATCH_MAX_ENTRIES', default=20, cast=int)
+AI_BULK_PROCESS_LIMIT = config('AI_BULK_PROCESS_LIMIT', default=100, cast=int)
+AI_BULK_CHUNK_SIZE = config('AI_BULK_CHUNK_SIZE', default=100, cast=int)  # entries per committed chunk when draining a backlog
+AI_BULK_THREADS = config('AI_BULK_THREADS', default=4, cast=int)  # chunks processed concurrently
+
+# Category.usage_frequency and Tag.usage_count increments are buffered per process and written in bulk this often
+# (0 = at once); the popular endpoints are eventually consistent across workers by this much
+TASK_USAGE_FLUSH_SECONDS = config('TASK_USAGE_FLUSH_SECONDS', default=10, cast=float)
+
+# Task analytics (GET /api/tasks/tasks/analytics/) read TaskDailyRollup; `manage.py backfill_task_rollups` fills it
+TASK_ANALYTICS_MAX_DAYS = config('TASK_ANALYTICS_MAX_DAYS', default=731, cast=int)  # longest range one request may ask for
+
+# Bulk ingest of context entries (POST /api/context/entries/bulk_ingest/)
+CONTEXT_INGEST_CHUNK_SIZE = config('CONTEXT_INGEST_CHUNK_SIZE', default=1000, cast=int)  # rows per bulk_create transaction
+CONTEXT_INGEST_MAX_ERRORS = config('CONTEXT_INGEST_MAX_ERRORS', default=100, cast=int)  # row errors listed in a response
+
+# Local lexicon triage of context entries; only entries at or above the threshold reach Gemini
+AI_TRIAGE_ENABLED = config('AI_TRIAGE_ENABLED', default=True, cast=bool)
+AI_TRIAGE_RELEVANCE_THRESHOLD = config('AI_TRIAGE_RELEVANCE_THRESHOLD', default=0.5, cast=float)
+
+# Near-duplicate context entries reuse an earlier analysis (SimHash, bits of difference allowed)
+AI_DEDUP_ENABLED = config('AI_DEDUP_ENABLED', default=True, cast=bool)
+AI_DEDUP_MAX_DISTANCE = config('AI_DEDUP_MAX_DISTANCE', default=3, cast=int)
+
+# Local per-user Naive Bayes categorizer answering confident categorize_task calls
+AI_LOCAL_CATEGORIZER_ENABLED = config('AI_LOCAL_CATEGORIZER_ENABLED', default=True, cast=bool)
+AI_LOCAL_CATEGORIZER_THRESHOLD = config('AI_LOCAL_CATEGORIZER_THRESHOLD', default=0.8, cast=float)  # min posterior to skip Gemini
+AI_LOCAL_CATEGORIZER_MIN_DOCUMENTS = config('AI_LOCAL_CATEGORIZER_MIN_DOCUMENTS', default=10, cast=int)  # labelled tasks before answering locally
+AI_LOCAL_CATEGORIZER_MAX_FEATURES = config('AI_LOCAL_CATEGORIZER_MAX_FEATURES', default=2000, cast=int)  # tokens kept per category
+AI_LOCAL_CATEGORIZER_CACHE_SECONDS = config('AI_LOCAL_CATEGORIZER_CACHE_SECONDS', default=60, cast=int)
+AI_CATEGORIZER_PROMPT_CATEGORIES = config('AI_CATEGORIZER_PROMPT_CATEGORIES', default=20, cast=int)  # categories listed in Gemini prompts
+
+# Estimated token budgets for the variable parts (tasks, context) of each prompt
+AI_PROMPT_BUDGETS = {
+    'default': 1000,
+    'prioritize_tasks': config('AI_BUDGET_PRIORITIZE', default=3000, cast=int),
+    'generate_daily_summary': config('AI_BUDGET_DAILY_SUMMARY', default=3000, cast=int),
+    'generate_schedule_suggestions': config('AI_BUDGET_SCHEDULE', default=4000, cast=int),
+    'generate_time_blocks': config('AI_BUDGET_TIME_BLOCKS', default=2000, cast=int),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'ai_module': {
+            'handlers': ['console'],
+            'level': config('AI_LOG_LEVEL', default='INFO'),
+        },
+        'context': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'tasks': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
 
 # Media files
 MEDIA_URL = '/media/'
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Task, Category, Tag, TaskHistory
+from .models import Task, Category, Tag, TaskHistory, TaskDailyRollup
 
 
 @admin.register(Category)
@@ -62,3 +62,11 @@ class TaskHistoryAdmin(admin.ModelAdmin):
     search_fields = ['task__title', 'action']
     readonly_fields = ['timestamp']
     ordering = ['-timestamp']
+
+
+@admin.register(TaskDailyRollup)
+class TaskDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['user', 'day', 'category', 'priority', 'created', 'completed', 'due', 'completed_on_time']
+    list_filter = ['priority', 'day']
+    search_fields = ['user__username']
+    ordering = ['-day']
@@ -0,0 +1,108 @@
+import atexit
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+from time import monotonic, sleep
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+
+from .models import Category, Tag
+
+logger = logging.getLogger(__name__)
+
+# The usage counter of each model
+FIELDS = {Category: 'usage_frequency', Tag: 'usage_count'}
+
+
+class UsageCounters:
+    """Buffers Category.usage_frequency and Tag.usage_count increments and writes them in bulk.
+
+    Increments are kept in memory and applied every ``TASK_USAGE_FLUSH_SECONDS`` with one
+    ``F()`` UPDATE per model and distinct increment, so assigning a popular category does
+    not lock its row on every task write. 0 writes each increment right away. A daemon
+    thread flushes on that interval even when no further increment arrives; increments of
+    a process killed before its next flush are lost, so the counts are approximate and
+    lag other workers by up to the interval.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self._lock = threading.Lock()
+        self._pending = {model: Counter() for model in FIELDS}
+        self._last_flush = monotonic()
+        # Threads do not survive a fork; the child starts its own on its first increment
+        self._timer = None
+
+    @property
+    def interval(self) -> float:
+        return getattr(settings, 'TASK_USAGE_FLUSH_SECONDS', 10)
+
+    def _start_timer(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Thread(target=self._run, name='usage-counters', daemon=True)
+        self._timer.start()
+
+    def _run(self) -> None:
+        while True:
+            sleep(max(self.interval, 1))
+            if monotonic() - self._last_flush < self.interval or not any(self.pending().values()):
+                continue
+            try:
+                self.flush()
+            finally:
+                # The timer thread has its own DB connection; do not leave it open between flushes
+                connection.close()
+
+    def add(self, model, ids: Iterable[int], amount: int = 1) -> None:
+        with self._lock:
+            pending = self._pending[model]
+            for pk in ids:
+                if pk is not None:
+                    pending[pk] += amount
+        if self._timer is None:
+            self._start_timer()
+        # Inside a transaction the flush could be rolled back with it; leave it to the timer
+        if monotonic() - self._last_flush >= self.interval and not connection.in_atomic_block:
+            self.flush()
+
+    def pending(self) -> Dict[str, int]:
+        with self._lock:
+            return {model.__name__: sum(counts.values()) for model, counts in self._pending.items()}
+
+    def flush(self) -> int:
+        """Write the buffered increments; returns the number of UPDATE statements"""
+        with self._lock:
+            pending, self._pending = self._pending, {model: Counter() for model in FIELDS}
+            self._last_flush = monotonic()
+
+        statements = 0
+        for model, counts in pending.items():
+            field = FIELDS[model]
+            by_amount = defaultdict(list)
+            for pk, amount in counts.items():
+                by_amount[amount].append(pk)
+            for amount, ids in by_amount.items():
+                try:
+                    model.objects.filter(pk__in=ids).update(**{field: F(field) + amount})
+                    statements += 1
+                except Exception:
+                    logger.warning("%s usage counter flush failed", model.__name__, exc_info=True)
+                    # Keep the increments for the next flush
+                    with self._lock:
+                        self._pending[model].update({pk: amount for pk in ids})
+        return statements
+
+
+usage_counters = UsageCounters()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=usage_counters.reset)
+atexit.register(usage_counters.flush)
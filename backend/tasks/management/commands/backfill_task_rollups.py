@@ -0,0 +1,20 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from tasks.rollups import rebuild_all
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the TaskDailyRollup rows behind the analytics endpoint from existing tasks; '
+            'run it once after deploying, then the rollups are kept current as tasks change')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only this user id (repeatable)')
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        stats = rebuild_all(options['users'])
+        self.stdout.write(
+            f"Rebuilt {stats['rows']} rollup rows for {stats['users']} users in {perf_counter() - started:.2f}s"
+        )
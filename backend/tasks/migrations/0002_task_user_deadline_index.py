@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'deadline'], name='tasks_task_user_id_9ed24b_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0002_task_user_deadline_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('urgent', 'Urgent')], max_length=10)),
+                ('created', models.IntegerField(default=0, help_text='Tasks created on this day')),
+                ('completed', models.IntegerField(default=0, help_text='Tasks completed on this day')),
+                ('lead_time_seconds', models.BigIntegerField(default=0, help_text='Creation to completion time of those tasks, summed')),
+                ('due', models.IntegerField(default=0, help_text='Tasks with their deadline on this day')),
+                ('completed_on_time', models.IntegerField(default=0, help_text='Of those, completed by the deadline')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='tasks.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['user', 'day'], name='tasks_taskd_user_id_587f93_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='taskdailyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('user', 'day', 'category', 'priority'), name='unique_task_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskdailyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'day', 'priority'), name='unique_uncategorized_task_rollup'),
+        ),
+    ]
@@ -69,18 +69,29 @@ class Task(models.Model):
         indexes = [
             models.Index(fields=['user', 'status']),
             models.Index(fields=['priority', 'deadline']),
+            models.Index(fields=['user', 'deadline']),
             models.Index(fields=['ai_priority_score']),
         ]
     
     def __str__(self):
         return f"{self.title} ({self.get_priority_display()})"
     
+    # Fields whose loaded values are remembered so post_save handlers can see what changed
+    TRACKED_FIELDS = (
+        'title', 'description', 'category_id',
+        'priority', 'status', 'deadline', 'created_at', 'completed_at',
+    )
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in cls.TRACKED_FIELDS and value is not models.DEFERRED
+        }
+        return instance
+    
     def save(self, *args, **kwargs):
-        # Update category usage frequency
-        if self.category:
-            self.category.usage_frequency += 1
-            self.category.save()
-        
         # Set completed_at when status changes to completed
         if self.status == 'completed' and not self.completed_at:
             from django.utils import timezone
@@ -117,3 +128,36 @@ class TaskHistory(models.Model):
     
     def __str__(self):
         return f"{self.task.title} - {self.action} at {self.timestamp}"
+
+
+class TaskDailyRollup(models.Model):
+    """Per-day task counts for analytics, kept current from task changes (see tasks/rollups.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_rollups')
+    day = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES)
+    
+    created = models.IntegerField(default=0, help_text="Tasks created on this day")
+    completed = models.IntegerField(default=0, help_text="Tasks completed on this day")
+    lead_time_seconds = models.BigIntegerField(default=0, help_text="Creation to completion time of those tasks, summed")
+    due = models.IntegerField(default=0, help_text="Tasks with their deadline on this day")
+    completed_on_time = models.IntegerField(default=0, help_text="Of those, completed by the deadline")
+    
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'day', 'category', 'priority'], condition=models.Q(category__isnull=False),
+                name='unique_task_rollup'
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'day', 'priority'], condition=models.Q(category__isnull=True),
+                name='unique_uncategorized_task_rollup'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.day} ({self.category or 'uncategorized'}, {self.priority})"
@@ -0,0 +1,198 @@
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Task, TaskDailyRollup
+
+# The task fields a rollup row depends on
+ROLLUP_FIELDS = ('category_id', 'priority', 'status', 'deadline', 'created_at', 'completed_at')
+COUNTERS = ('created', 'completed', 'lead_time_seconds', 'due', 'completed_on_time')
+
+Key = Tuple[date, Optional[int], str]
+
+
+def contributions(state: Optional[Dict[str, Any]]) -> Dict[Key, Counter]:
+    """What one task in ``state`` (ROLLUP_FIELDS values) adds to the rollup rows"""
+    rows = defaultdict(Counter)
+    if not state or state.get('created_at') is None:
+        return rows
+    category_id, priority = state['category_id'], state['priority']
+
+    rows[(timezone.localdate(state['created_at']), category_id, priority)]['created'] += 1
+    completed_at = state['completed_at'] if state['status'] == 'completed' else None
+    if completed_at is not None:
+        row = rows[(timezone.localdate(completed_at), category_id, priority)]
+        row['completed'] += 1
+        row['lead_time_seconds'] += max(int((completed_at - state['created_at']).total_seconds()), 0)
+    if state['deadline'] is not None:
+        row = rows[(timezone.localdate(state['deadline']), category_id, priority)]
+        row['due'] += 1
+        if completed_at is not None and completed_at <= state['deadline']:
+            row['completed_on_time'] += 1
+    return rows
+
+
+def task_state(task: Task) -> Dict[str, Any]:
+    return {name: getattr(task, name) for name in ROLLUP_FIELDS}
+
+
+def apply_change(user_id: int, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> None:
+    """Move a task's contribution from its ``before`` state to its ``after`` state"""
+    deltas = contributions(after)
+    for key, counts in contributions(before).items():
+        deltas[key].subtract(counts)
+    for (day, category_id, priority), counts in deltas.items():
+        changes = {name: value for name, value in counts.items() if value}
+        if changes:
+            _add(user_id, day, category_id, priority, changes)
+
+
+def _add(user_id: int, day: date, category_id: Optional[int], priority: str, changes: Dict[str, int]) -> None:
+    rows = TaskDailyRollup.objects.filter(user_id=user_id, day=day, category_id=category_id, priority=priority)
+    update = {name: F(name) + value for name, value in changes.items()}
+    if rows.update(**update):
+        return
+    try:
+        with transaction.atomic():
+            TaskDailyRollup.objects.create(
+                user_id=user_id, day=day, category_id=category_id, priority=priority, **changes
+            )
+    except IntegrityError:
+        # Created concurrently; add to that row instead
+        rows.update(**update)
+
+
+def move_category(category_id: int) -> None:
+    """Fold a category's rollups into the uncategorized rows before the category is deleted"""
+    for rollup in TaskDailyRollup.objects.filter(category_id=category_id):
+        changes = {name: getattr(rollup, name) for name in COUNTERS if getattr(rollup, name)}
+        if changes:
+            _add(rollup.user_id, rollup.day, None, rollup.priority, changes)
+    TaskDailyRollup.objects.filter(category_id=category_id).delete()
+
+
+def rebuild_rollups(user_id: int) -> int:
+    """Recompute a user's rollups from their tasks with a few grouped queries; returns rows written"""
+    tasks = Task.objects.filter(user_id=user_id).order_by()
+    rows = defaultdict(Counter)
+
+    for row in tasks.values('category_id', 'priority', day=TruncDate('created_at')).annotate(n=Count('id')):
+        rows[(row['day'], row['category_id'], row['priority'])]['created'] += row['n']
+
+    lead_time = ExpressionWrapper(F('completed_at') - F('created_at'), output_field=DurationField())
+    completed = tasks.filter(status='completed', completed_at__isnull=False)
+    for row in completed.values('category_id', 'priority', day=TruncDate('completed_at')).annotate(
+        n=Count('id'), lead=Sum(lead_time)
+    ):
+        counts = rows[(row['day'], row['category_id'], row['priority'])]
+        counts['completed'] += row['n']
+        counts['lead_time_seconds'] += max(int(row['lead'].total_seconds()), 0) if row['lead'] else 0
+
+    on_time = Q(status='completed', completed_at__isnull=False, completed_at__lte=F('deadline'))
+    for row in tasks.filter(deadline__isnull=False).values(
+        'category_id', 'priority', day=TruncDate('deadline')
+    ).annotate(n=Count('id'), on_time=Count('id', filter=on_time)):
+        counts = rows[(row['day'], row['category_id'], row['priority'])]
+        counts['due'] += row['n']
+        counts['completed_on_time'] += row['on_time']
+
+    with transaction.atomic():
+        TaskDailyRollup.objects.filter(user_id=user_id).delete()
+        TaskDailyRollup.objects.bulk_create([
+            TaskDailyRollup(user_id=user_id, day=day, category_id=category_id, priority=priority, **counts)
+            for (day, category_id, priority), counts in rows.items()
+        ], batch_size=1000)
+    return len(rows)
+
+
+def rebuild_all(user_ids: Optional[Iterable[int]] = None) -> Dict[str, int]:
+    """Rebuild the rollups of the given users, or of every user with tasks"""
+    if user_ids is None:
+        user_ids = Task.objects.order_by().values_list('user_id', flat=True).distinct()
+    users = rows = 0
+    for user_id in list(user_ids):
+        rows += rebuild_rollups(user_id)
+        users += 1
+    return {'users': users, 'rows': rows}
+
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def period_start(day: date, granularity: str) -> date:
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(day: date, granularity: str) -> date:
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def _lead_time(rows, labels: Dict[str, str]) -> List[Dict[str, Any]]:
+    return [
+        {
+            **{label: row[field] for label, field in labels.items()},
+            'completed': row['completed'],
+            'avg_lead_time_hours': round(row['lead_time_seconds'] / row['completed'] / 3600, 2),
+        }
+        for row in rows if row['completed']
+    ]
+
+
+def _summed(rollups, *fields) -> List[Dict[str, Any]]:
+    """Rollup counters summed per ``fields`` group"""
+    rows = rollups.values(*fields).annotate(**{f'sum_{name}': Sum(name) for name in COUNTERS})
+    return [
+        {**{field: row[field] for field in fields}, **{name: row[f'sum_{name}'] for name in COUNTERS}}
+        for row in rows
+    ]
+
+
+def analytics(user_id: int, start: date, end: date, granularity: str = 'day') -> Dict[str, Any]:
+    """Throughput series and completion lead times for ``start``..``end`` read from the rollups.
+
+    A day's overdue count is the tasks due that day that were not completed by their
+    deadline; it is only reported for days that are over.
+    """
+    rollups = TaskDailyRollup.objects.filter(user_id=user_id, day__gte=start, day__lte=end).order_by()
+    today = timezone.localdate()
+
+    series = {}
+    period = period_start(start, granularity)
+    while period <= end:
+        series[period] = {'period': period.isoformat(), 'created': 0, 'completed': 0, 'due': 0, 'overdue': 0}
+        period = _next_period(period, granularity)
+    for row in _summed(rollups, 'day'):
+        bucket = series[period_start(row['day'], granularity)]
+        bucket['created'] += row['created']
+        bucket['completed'] += row['completed']
+        bucket['due'] += row['due']
+        if row['day'] < today:
+            bucket['overdue'] += max(row['due'] - row['completed_on_time'], 0)
+
+    by_category = _summed(rollups.order_by('category__name'), 'category_id', 'category__name')
+    priorities = [choice for choice, _ in Task.PRIORITY_CHOICES]
+    by_priority = sorted(_summed(rollups, 'priority'), key=lambda row: priorities.index(row['priority']))
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'series': list(series.values()),
+        'lead_time': {
+            'by_category': _lead_time(by_category, {'category_id': 'category_id', 'category': 'category__name'}),
+            'by_priority': _lead_time(by_priority, {'priority': 'priority'}),
+        },
+    }
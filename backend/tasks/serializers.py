@@ -45,88 +45,34 @@ class TaskSerializer(serializers.ModelSerializer):
 class TaskCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating tasks with AI enhancement"""
     enhance_with_ai = serializers.BooleanField(default=False, write_only=True)
+    analysis_mode = serializers.ChoiceField(
+        choices=['parallel', 'combined', 'sequential'], required=False, write_only=True
+    )
     
     class Meta:
         model = Task
         fields = [
             'id', 'title', 'description', 'priority', 'status', 'category',
-            'deadline', 'estimated_duration', 'enhance_with_ai'
+            'deadline', 'estimated_duration', 'enhance_with_ai', 'analysis_mode'
         ]
         read_only_fields = ['id']
     
     def create(self, validated_data):
         enhance_with_ai = validated_data.pop('enhance_with_ai', False)
+        analysis_mode = validated_data.pop('analysis_mode', None)
         validated_data['user'] = self.context['request'].user
         
         task = super().create(validated_data)
         
-        # If AI enhancement is requested, trigger AI analysis
+        # Queue AI enhancement for the ai_worker command
+        self.ai_job = None
         if enhance_with_ai:
-            from ai_module.gemini_client import GeminiAIClient
-            from context.models import ContextEntry
+            from ai_module.jobs import enqueue, pending
             
-            try:
-                ai_client = GeminiAIClient()
-                
-                # Get recent context for the user
-                context_entries = ContextEntry.objects.filter(
-                    user=task.user
-                ).order_by('-created_at')[:5]
-                
-                context_data = [
-                    {
-                        'content': entry.content,
-                        'source_type': entry.source_type
-                    }
-                    for entry in context_entries
-                ]
-                
-                # Enhance description
-                enhancement = ai_client.enhance_task_description(
-                    task.title, task.description, context_data
-                )
-                task.ai_enhanced_description = enhancement.get('enhanced_description', '')
-                
-                # Suggest deadline if not provided
-                if not task.deadline:
-                    deadline_suggestion = ai_client.suggest_deadline(
-                        task.title, task.description, context_data
-                    )
-                    if deadline_suggestion.get('suggested_deadline'):
-                        from datetime import datetime
-                        task.ai_suggested_deadline = datetime.fromisoformat(
-                            deadline_suggestion['suggested_deadline'].replace('Z', '+00:00')
-                        )
-                
-                # Get category suggestion if not provided
-                if not task.category:
-                    existing_categories = list(
-                        Category.objects.values_list('name', flat=True)
-                    )
-                    categorization = ai_client.categorize_task(
-                        task.title, task.description, existing_categories
-                    )
-                    
-                    category_name = categorization.get('suggested_category')
-                    if category_name:
-                        category, created = Category.objects.get_or_create(
-                            name=category_name,
-                            defaults={'color': '#3B82F6'}
-                        )
-                        task.category = category
-                
-                # Store AI insights
-                task.ai_insights = {
-                    'enhancement': enhancement,
-                    'deadline_suggestion': deadline_suggestion if 'deadline_suggestion' in locals() else {},
-                    'categorization': categorization if 'categorization' in locals() else {}
-                }
-                
-                task.save()
-                
-            except Exception as e:
-                # If AI enhancement fails, continue with basic task creation
-                print(f"AI enhancement failed: {e}")
+            self.ai_job = enqueue('enhance_task', task.user, {'task_id': task.pk, 'analysis_mode': analysis_mode})
+            if not pending(self.ai_job):
+                # Ran inline (AI_JOBS_ENABLED off); answer with the enhanced task
+                task.refresh_from_db()
         
         return task
 
@@ -0,0 +1,74 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .counters import usage_counters
+from .models import Category, Tag, Task
+from .rollups import ROLLUP_FIELDS, apply_change, move_category, task_state
+
+
+def _loaded_state(instance):
+    """The task's rollup fields as last saved or loaded, if every one is known"""
+    saved = getattr(instance, '_rollup_state', None)
+    if saved is not None:
+        return saved
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    if all(name in loaded for name in ROLLUP_FIELDS):
+        return {name: loaded[name] for name in ROLLUP_FIELDS}
+    return None
+
+
+@receiver(pre_save, sender=Task)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    """Capture the task's rollup fields as they were before this save, for the receivers below"""
+    if raw or instance.pk is None:
+        instance._previous_state = None
+        return
+    before = None if instance._state.adding else _loaded_state(instance)
+    if before is None:
+        # Not loaded with every rollup field (deferred fields, instance built by hand with a pk)
+        before = Task.objects.filter(pk=instance.pk).values(*ROLLUP_FIELDS).first()
+    instance._previous_state = before
+
+
+@receiver(post_save, sender=Task)
+def update_rollups_on_save(sender, instance, created, raw=False, **kwargs):
+    """Keep TaskDailyRollup current as tasks are created, completed, rescheduled or recategorized"""
+    if raw:
+        return
+    after = task_state(instance)
+    apply_change(instance.user_id, None if created else getattr(instance, '_previous_state', None), after)
+    instance._rollup_state = after
+
+
+@receiver(post_save, sender=Task)
+def count_category_usage(sender, instance, created, raw=False, **kwargs):
+    """Count a category use when a task is given it, not on every save of the task"""
+    if raw or instance.category_id is None:
+        return
+    before = None if created else getattr(instance, '_previous_state', None)
+    if before is None or before['category_id'] != instance.category_id:
+        usage_counters.add(Category, [instance.category_id])
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+def count_tag_usage(sender, instance, action, reverse, pk_set, **kwargs):
+    """Count tag uses as tags are added to tasks (pk_set holds only the new links)"""
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        usage_counters.add(Tag, [instance.pk], amount=len(pk_set))
+    else:
+        usage_counters.add(Tag, pk_set)
+
+
+@receiver(post_delete, sender=Task)
+def update_rollups_on_delete(sender, instance, origin=None, **kwargs):
+    # Deleting the user cascades to its rollups as well; only task deletions need undoing
+    if isinstance(origin, Task) or getattr(origin, 'model', None) is Task:
+        apply_change(instance.user_id, _loaded_state(instance) or task_state(instance), None)
+
+
+@receiver(pre_delete, sender=Category)
+def fold_category_rollups(sender, instance, **kwargs):
+    # Its tasks become uncategorized (SET_NULL) without sending signals
+    move_category(instance.pk)
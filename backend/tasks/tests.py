@@ -1,3 +1,268 @@
-from django.test import TestCase
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .counters import usage_counters
+from .models import Category, Tag, Task, TaskDailyRollup
+from .rollups import COUNTERS, apply_change, contributions, rebuild_rollups, task_state
+
+
+class DashboardAggregationTests(TestCase):
+    """dashboard_stats and priority_distribution each cost a single query"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='dashboard', password='x')
+        other = User.objects.create_user(username='other', password='x')
+        now = timezone.now()
+        today_end = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.max.time()))
+        Task.objects.create(user=self.user, title='Overdue', priority='urgent', deadline=now - timedelta(days=2))
+        Task.objects.create(user=self.user, title='Due today', priority='high', status='in_progress', deadline=today_end)
+        Task.objects.create(user=self.user, title='Later', priority='low', deadline=now + timedelta(days=3))
+        Task.objects.create(user=self.user, title='Done', priority='high', status='completed', deadline=today_end)
+        Task.objects.create(user=other, title='Not mine', priority='urgent', deadline=now - timedelta(days=1))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_dashboard_stats_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tasks/tasks/dashboard_stats/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'total_tasks': 4,
+            'pending_tasks': 2,
+            'in_progress_tasks': 1,
+            'completed_tasks': 1,
+            'overdue_tasks': 1,
+            'high_priority_tasks': 2,
+            'tasks_due_today': 1,
+        })
+
+    def test_priority_distribution_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tasks/tasks/priority_distribution/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'urgent': 1, 'high': 1, 'medium': 0, 'low': 1})
+
+
+@override_settings(AI_JOBS_ENABLED=False)
+class UsageCounterTests(TestCase):
+    """Category and tag usage is counted on assignment and written in bulk"""
+
+    def setUp(self):
+        usage_counters.reset()
+        self.user = User.objects.create_user(username='usage', password='x')
+        self.work = Category.objects.create(name='Work')
+        self.home = Category.objects.create(name='Home')
+        self.tags = [Tag.objects.create(name=f'tag{i}') for i in range(3)]
+
+    def test_counts_assignments_only(self):
+        task = Task.objects.create(user=self.user, title='Report', category=self.work)
+        task.title = 'Quarterly report'
+        task.save()
+        task = Task.objects.get(pk=task.pk)
+        task.category = self.home
+        task.save()
+        task.tags.add(self.tags[0], self.tags[1])
+        task.tags.add(self.tags[0])
+        self.tags[2].task_set.add(task, Task.objects.create(user=self.user, title='Other'))
+
+        self.assertEqual(Category.objects.get(pk=self.work.pk).usage_frequency, 0)
+        self.assertEqual(usage_counters.pending(), {'Category': 2, 'Tag': 4})
+        usage_counters.flush()
+
+        self.assertEqual(
+            dict(Category.objects.values_list('name', 'usage_frequency')), {'Work': 1, 'Home': 1}
+        )
+        self.assertEqual(
+            dict(Tag.objects.values_list('name', 'usage_count')), {'tag0': 1, 'tag1': 1, 'tag2': 2}
+        )
+
+
+@override_settings(TASK_USAGE_FLUSH_SECONDS=1)
+class UsageCounterTimerTests(TransactionTestCase):
+    """Buffered increments are written without waiting for another increment"""
+
+    def test_idle_process_flushes(self):
+        usage_counters.reset()
+        category = Category.objects.create(name='Idle')
+        usage_counters.add(Category, [category.pk])
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and not Category.objects.get(pk=category.pk).usage_frequency:
+            time.sleep(0.2)
+        self.assertEqual(Category.objects.get(pk=category.pk).usage_frequency, 1)
+
+
+def rollup_counts(user):
+    """The user's non-zero rollup counters keyed by (day, category, priority)"""
+    counts = {}
+    for rollup in TaskDailyRollup.objects.filter(user=user):
+        values = {name: getattr(rollup, name) for name in COUNTERS if getattr(rollup, name)}
+        if values:
+            counts[(rollup.day, rollup.category_id, rollup.priority)] = values
+    return counts
+
+
+@override_settings(AI_JOBS_ENABLED=False)
+class RollupTests(TestCase):
+    """TaskDailyRollup follows task writes and always matches a rebuild from the tasks"""
+
+    def setUp(self):
+        usage_counters.reset()
+        self.user = User.objects.create_user(username='rollups', password='x')
+        self.work = Category.objects.create(name='Work')
+        self.home = Category.objects.create(name='Home')
+        self.now = timezone.now()
+
+    def tearDown(self):
+        usage_counters.reset()
+
+    def assertMatchesRebuild(self):
+        incremental = rollup_counts(self.user)
+        rebuild_rollups(self.user.id)
+        self.assertEqual(incremental, rollup_counts(self.user))
+
+    def test_contributions(self):
+        created = datetime(2026, 3, 2, 9, tzinfo=dt_timezone.utc)
+        state = {
+            'category_id': 7, 'priority': 'high', 'status': 'completed', 'created_at': created,
+            'completed_at': created + timedelta(days=1, hours=2), 'deadline': created + timedelta(days=2),
+        }
+
+        rows = contributions(state)
+        self.assertEqual(rows[(created.date(), 7, 'high')], {'created': 1})
+        self.assertEqual(
+            rows[(created.date() + timedelta(days=1), 7, 'high')], {'completed': 1, 'lead_time_seconds': 26 * 3600}
+        )
+        self.assertEqual(rows[(created.date() + timedelta(days=2), 7, 'high')], {'due': 1, 'completed_on_time': 1})
+
+        # A completion time left on a reopened task does not count
+        rows = contributions({**state, 'status': 'pending', 'deadline': None})
+        self.assertEqual(dict(rows), {(created.date(), 7, 'high'): {'created': 1}})
+        self.assertEqual(dict(contributions(None)), {})
+
+    def test_apply_change_moves_a_contribution(self):
+        task = Task.objects.create(user=self.user, title='Report', category=self.work, deadline=self.now)
+        before = task_state(task)
+        after = {**before, 'category_id': self.home.pk, 'priority': 'high'}
+        day = timezone.localdate(task.created_at)
+
+        apply_change(self.user.id, before, after)
+
+        self.assertEqual(rollup_counts(self.user), {(day, self.home.pk, 'high'): {'created': 1, 'due': 1}})
+        apply_change(self.user.id, after, None)
+        self.assertEqual(rollup_counts(self.user), {})
+
+    def test_create_update_delete_sequence_matches_rebuild(self):
+        report = Task.objects.create(
+            user=self.user, title='Report', category=self.work, priority='high',
+            deadline=self.now + timedelta(days=1)
+        )
+        chores = Task.objects.create(user=self.user, title='Chores', category=self.home)
+        late = Task.objects.create(user=self.user, title='Late', deadline=self.now - timedelta(days=2))
+        Task.objects.create(user=self.user, title='Spare', category=self.work, priority='low')
+        self.assertMatchesRebuild()
+
+        report.status = 'completed'
+        report.save()
+        chores.category = self.work
+        chores.priority = 'urgent'
+        chores.save()
+        late.status = 'completed'
+        late.save()
+        # Updated through a fresh instance and through one loaded without the rollup fields
+        reloaded = Task.objects.get(pk=late.pk)
+        reloaded.deadline = self.now + timedelta(days=3)
+        reloaded.save()
+        partial = Task.objects.only('id', 'user_id', 'title').get(pk=report.pk)
+        partial.status = 'pending'
+        partial.priority = 'medium'
+        partial.save(update_fields=['status', 'priority'])
+        self.assertMatchesRebuild()
+
+        chores.delete()
+        Task.objects.filter(title='Spare').delete()
+        self.assertMatchesRebuild()
+
+    def test_category_reassign_and_delete_fold_into_uncategorized(self):
+        task = Task.objects.create(user=self.user, title='Report', category=self.work)
+        Task.objects.create(user=self.user, title='Plain')
+        task.category = self.home
+        task.save()
+        self.assertMatchesRebuild()
+
+        day = timezone.localdate(task.created_at)
+        self.home.delete()
+        self.assertEqual(rollup_counts(self.user), {(day, None, 'medium'): {'created': 2}})
+        self.assertMatchesRebuild()
+
+    def test_user_delete_removes_the_rollups(self):
+        Task.objects.create(user=self.user, title='Report', category=self.work)
+        self.user.delete()
+        self.assertFalse(TaskDailyRollup.objects.exists())
+
+
+class AnalyticsEndpointTests(TestCase):
+    """The analytics endpoint validates its range and buckets the rollups"""
+
+    url = '/api/tasks/tasks/analytics/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='analytics', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_invalid_parameters(self):
+        for params in (
+            {'start': '2026-13-01'},
+            {'end': 'yesterday'},
+            {'start': '2026-03-10', 'end': '2026-03-01'},
+            {'start': '2020-01-01', 'end': '2026-01-01'},
+            {'granularity': 'hour'},
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.data)
+
+    def test_weekly_series(self):
+        Task.objects.create(user=self.user, title='Report', status='completed')
+        today = timezone.localdate()
+
+        response = self.client.get(self.url, {
+            'start': (today - timedelta(days=13)).isoformat(), 'end': today.isoformat(), 'granularity': 'week'
+        })
+
+        self.assertEqual(response.status_code, 200)
+        periods = [datetime.strptime(row['period'], '%Y-%m-%d').date() for row in response.data['series']]
+        self.assertTrue(all(period.weekday() == 0 for period in periods))
+        self.assertEqual(sum(row['created'] for row in response.data['series']), 1)
+        self.assertEqual(sum(row['completed'] for row in response.data['series']), 1)
+        self.assertEqual(response.data['lead_time']['by_priority'][0]['priority'], 'medium')
+
+
+class RescoreEndpointTests(TestCase):
+    """The rescore action rescores only the requesting user's active tasks"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='rescore', password='x')
+        self.other = User.objects.create_user(username='other', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_rescores_own_tasks(self):
+        deadline = timezone.now() - timedelta(hours=1)
+        mine = Task.objects.create(user=self.user, title='Report', priority='urgent', deadline=deadline)
+        theirs = Task.objects.create(user=self.other, title='Report', priority='urgent', deadline=deadline)
+
+        response = self.client.post('/api/tasks/tasks/rescore/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['scanned'], response.data['updated']), (1, 1))
+        self.assertEqual(Task.objects.get(pk=mine.pk).ai_priority_score, 0.7)
+        self.assertEqual(Task.objects.get(pk=theirs.pk).ai_priority_score, 0.5)
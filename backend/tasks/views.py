@@ -5,12 +5,13 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.http import HttpResponse, JsonResponse
+from .counters import usage_counters
 from .models import Task, Category, Tag, TaskHistory
 from .serializers import (
     TaskSerializer, TaskCreateSerializer, CategorySerializer, 
     TagSerializer, TaskHistorySerializer
 )
-from django.db.models import Q
+from django.db.models import Count, Q
 from datetime import datetime, timedelta
 from django.utils import timezone
 import json
@@ -30,6 +31,21 @@ class TaskViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Task.objects.filter(user=self.request.user).select_related('category').prefetch_related('tags')
     
+    def create(self, request, *args, **kwargs):
+        """Create a task; when AI enhancement is queued, answer 202 with the job"""
+        from ai_module.jobs import describe, pending
+        
+        response = super().create(request, *args, **kwargs)
+        job = getattr(self, 'ai_job', None)
+        if pending(job):
+            response.data['job'] = describe(job)
+            response.status_code = status.HTTP_202_ACCEPTED
+        return response
+    
+    def perform_create(self, serializer):
+        serializer.save()
+        self.ai_job = getattr(serializer, 'ai_job', None)
+    
     def get_serializer_class(self):
         if self.action == 'create':
             return TaskCreateSerializer
@@ -38,40 +54,34 @@ class TaskViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def dashboard_stats(self, request):
         """Get dashboard statistics"""
-        queryset = self.get_queryset()
+        now = timezone.now()
+        # A range on deadline (not deadline__date) lets the database use the deadline index
+        today_start = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+        active = Q(status__in=['pending', 'in_progress'])
         
-        stats = {
-            'total_tasks': queryset.count(),
-            'pending_tasks': queryset.filter(status='pending').count(),
-            'in_progress_tasks': queryset.filter(status='in_progress').count(),
-            'completed_tasks': queryset.filter(status='completed').count(),
-            'overdue_tasks': queryset.filter(
-                deadline__lt=timezone.now(),
-                status__in=['pending', 'in_progress']
-            ).count(),
-            'high_priority_tasks': queryset.filter(
-                priority__in=['high', 'urgent'],
-                status__in=['pending', 'in_progress']
-            ).count(),
-            'tasks_due_today': queryset.filter(
-                deadline__date=timezone.now().date(),
-                status__in=['pending', 'in_progress']
-            ).count(),
-        }
+        stats = Task.objects.filter(user=request.user).aggregate(
+            total_tasks=Count('id'),
+            pending_tasks=Count('id', filter=Q(status='pending')),
+            in_progress_tasks=Count('id', filter=Q(status='in_progress')),
+            completed_tasks=Count('id', filter=Q(status='completed')),
+            overdue_tasks=Count('id', filter=active & Q(deadline__lt=now)),
+            high_priority_tasks=Count('id', filter=active & Q(priority__in=['high', 'urgent'])),
+            tasks_due_today=Count('id', filter=active & Q(
+                deadline__gte=today_start, deadline__lt=today_start + timedelta(days=1)
+            )),
+        )
         
         return Response(stats)
     
     @action(detail=False, methods=['get'])
     def priority_distribution(self, request):
         """Get task priority distribution"""
-        queryset = self.get_queryset().filter(status__in=['pending', 'in_progress'])
+        queryset = Task.objects.filter(user=request.user, status__in=['pending', 'in_progress'])
         
-        distribution = {
-            'urgent': queryset.filter(priority='urgent').count(),
-            'high': queryset.filter(priority='high').count(),
-            'medium': queryset.filter(priority='medium').count(),
-            'low': queryset.filter(priority='low').count(),
-        }
+        distribution = queryset.aggregate(**{
+            priority: Count('id', filter=Q(priority=priority))
+            for priority in ['urgent', 'high', 'medium', 'low']
+        })
         
         return Response(distribution)
     
@@ -88,6 +98,41 @@ class TaskViewSet(viewsets.ModelViewSet):
         
         serializer = self.get_serializer(upcoming_tasks, many=True)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def rescore(self, request):
+        """Recompute the AI priority score of the user's active tasks"""
+        from ai_module.scoring import rescore_tasks
+
+        return Response(rescore_tasks(user_ids=[request.user.id]))
+
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """Get created/completed/overdue counts per period and completion lead times (?start=&end=&granularity=)"""
+        from django.conf import settings
+        from .rollups import GRANULARITIES, analytics
+        
+        try:
+            end = datetime.strptime(request.query_params['end'], '%Y-%m-%d').date() \
+                if request.query_params.get('end') else timezone.localdate()
+            start = datetime.strptime(request.query_params['start'], '%Y-%m-%d').date() \
+                if request.query_params.get('start') else end - timedelta(days=29)
+        except ValueError:
+            return Response({'error': 'start and end must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            return Response(
+                {'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_days = getattr(settings, 'TASK_ANALYTICS_MAX_DAYS', 731)
+        if start > end or (end - start).days >= max_days:
+            return Response(
+                {'error': f'start must not be after end, and the range is limited to {max_days} days'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(analytics(request.user.id, start, end, granularity))
     
     @action(detail=True, methods=['post'])
     def mark_completed(self, request, pk=None):
@@ -110,77 +155,24 @@ class TaskViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def ai_analyze(self, request, pk=None):
         """Trigger AI analysis for a specific task"""
-        task = self.get_object()
+        from ai_module.jobs import describe, enqueue, pending
         
-        try:
-            from ai_module.gemini_client import GeminiAIClient
-            from context.models import ContextEntry
-            
-            ai_client = GeminiAIClient()
-            
-            # Get recent context
-            context_entries = ContextEntry.objects.filter(
-                user=task.user
-            ).order_by('-created_at')[:5]
-            
-            context_data = [
-                {
-                    'content': entry.content,
-                    'source_type': entry.source_type
-                }
-                for entry in context_entries
-            ]
-            
-            # Get AI suggestions
-            enhancement = ai_client.enhance_task_description(
-                task.title, task.description, context_data
-            )
-            
-            deadline_suggestion = ai_client.suggest_deadline(
-                task.title, task.description, context_data
-            )
-            
-            categorization = ai_client.categorize_task(
-                task.title, task.description,
-                list(Category.objects.values_list('name', flat=True))
-            )
-            
-            # Update task with AI insights
-            task.ai_enhanced_description = enhancement.get('enhanced_description', '')
-            task.ai_insights = {
-                'enhancement': enhancement,
-                'deadline_suggestion': deadline_suggestion,
-                'categorization': categorization,
-                'analyzed_at': timezone.now().isoformat()
-            }
-            
-            # Update suggested deadline
-            if deadline_suggestion.get('suggested_deadline'):
-                task.ai_suggested_deadline = datetime.fromisoformat(
-                    deadline_suggestion['suggested_deadline'].replace('Z', '+00:00')
-                )
-            
-            task.save()
-            
-            # Create history entry
-            TaskHistory.objects.create(
-                task=task,
-                action='ai_analyzed',
-                ai_suggestions={
-                    'enhancement': enhancement,
-                    'deadline_suggestion': deadline_suggestion,
-                    'categorization': categorization
-                }
-            )
-            
-            serializer = self.get_serializer(task)
-            return Response(serializer.data)
-            
-        except Exception as e:
+        task = self.get_object()
+        job = enqueue('analyze_task', request.user, {
+            'task_id': task.pk,
+            'analysis_mode': request.data.get('analysis_mode') or request.query_params.get('analysis_mode'),
+        }, unique=True)
+        if pending(job):
+            return Response({'job': describe(job)}, status=status.HTTP_202_ACCEPTED)
+        if job.status == 'failed':
             return Response(
-                {'error': f'AI analysis failed: {str(e)}'}, 
+                {'error': f'AI analysis failed: {job.error}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        
+        task.refresh_from_db()
+        serializer = self.get_serializer(task)
+        return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def export_tasks(self, request):
@@ -270,7 +262,8 @@ class CategoryViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def popular(self, request):
-        """Get most popular categories"""
+        """Get most popular categories (other workers' recent uses may lag by TASK_USAGE_FLUSH_SECONDS)"""
+        usage_counters.flush()
         popular_categories = self.get_queryset().filter(usage_frequency__gt=0)[:10]
         serializer = self.get_serializer(popular_categories, many=True)
         return Response(serializer.data)
@@ -286,7 +279,8 @@ class TagViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def popular(self, request):
-        """Get most popular tags"""
+        """Get most popular tags (other workers' recent uses may lag by TASK_USAGE_FLUSH_SECONDS)"""
+        usage_counters.flush()
         popular_tags = self.get_queryset().filter(usage_count__gt=0)[:20]
         serializer = self.get_serializer(popular_tags, many=True)
         return Response(serializer.data)